@@ -0,0 +1,66 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from Database import CacheBus, HoldSweeper, OrderDb, OutboxDispatcher
+from Utils import Metrics
+from Utils.Settings import get_settings
+from Apps.Common import install_error_handlers
+from Apps.Event import EventRouter
+from Apps.Metrics import MetricsRouter
+from Apps.Order import AsyncOrderRouter, OrderRouter
+from Apps.Product import AsyncProductRouter, ProductRouter
+from Apps.Report import ReportRouter
+
+'''
+The application, composed from the routers under Apps/. OMS_SERVICE_MODE
+picks the handlers for the product and order CRUD endpoints:
+
+    uvicorn App:app                         # sync handlers (default)
+    OMS_SERVICE_MODE=async uvicorn App:app  # async handlers on the async engine
+
+Both sets of handlers use the same repositories (Database/ProductRepository.py
+and Database/OrderRepository.py); batch orders, imports, listings, reports,
+events and metrics are the same handlers in both modes.
+'''
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Brings the schema up to date, then runs the cache bus listener, the outbox dispatcher and the stock
+    hold sweeper for as long as the application is up. Importing this module touches no database; everything that does starts
+    here, in each worker.
+    """
+    if get_settings().migrate_on_startup:
+        await run_in_threadpool(OrderDb.init_database)
+    await run_in_threadpool(CacheBus.start_listener)
+    await OutboxDispatcher.start_dispatcher()
+    await HoldSweeper.start_sweeper()
+    try:
+        yield
+    finally:
+        await HoldSweeper.stop_sweeper()
+        await OutboxDispatcher.stop_dispatcher()
+        await run_in_threadpool(CacheBus.stop_listener)
+
+def create_app(service_mode: str = None) -> FastAPI:
+    """
+    Builds the application.
+
+    :param service_mode: 'sync' or 'async'; defaults to the service_mode setting.
+    :return: A FastAPI application.
+    """
+    settings = get_settings()
+    service_mode = service_mode or settings.service_mode
+    application = FastAPI(lifespan=lifespan)
+    Metrics.instrument(application, settings.metrics_enabled, server_timing=settings.metrics_server_timing)
+    install_error_handlers(application)
+
+    if service_mode == "async":
+        crud_routers = (AsyncProductRouter.router, AsyncOrderRouter.router)
+    else:
+        crud_routers = (ProductRouter.router, OrderRouter.router)
+    for router in crud_routers + (ReportRouter.router, EventRouter.router, MetricsRouter.router):
+        application.include_router(router)
+    return application
+
+app = create_app()
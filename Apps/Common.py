@@ -0,0 +1,75 @@
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from Database import DataExport, Idempotency
+from Database.OrderRepository import OrderNotFound, OrderStateError, ProductsNotFound
+from Database.ProductRepository import DuplicateSku, ProductNotFound
+from Database.ProductSearch import InvalidSearchQuery
+from Database.StockReservation import InsufficientStock
+from Utils.JsonResponse import FastJSONResponse
+
+'''
+Helpers shared by the routers.
+
+The repositories raise domain errors; the handlers installed here turn them
+into the same error responses HTTPException would give, so a handler does
+not have to catch them and the sync and async routers answer alike.
+'''
+
+# domain error -> HTTP status; the detail is the error's message
+ERROR_STATUS = (
+    (ProductNotFound, status.HTTP_404_NOT_FOUND),
+    (OrderNotFound, status.HTTP_404_NOT_FOUND),
+    (ProductsNotFound, status.HTTP_404_NOT_FOUND),
+    (DuplicateSku, status.HTTP_400_BAD_REQUEST),
+    (OrderStateError, status.HTTP_400_BAD_REQUEST),
+    (InsufficientStock, status.HTTP_400_BAD_REQUEST),
+    (InvalidSearchQuery, status.HTTP_400_BAD_REQUEST)
+)
+
+def _error_detail(error):
+    if isinstance(error, ProductsNotFound):
+        return {"message": str(error), "lines": error.lines}
+    return str(error)
+
+def install_error_handlers(app):
+    """
+    Registers the responses for the domain errors raised by the repositories.
+    """
+    for error_type, status_code in ERROR_STATUS:
+        def handler(request, error, status_code=status_code):
+            return FastJSONResponse({"detail": _error_detail(error)}, status_code=status_code)
+        app.add_exception_handler(error_type, handler)
+
+def run_idempotent(session, scope: str, idempotency_key, request_hash: str, work, respond):
+    """
+    Runs a write through Idempotency.run_idempotent, mapping its errors to HTTP responses.
+    """
+    try:
+        return Idempotency.run_idempotent(session, scope, idempotency_key, request_hash, work, respond)
+    except Idempotency.IdempotencyKeyReused as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e))
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+
+async def run_idempotent_async(session, scope: str, idempotency_key, request_hash: str, work, respond):
+    """
+    Runs a write through Idempotency.run_idempotent_async, mapping its errors to HTTP responses.
+    """
+    try:
+        return await Idempotency.run_idempotent_async(session, scope, idempotency_key, request_hash, work, respond)
+    except Idempotency.IdempotencyKeyReused as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e))
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+
+def export_response(chunks, kind: str, output_format: str, compress: bool) -> StreamingResponse:
+    """
+    Streams an export from DataExport as a file download, gzipped exports as .gz files.
+
+    :param chunks: The export's bytes chunks.
+    :param kind: 'orders' or 'products', used in the file name.
+    """
+    media_type = "application/gzip" if compress else DataExport.MEDIA_TYPES[output_format]
+    disposition = f'attachment; filename="{DataExport.filename(kind, output_format, compress)}"'
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": disposition})
@@ -0,0 +1,120 @@
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from Database import OrderDb, Outbox, OutboxDispatcher
+from Database.DbEngine import get_db
+from Utils import CommonResponseUtil
+from Utils.JsonResponse import dumps
+from Utils.Settings import get_settings
+
+'''
+Order and stock events from the outbox (see Outbox.py), paged or as
+server-sent events.
+'''
+
+router = APIRouter()
+
+# seconds of silence after which an event stream sends a keep-alive comment
+EVENT_STREAM_HEARTBEAT = 15.0
+
+def _event_types(types: Optional[List[str]]):
+    unknown = [value for value in types or () if value not in Outbox.EVENT_TYPES]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown event type. Must be one of {list(Outbox.EVENT_TYPES)}")
+    return tuple(types) if types else None
+
+def _read_events(after: int, limit: int, types) -> list:
+    session = OrderDb.get_database_session()
+    try:
+        return Outbox.fetch_after(session, after, limit, types)
+    finally:
+        session.close()
+
+def _sse(event: dict) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event["id"], event["type"].encode(), dumps(event))
+
+@router.get("/events", response_model=None, status_code=status.HTTP_200_OK)
+def get_events(
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    types: Optional[List[str]] = Query(None, alias="type"),
+    session: Session = Depends(get_db)
+):
+    """
+    Page through the outbox, for consumers that poll instead of subscribing.
+    :param after: Return events with a higher id; pass next_after from the previous page.
+    :param limit: Most events returned.
+    :param types: Only these event types (repeatable).
+    :return: Events, oldest first, and next_after.
+    """
+    events = Outbox.fetch_after(session, after, limit, _event_types(types))
+    next_after = events[-1]["id"] if events else after
+    return CommonResponseUtil.create_common_response("SUCCESS", "Events fetched successfully", {"events": events, "next_after": next_after})
+
+@router.get("/events/stream", response_model=None, status_code=status.HTTP_200_OK)
+async def stream_events(
+    after: Optional[int] = Query(None, ge=0),
+    types: Optional[List[str]] = Query(None, alias="type"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-sent events for order and stock changes.
+    Without after or Last-Event-ID only new events are sent; with either, the stream first replays the
+    events after that id from the outbox. Clients reconnecting with Last-Event-ID miss nothing that is
+    still within the outbox retention.
+    :param after: Replay events after this id.
+    :param types: Only these event types (repeatable).
+    :param last_event_id: Set by EventSource when it reconnects; takes precedence over after.
+    :return: A text/event-stream response.
+    """
+    dispatcher = OutboxDispatcher.get_dispatcher()
+    if dispatcher is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Event stream is not enabled")
+    types = _event_types(types)
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID")
+        after = int(last_event_id)
+    batch_size = get_settings().outbox_batch_size
+    # subscribe before catching up, so nothing committed in between is missed; duplicates are skipped by id
+    subscriber = dispatcher.broker.subscribe()
+
+    async def stream():
+        try:
+            yield b"retry: 3000\n\n"
+            cursor = after
+            if cursor is None:
+                session = OrderDb.get_database_session()
+                try:
+                    cursor = await run_in_threadpool(Outbox.last_event_id, session)
+                finally:
+                    session.close()
+            while True:
+                events = await run_in_threadpool(_read_events, cursor, batch_size, types)
+                for event in events:
+                    yield _sse(event)
+                if events:
+                    cursor = events[-1]["id"]
+                if len(events) < batch_size:
+                    break
+
+            while True:
+                try:
+                    events = await asyncio.wait_for(subscriber.get(), timeout=EVENT_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if events is None:
+                    # fell too far behind; the client reconnects with Last-Event-ID and catches up from the table
+                    break
+                chunk = [_sse(event) for event in events if event["id"] > cursor and (types is None or event["type"] in types)]
+                cursor = max(cursor, events[-1]["id"])
+                if chunk:
+                    yield b"".join(chunk)
+        finally:
+            dispatcher.broker.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
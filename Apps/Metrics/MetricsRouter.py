@@ -0,0 +1,112 @@
+import os
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from Database import CacheBus, HoldSweeper, OrderArchive, OutboxDispatcher, ProductCache, WriteQueue
+from Database.DbEngine import get_db, get_pool_metrics
+from Utils import CommonResponseUtil, Metrics
+
+'''
+Operational metrics of this worker process, as JSON per component and in
+Prometheus text format.
+'''
+
+router = APIRouter()
+
+@router.get("/metrics/pool", response_model=None, status_code=status.HTTP_200_OK)
+def get_pool_stats():
+    """
+    Report connection pool usage so the pool can be sized.
+    :return: Pool size, checked-out and overflow connections and checkout wait times.
+    """
+    return CommonResponseUtil.create_common_response("SUCCESS", "Pool metrics fetched successfully", {"pool": get_pool_metrics()})
+
+@router.get("/metrics/cache", response_model=None, status_code=status.HTTP_200_OK)
+def get_cache_stats():
+    """
+    Report product cache effectiveness.
+    :return: Hit, miss and eviction counters of the product cache, and what this worker took from the cache bus.
+    """
+    return CommonResponseUtil.create_common_response(
+        "SUCCESS", "Cache metrics fetched successfully", {"cache": ProductCache.cache_stats(), "bus": CacheBus.bus_stats()}
+    )
+
+@router.get("/metrics/writes", response_model=None, status_code=status.HTTP_200_OK)
+def get_write_stats():
+    """
+    Report how well the SQLite write queue is grouping commits.
+    :return: Committed batches and transactions and the current queue depth.
+    """
+    return CommonResponseUtil.create_common_response("SUCCESS", "Write metrics fetched successfully", {"writes": WriteQueue.write_queue_stats()})
+
+@router.get("/metrics/events", response_model=None, status_code=status.HTTP_200_OK)
+def get_event_stats():
+    """
+    Report outbox delivery per sink.
+    :return: Each sink's cursor, delivered events, consecutive failures and last error, and the live subscribers.
+    """
+    return CommonResponseUtil.create_common_response("SUCCESS", "Event metrics fetched successfully", {"events": OutboxDispatcher.dispatcher_stats()})
+
+@router.get("/metrics/holds", response_model=None, status_code=status.HTTP_200_OK)
+def get_hold_stats(session: Session = Depends(get_db)):
+    """
+    Report time-limited stock holds of PENDING orders.
+    :return: Active holds, expired holds awaiting the sweeper, seconds to the next expiry and what this worker's sweeper released.
+    """
+    return CommonResponseUtil.create_common_response("SUCCESS", "Hold metrics fetched successfully", {"holds": HoldSweeper.hold_stats(session)})
+
+@router.get("/metrics/storage", response_model=None, status_code=status.HTTP_200_OK)
+def get_storage_stats(session: Session = Depends(get_db)):
+    """
+    Report the size of the live and archived order tables.
+    :return: Rows per table and, on SQLite, bytes per table with its indexes and the file's free bytes.
+    """
+    return CommonResponseUtil.create_common_response("SUCCESS", "Storage metrics fetched successfully", {"storage": OrderArchive.storage_report(session)})
+
+def _prometheus_samples(session) -> list:
+    # every worker process answers with its own counters; the pid tells the scrapes apart
+    samples = [("oms_worker_pid", "gauge", "Process id of the worker that served this scrape.", os.getpid())]
+    pool = get_pool_metrics()
+    for key, name, metric_type, documentation in (
+        ("pool_size", "oms_db_pool_size", "gauge", "Connections kept open by the pool."),
+        ("checked_out", "oms_db_pool_checked_out", "gauge", "Connections currently in use."),
+        ("overflow", "oms_db_pool_overflow", "gauge", "Connections open beyond pool_size (negative while the pool is not full)."),
+        ("checkouts", "oms_db_pool_checkouts_total", "counter", "Connections handed out by the pool."),
+        ("timeouts", "oms_db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up waiting for a connection."),
+        ("wait_seconds_total", "oms_db_pool_checkout_wait_seconds_total", "counter", "Seconds spent waiting for a connection.")
+    ):
+        if key in pool:
+            samples.append((name, metric_type, documentation, pool[key]))
+    cache = ProductCache.cache_stats()
+    for key in ("hits", "misses", "evictions", "expirations"):
+        if key in cache:
+            samples.append((f"oms_product_cache_{key}_total", "counter", f"Product cache {key}.", cache[key]))
+    writes = WriteQueue.write_queue_stats()
+    if "batches" in writes:
+        samples.append(("oms_write_queue_batches_total", "counter", "Batches committed by the write queue.", writes["batches"]))
+        samples.append(("oms_write_queue_transactions_total", "counter", "Transactions committed by the write queue.", writes["transactions"]))
+        samples.append(("oms_write_queue_depth", "gauge", "Transactions waiting in the write queue.", writes["queued"]))
+    bus = CacheBus.bus_stats()
+    if "applied" in bus:
+        samples.append(("oms_cache_bus_applied_total", "counter", "Invalidations from other workers applied to this worker's cache.", bus["applied"]))
+    events = OutboxDispatcher.dispatcher_stats()
+    if "sinks" in events:
+        samples.append(("oms_outbox_subscribers", "gauge", "Clients connected to /events/stream.", events["subscribers"]))
+        samples.append(("oms_outbox_delivered_total", "counter", "Events delivered, summed over the sinks.", sum(sink["delivered"] for sink in events["sinks"])))
+        samples.append(("oms_outbox_lease_holder", "gauge", "1 when this worker delivers to the durable sinks.", int(events["lease_holder"])))
+        samples.append(("oms_outbox_failing_sinks", "gauge", "Sinks whose last delivery failed.", sum(1 for sink in events["sinks"] if sink["failures"])))
+    holds = HoldSweeper.hold_stats(session)
+    samples.append(("oms_stock_holds_active", "gauge", "PENDING orders holding stock for a limited time.", holds["active"]))
+    samples.append(("oms_stock_holds_expired", "gauge", "Expired stock holds not yet released by the sweeper.", holds["expired"]))
+    if "released" in holds["sweeper"]:
+        samples.append(("oms_stock_holds_released_total", "counter", "Orders cancelled by this worker's sweeper because their hold expired.", holds["sweeper"]["released"]))
+        samples.append(("oms_stock_holds_released_units_total", "counter", "Units of stock given back by this worker's sweeper.", holds["sweeper"]["released_units"]))
+    return samples
+
+@router.get("/metrics", response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+def get_prometheus_metrics(session: Session = Depends(get_db)):
+    """
+    Request, query, pool, cache, write queue, event and stock hold metrics in Prometheus text format.
+    Request and query histograms are empty when OMS_METRICS_ENABLED is false.
+    """
+    return PlainTextResponse(Metrics.render_prometheus(_prometheus_samples(session)), media_type="text/plain; version=0.0.4")
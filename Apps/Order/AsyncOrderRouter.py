@@ -0,0 +1,146 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from Database import AsyncOrderDb, Idempotency
+from Database.AsyncDbEngine import get_async_db
+from Database.OrderRepository import AsyncOrderRepository, OrderNotFound
+from Utils import CommonResponseUtil
+from Database.StockReservation import InsufficientStock
+from Modules.Order.model import MultiLineOrderBO, OrderBO
+from Apps.Common import run_idempotent_async
+from Apps.Order import OrderRouter
+from Apps.Response.CommonResponse import CommonResponse
+from Apps.Response.Payloads import MultiLineOrderPagePayload, MultiLineOrderPayload, OrderBatchPayload, OrderPayload
+
+'''
+Order endpoints for OMS_SERVICE_MODE=async. Placing, reading, updating and
+deleting a single order and the /orders/full endpoints are async handlers on
+the async engine; the batch,
+listing and bulk status endpoints are OrderRouter's sync handlers, which run
+in the thread pool.
+'''
+
+router = APIRouter()
+
+@router.post("/orders", response_model=CommonResponse[OrderPayload], status_code=status.HTTP_201_CREATED)
+async def create_order(
+    order: OrderBO.OrderBo,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create an order, reserving its stock, see OrderRouter.create_order.
+    """
+    async def place_order(session):
+        return await AsyncOrderRepository(session).place(order)
+
+    return await run_idempotent_async(
+        session, "POST /orders", idempotency_key, Idempotency.request_fingerprint(order),
+        place_order, lambda order_id: OrderRouter.order_created_response(order, order_id)
+    )
+
+router.add_api_route("/orders/batch", OrderRouter.create_orders_batch, methods=["POST"],
+                     response_model=CommonResponse[OrderBatchPayload], status_code=status.HTTP_201_CREATED)
+router.add_api_route("/orders", OrderRouter.list_orders, methods=["GET"], response_model=None)
+router.add_api_route("/orders/export", OrderRouter.export_orders, methods=["GET"], response_model=None)
+# registered ahead of /orders/{order_id}, which would otherwise shadow it
+router.add_api_route("/orders/status", OrderRouter.update_order_statuses, methods=["PUT"], response_model=None)
+
+@router.post("/orders/full", response_model=CommonResponse[MultiLineOrderPayload], status_code=status.HTTP_201_CREATED)
+async def create_multi_line_order(
+    order: MultiLineOrderBO.MultiLineOrderBO,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create one order with several lines, see OrderRouter.create_multi_line_order.
+    """
+    async def place_order(session):
+        return await AsyncOrderRepository(session).place_full(order)
+
+    try:
+        return await run_idempotent_async(
+            session, "POST /orders/full", idempotency_key, Idempotency.request_fingerprint(order),
+            place_order, OrderRouter.multi_line_order_created_response
+        )
+    except InsufficientStock as e:
+        raise OrderRouter.insufficient_stock_error(await AsyncOrderRepository(session).short_products(e.quantities))
+
+@router.get("/orders/full", response_model=CommonResponse[MultiLineOrderPagePayload], status_code=status.HTTP_200_OK)
+async def list_multi_line_orders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    product_id: Optional[int] = Query(None, gt=0),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_db)
+):
+    """
+    List orders with their lines and products, see OrderRouter.list_multi_line_orders.
+    """
+    if status_filter is not None:
+        OrderRouter.check_status(status_filter)
+    descending = order == "desc"
+    after_id = OrderRouter.decode_order_cursor(cursor, descending)
+    orders = await AsyncOrderRepository(session).page_full(
+        limit + 1, status=status_filter, product_id=product_id, created_from=created_from, created_to=created_to,
+        descending=descending, after_id=after_id
+    )
+    return OrderRouter.multi_line_order_page_response(orders, limit, descending)
+
+@router.get("/orders/full/{order_id}", response_model=CommonResponse[MultiLineOrderPayload], status_code=status.HTTP_200_OK)
+async def get_multi_line_order(order_id: int, session: AsyncSession = Depends(get_async_db)):
+    """
+    Fetch an order with its lines and their products.
+    """
+    order = await AsyncOrderRepository(session).get_full(order_id)
+    if order is None:
+        raise OrderNotFound()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order fetched successfully", {"order": order})
+
+@router.get("/orders/{order_id}", response_model=CommonResponse[OrderPayload], status_code=status.HTTP_200_OK)
+async def get_order_by_id(order_id: int, session: AsyncSession = Depends(get_async_db)):
+    """
+    Fetch an order by its ID, see OrderRouter.get_order_by_id.
+    :param order_id: ID of the order to fetch.
+    :return: Order details or 404 if not found.
+    """
+    order = await AsyncOrderRepository(session).get(order_id)
+    if order is None:
+        raise OrderNotFound()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order fetched successfully", {"order": order})
+
+@router.put("/orders/{order_id}", response_model=None, status_code=status.HTTP_200_OK)
+async def update_order_status(order_id: int, status_update: str, session: AsyncSession = Depends(get_async_db)):
+    """
+    Update the status of an order.
+    :param order_id: ID of the order to update.
+    :param status_update: The new status.
+    :return: Success message or validation error.
+    """
+    OrderRouter.check_status(status_update)
+
+    async def set_status(session):
+        await AsyncOrderRepository(session).set_status(order_id, status_update)
+
+    await AsyncOrderDb.run_with_retry(session, set_status)
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order status updated successfully", {"order_id": order_id, "new_status": status_update})
+
+@router.delete("/orders/{order_id}", response_model=None, status_code=status.HTTP_200_OK)
+async def delete_order(order_id: int, session: AsyncSession = Depends(get_async_db)):
+    """
+    Delete an order if its status is not in terminal states.
+    :param order_id: ID of the order to delete.
+    :return: Success message or validation error.
+    """
+    async def remove_order(session):
+        await AsyncOrderRepository(session).delete(order_id)
+
+    await AsyncOrderDb.run_with_retry(session, remove_order)
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order deleted successfully", {"order_id": order_id})
@@ -0,0 +1,357 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from Database import DataExport, Idempotency, OrderDb, WriteQueue
+from Database.DbEngine import get_db
+from Database.OrderRepository import OrderNotFound, OrderRepository
+from Database.StockReservation import InsufficientStock
+from Utils import CommonResponseUtil
+from Utils.Cursor import decode_cursor, encode_cursor
+from Utils.JsonResponse import dumps
+from Utils.OrderStatus import INVALID_STATUS_MESSAGE, is_valid_status
+from Modules.Order.model import MultiLineOrderBO, OrderBO, OrderBatchBO, OrderStatusBatchBO
+from Apps.Common import export_response, run_idempotent
+from Apps.Response.CommonResponse import CommonResponse
+from Apps.Response.OrderResponse import OrderResponse
+from Apps.Response.Payloads import MultiLineOrderPagePayload, MultiLineOrderPayload, OrderBatchPayload, OrderPayload
+
+'''
+Order endpoints on the sync engine.
+
+/orders/status, /orders/full and /orders/export are declared before
+/orders/{order_id}, which would otherwise match them first.
+'''
+
+router = APIRouter()
+
+def check_status(value: str):
+    if not is_valid_status(value):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_STATUS_MESSAGE)
+
+def order_created_response(order, order_id: int):
+    orderResponse = OrderResponse(
+        order_id=order_id,
+        product_id=order.product_id,
+        quantity=order.quantity,
+        status=order.status,
+        created_at=order.created_at
+    )
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order created successfully", {"order": orderResponse}, status_code=status.HTTP_201_CREATED)
+
+@router.post("/orders", response_model=CommonResponse[OrderPayload], status_code=status.HTTP_201_CREATED)
+def create_order(
+    order: OrderBO.OrderBo,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: Session = Depends(get_db)
+):
+    """
+    Create an order, reserving its stock. Orders start PENDING or PAID; any other status is rejected with 400.
+    :param order: The order to place.
+    :param idempotency_key: Optional key; a retry with the same key gets the original response without placing the order again.
+    :return: The created order.
+    """
+    return run_idempotent(
+        session, "POST /orders", idempotency_key, Idempotency.request_fingerprint(order),
+        lambda session: OrderRepository(session).place(order), lambda order_id: order_created_response(order, order_id)
+    )
+
+@router.post("/orders/batch", response_model=CommonResponse[OrderBatchPayload], status_code=status.HTTP_201_CREATED)
+def create_orders_batch(
+    batch: OrderBatchBO.OrderBatchBO,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: Session = Depends(get_db)
+):
+    """
+    Create many orders in a single transaction.
+    :param batch: Order lines and whether the batch is all-or-nothing or partial.
+    :param idempotency_key: Optional key; a retry with the same key gets the original response without placing the orders again.
+    :return: Created orders and, in partial mode, the lines that could not be fulfilled.
+    """
+    def respond(result):
+        accepted, order_ids, failed = result
+        orders = [
+            {"order_id": order_id, "product_id": line.product_id, "quantity": line.quantity, "status": line.status, "created_at": line.created_at}
+            for order_id, (_, line) in zip(order_ids, accepted)
+        ]
+        message = "Orders created successfully" if not failed else f"{len(orders)} orders created, {len(failed)} lines failed"
+        return CommonResponseUtil.create_common_response("SUCCESS", message, {"orders": orders, "failed": failed}, status_code=status.HTTP_201_CREATED)
+
+    try:
+        return run_idempotent(
+            session, "POST /orders/batch", idempotency_key, Idempotency.request_fingerprint(batch),
+            lambda session: OrderRepository(session).place_batch(batch.orders, batch.all_or_nothing), respond
+        )
+    except InsufficientStock as e:
+        raise insufficient_stock_error(OrderRepository(session).short_products(e.quantities))
+
+def multi_line_order_created_response(order: dict):
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order created successfully", {"order": order}, status_code=status.HTTP_201_CREATED)
+
+def insufficient_stock_error(short: list):
+    """
+    :param short: IDs of the products short of stock, read after the failed reservation was rolled back.
+    """
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"message": "Insufficient stock", "product_ids": short})
+
+@router.post("/orders/full", response_model=CommonResponse[MultiLineOrderPayload], status_code=status.HTTP_201_CREATED)
+def create_multi_line_order(
+    order: MultiLineOrderBO.MultiLineOrderBO,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: Session = Depends(get_db)
+):
+    """
+    Create one order with several lines, reserving the stock of every line.
+    :param order: Status, date and the order lines.
+    :param idempotency_key: Optional key; a retry with the same key gets the original response without placing the order again.
+    :return: The created order with its lines, prices and products.
+    """
+    try:
+        return run_idempotent(
+            session, "POST /orders/full", idempotency_key, Idempotency.request_fingerprint(order),
+            lambda session: OrderRepository(session).place_full(order), multi_line_order_created_response
+        )
+    except InsufficientStock as e:
+        raise insufficient_stock_error(OrderRepository(session).short_products(e.quantities))
+
+def decode_order_cursor(cursor: Optional[str], descending: bool):
+    """
+    Returns the order_id a GET /orders/full cursor continues after, or None without a cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        values = decode_cursor(cursor)
+        if values["desc"] != descending:
+            raise ValueError("Cursor does not match the requested order")
+        return int(values["after"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def multi_line_order_page_response(orders: list, limit: int, descending: bool):
+    """
+    Builds the GET /orders/full response from a page fetched with one extra order.
+    """
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor({"after": orders[-1]["order_id"], "desc": descending})
+    pagination = {"limit": limit, "count": len(orders), "next_cursor": next_cursor}
+    return CommonResponseUtil.create_common_response("SUCCESS", "Orders fetched successfully", {"orders": orders, "pagination": pagination})
+
+@router.get("/orders/full", response_model=CommonResponse[MultiLineOrderPagePayload], status_code=status.HTTP_200_OK)
+def list_multi_line_orders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    product_id: Optional[int] = Query(None, gt=0),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_db)
+):
+    """
+    List orders by order_id with their lines and products. A page costs the same few queries
+    whatever the number of lines on it.
+    :param status_filter: Only orders with this status.
+    :param product_id: Only orders with a line for this product.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    :param order: asc or desc.
+    :param limit: Page size.
+    :param cursor: next_cursor from the previous page.
+    :return: Orders with their lines and a pagination block with next_cursor (null on the last page).
+    """
+    if status_filter is not None:
+        check_status(status_filter)
+    descending = order == "desc"
+    after_id = decode_order_cursor(cursor, descending)
+    orders = OrderRepository(session).page_full(
+        limit + 1, status=status_filter, product_id=product_id, created_from=created_from, created_to=created_to,
+        descending=descending, after_id=after_id
+    )
+    return multi_line_order_page_response(orders, limit, descending)
+
+@router.get("/orders/full/{order_id}", response_model=CommonResponse[MultiLineOrderPayload], status_code=status.HTTP_200_OK)
+def get_multi_line_order(order_id: int, session: Session = Depends(get_db)):
+    """
+    Fetch an order with its lines and their products.
+    :param order_id: ID of the order to fetch.
+    :return: Order details or 404 if not found.
+    """
+    order = OrderRepository(session).get_full(order_id)
+    if order is None:
+        raise OrderNotFound()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order fetched successfully", {"order": order})
+
+# rows serialized per chunk written to a streamed order listing
+ORDER_STREAM_CHUNK_ROWS = 500
+
+@router.get("/orders", response_model=None, status_code=status.HTTP_200_OK)
+def list_orders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    product_id: Optional[int] = Query(None, gt=0),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = Query("created_at", pattern="^(created_at|order_id)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=100000),
+    cursor: Optional[str] = None
+):
+    """
+    List orders with filters, sorting and cursor pagination.
+    The response is streamed as it is read from the database, so large pages are never held in memory.
+    :param status_filter: Only orders with this status.
+    :param product_id: Only orders with a line for this product; a multi-line order reports that line's quantity.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    :param sort: Sort by created_at (ties broken by order_id) or order_id.
+    :param order: asc or desc.
+    :param limit: Page size.
+    :param cursor: next_cursor from the previous page.
+    :return: Orders and a pagination block with next_cursor (null on the last page).
+    """
+    if status_filter is not None:
+        check_status(status_filter)
+    descending = order == "desc"
+
+    after = None
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            if values["sort"] != sort or values["desc"] != descending:
+                raise ValueError("Cursor does not match the requested sort")
+            after = (datetime.fromisoformat(values["created_at"]), values["order_id"]) if sort == "created_at" else (values["order_id"],)
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    statement = OrderDb.order_listing_statement(
+        status=status_filter,
+        product_id=product_id,
+        created_from=created_from,
+        created_to=created_to,
+        sort=sort,
+        descending=descending,
+        after=after
+    ).limit(limit + 1)
+
+    def stream():
+        # the request-scoped session is gone once the handler returns, so the stream owns its own
+        session = OrderDb.get_database_session()
+        try:
+            yield b'{"status":"SUCCESS","message":"Orders fetched successfully","data":{"orders":['
+            chunk = []
+            count = 0
+            last = None
+            has_more = False
+            for row in session.execute(statement, execution_options={"yield_per": ORDER_STREAM_CHUNK_ROWS}):
+                if count == limit:
+                    has_more = True
+                    break
+                chunk.append(dumps(OrderDb.order_to_dict(row)))
+                last = row
+                count += 1
+                if len(chunk) == ORDER_STREAM_CHUNK_ROWS:
+                    yield (b"," if count > len(chunk) else b"") + b",".join(chunk)
+                    chunk = []
+            if chunk:
+                yield (b"," if count > len(chunk) else b"") + b",".join(chunk)
+
+            next_cursor = None
+            if has_more:
+                next_cursor = encode_cursor({
+                    "sort": sort,
+                    "desc": descending,
+                    "created_at": last.created_at.isoformat(),
+                    "order_id": last.order_id
+                })
+            yield b'],"pagination":' + dumps({"limit": limit, "count": count, "next_cursor": next_cursor}) + b"}}"
+        finally:
+            session.close()
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+@router.get("/orders/export", response_model=None, status_code=status.HTTP_200_OK)
+def export_orders(
+    output_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    compress: bool = Query(False, alias="gzip"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archived: bool = False
+):
+    """
+    Export orders as one CSV or NDJSON download with a row per order line.
+    The rows are streamed as they are read, so the export never holds the orders in memory.
+    :param output_format: 'csv' (with a header row) or 'ndjson'.
+    :param compress: gzip the download.
+    :param status_filter: Only orders with this status.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    :param include_archived: Export archived orders too, ahead of the live ones.
+    :return: The order lines by order_id and line_no.
+    """
+    if status_filter is not None:
+        check_status(status_filter)
+    chunks = DataExport.export_orders(output_format, compress, status_filter, created_from, created_to, include_archived)
+    return export_response(chunks, "orders", output_format, compress)
+
+def order_statuses_response(report):
+    message = "Order statuses updated successfully" if not (report.rejected or report.missing) else \
+        f"{len(report.updated)} orders updated, {len(report.rejected)} rejected, {len(report.missing)} not found"
+    return CommonResponseUtil.create_common_response("SUCCESS", message, report.to_dict())
+
+@router.put("/orders/status", response_model=None, status_code=status.HTTP_200_OK)
+def update_order_statuses(batch: OrderStatusBatchBO.OrderStatusBatchBO, session: Session = Depends(get_db)):
+    """
+    Move many orders to one status in a single transaction.
+    Orders whose current status does not allow the move are reported under rejected and left as they are;
+    cancelled orders that still held stock give it back.
+    :param batch: Order IDs and the new status.
+    :return: Updated, unchanged, rejected and missing order IDs and the stock restored per product.
+    """
+    check_status(batch.status)
+    report = WriteQueue.run_write(session, lambda session: OrderRepository(session).transition(batch.order_ids, batch.status))
+    return order_statuses_response(report)
+
+# get order by id
+@router.get("/orders/{order_id}", response_model=CommonResponse[OrderPayload], status_code=status.HTTP_200_OK)
+def get_order_by_id(order_id: int, session: Session = Depends(get_db)):
+    """
+    Fetch an order by its ID. For a multi-line order, product_id and quantity are those of its first line;
+    /orders/full/{order_id} serves every line.
+    :param order_id: ID of the order to fetch.
+    :return: Order details or 404 if not found.
+    """
+    order = OrderRepository(session).get(order_id)
+    if order is None:
+        raise OrderNotFound()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order fetched successfully", {"order": order})
+
+@router.put("/orders/{order_id}", response_model=None, status_code=status.HTTP_200_OK)
+def update_order_status(order_id: int, status_update: str, session: Session = Depends(get_db)):
+    """
+    Update the status of an order.
+    :param order_id: ID of the order to update.
+    :param status_update: The new status.
+    :return: Success message or validation error.
+    """
+    check_status(status_update)
+    # moving to CANCELLED gives the order's stock back in the same transaction
+    WriteQueue.run_write(session, lambda session: OrderRepository(session).set_status(order_id, status_update))
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order status updated successfully", {"order_id": order_id, "new_status": status_update})
+
+@router.delete("/orders/{order_id}", response_model=None, status_code=status.HTTP_200_OK)
+def delete_order(order_id: int, session: Session = Depends(get_db)):
+    """
+    Delete an order if its status is not in terminal states.
+    :param order_id: ID of the order to delete.
+    :return: Success message or validation error.
+    """
+    # an order that still holds stock gives it back
+    WriteQueue.run_write(session, lambda session: OrderRepository(session).delete(order_id))
+    return CommonResponseUtil.create_common_response("SUCCESS", "Order deleted successfully", {"order_id": order_id})
@@ -0,0 +1,98 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from Database import AsyncOrderDb, Idempotency
+from Database.AsyncDbEngine import get_async_db
+from Database.ProductRepository import AsyncProductRepository, ProductNotFound
+from Utils import CommonResponseUtil
+from Modules.Product.model import ProductBO, ProductUpdateBO
+from Apps.Common import run_idempotent_async
+from Apps.Product import ProductRouter
+from Apps.Response.CommonResponse import CommonResponse
+from Apps.Response.Payloads import ProductPagePayload, ProductPayload, ProductSearchPayload, ProductUpdatePayload
+
+'''
+Product endpoints as async handlers on the async engine, for
+OMS_SERVICE_MODE=async. They answer exactly like ProductRouter: the data
+access is the same repository, run on an AsyncSession.
+'''
+
+router = APIRouter()
+
+@router.post("/products", response_model=CommonResponse[ProductPayload], status_code=status.HTTP_201_CREATED)
+async def create_product(
+    product: ProductBO.ProductBO,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: AsyncSession = Depends(get_async_db)
+):
+    async def insert_product(session):
+        return await AsyncProductRepository(session).create(product)
+
+    return await run_idempotent_async(
+        session, "POST /products", idempotency_key, Idempotency.request_fingerprint(product),
+        insert_product, ProductRouter.product_created_response
+    )
+
+# the import streams the body and runs on the sync engine in a worker thread in both modes
+router.add_api_route("/products/import", ProductRouter.import_products, methods=["POST"], response_model=None)
+
+@router.get("/products", response_model=CommonResponse[ProductPagePayload], status_code=status.HTTP_200_OK)
+async def get_products(
+    limit: int = Query(10, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    session: AsyncSession = Depends(get_async_db)
+):
+    """
+    Fetch a page of products ordered by product_id, see ProductRouter.get_products.
+    """
+    after_id = ProductRouter.decode_product_cursor(cursor)
+    products = AsyncProductRepository(session)
+    page = await products.page(limit + 1, offset, after_id)
+    total_count = await products.count() if include_total else None
+    return ProductRouter.product_page_response(page, limit, offset, after_id, total_count)
+
+@router.get("/products/search", response_model=CommonResponse[ProductSearchPayload], status_code=status.HTTP_200_OK)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search products by SKU and name, see ProductRouter.search_products.
+    """
+    after = ProductRouter.decode_search_cursor(cursor, q)
+    hits = await AsyncProductRepository(session).search(q, limit + 1, after)
+    return ProductRouter.product_search_response(hits, q, limit)
+
+# the export streams from its own session on the sync engine in both modes
+router.add_api_route("/products/export", ProductRouter.export_products, methods=["GET"], response_model=None)
+
+@router.get("/products/{product_id}", response_model=CommonResponse[ProductPayload], status_code=status.HTTP_200_OK)
+async def get_product_by_id(product_id: int, session: AsyncSession = Depends(get_async_db)):
+    product = await AsyncProductRepository(session).get(product_id)
+
+    if not product:
+        raise ProductNotFound()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Product fetched successfully", {"product": product})
+
+@router.put("/products/{product_id}", response_model=CommonResponse[ProductUpdatePayload], status_code=status.HTTP_200_OK)
+async def update_product(product_id: int, product: ProductUpdateBO.ProductUpdateBO, session: AsyncSession = Depends(get_async_db)):
+    """
+    Partially update a product, see ProductRouter.update_product.
+    """
+    async def apply_changes(session):
+        return await AsyncProductRepository(session).update(product_id, product.changes())
+
+    return ProductRouter.product_updated_response(await AsyncOrderDb.run_with_retry(session, apply_changes))
+
+@router.delete("/products/{product_id}", status_code=status.HTTP_200_OK)
+async def delete_product(product_id: int, session: AsyncSession = Depends(get_async_db)):
+    async def remove_product(session):
+        await AsyncProductRepository(session).delete(product_id)
+
+    await AsyncOrderDb.run_with_retry(session, remove_product)
+    return CommonResponseUtil.create_common_response("SUCCESS", "Product deleted successfully", {"product_id": product_id})
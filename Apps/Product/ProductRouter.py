@@ -0,0 +1,217 @@
+import io
+import tempfile
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from Database import DataExport, Idempotency, ProductImport, WriteQueue
+from Database.DbEngine import get_db
+from Database.ProductRepository import ProductNotFound, ProductRepository
+from Utils import CommonResponseUtil
+from Utils.Cursor import decode_cursor, encode_cursor
+from Modules.Product.model import ProductBO, ProductUpdateBO
+from Apps.Common import export_response, run_idempotent
+from Apps.Response.CommonResponse import CommonResponse
+from Apps.Response.Payloads import ProductPagePayload, ProductPayload, ProductSearchPayload, ProductUpdatePayload
+
+'''
+Product endpoints on the sync engine.
+
+/products/search and /products/export are declared before
+/products/{product_id}, which would otherwise match them first.
+'''
+
+router = APIRouter()
+
+def decode_product_cursor(cursor: Optional[str]):
+    """
+    Returns the product_id a GET /products cursor continues after, or None without a cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        return int(decode_cursor(cursor)["after"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def product_page_response(products: list, limit: int, offset: int, after_id, total_count):
+    """
+    Builds the GET /products response from a page fetched with one extra row.
+    """
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor({"after": products[-1]["product_id"]})
+
+    response_data = {
+        "products": products,
+        "pagination": {
+            "total_count": total_count,
+            "limit": limit,
+            "offset": offset if after_id is None else None,
+            "next_cursor": next_cursor
+        }
+    }
+    return CommonResponseUtil.create_common_response("SUCCESS", "Products fetched successfully", response_data)
+
+def decode_search_cursor(cursor: Optional[str], query: str):
+    """
+    Returns the (score, product_id) a GET /products/search cursor continues after, or None without a cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        values = decode_cursor(cursor)
+        if values["q"] != query:
+            raise ValueError("Cursor belongs to another query")
+        return float(values["score"]), int(values["after"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def product_search_response(hits: list, query: str, limit: int):
+    """
+    Builds the GET /products/search response from a page fetched with one extra result.
+    """
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        score, product = hits[-1]
+        next_cursor = encode_cursor({"q": query, "score": score, "after": product["product_id"]})
+    response_data = {
+        "products": [product for _, product in hits],
+        "pagination": {"limit": limit, "count": len(hits), "next_cursor": next_cursor}
+    }
+    return CommonResponseUtil.create_common_response("SUCCESS", "Products found", response_data)
+
+def product_created_response(product: dict):
+    return CommonResponseUtil.create_common_response("SUCCESS", "Product created successfully", {"product": product}, status_code=status.HTTP_201_CREATED)
+
+def product_updated_response(result):
+    product, updated_fields = result
+    message = "Product updated successfully" if updated_fields else "Product already up to date"
+    return CommonResponseUtil.create_common_response("SUCCESS", message, {"product": product, "updated_fields": updated_fields})
+
+@router.post("/products", response_model=CommonResponse[ProductPayload], status_code=status.HTTP_201_CREATED)
+def create_product(
+    product: ProductBO.ProductBO,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: Session = Depends(get_db)
+):
+    return run_idempotent(
+        session, "POST /products", idempotency_key, Idempotency.request_fingerprint(product),
+        lambda session: ProductRepository(session).create(product), product_created_response
+    )
+
+# request bodies larger than this are spooled to a temporary file during an import
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+@router.post("/products/import", response_model=None, status_code=status.HTTP_200_OK)
+async def import_products(
+    request: Request,
+    input_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(1000, ge=1, le=50000)
+):
+    """
+    Bulk upsert products by SKU from a CSV (with header row) or NDJSON request body.
+    :param input_format: 'csv' or 'ndjson'.
+    :param batch_size: Number of rows committed per transaction.
+    :return: Row totals and per-row errors; invalid rows do not abort the import.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        # every batch drops the product cache and the product count when it commits
+        report = await run_in_threadpool(ProductImport.import_products, lines, input_format, batch_size)
+        lines.detach()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Products imported", {"import": report.to_dict()})
+
+@router.get("/products", response_model=CommonResponse[ProductPagePayload], status_code=status.HTTP_200_OK)
+def get_products(
+    limit: int = Query(10, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    session: Session = Depends(get_db)
+):
+    """
+    Fetch a page of products ordered by product_id.
+    :param limit: Page size.
+    :param offset: Legacy offset pagination, ignored when a cursor is given.
+    :param cursor: next_cursor from the previous page; pages through by product_id without OFFSET scans.
+    :param include_total: Include total_count (served from a short-lived cache); false skips counting.
+    :return: Products and a pagination block with next_cursor (null on the last page).
+    """
+    after_id = decode_product_cursor(cursor)
+    products = ProductRepository(session)
+    # fetch one extra row to learn whether another page exists
+    page = products.page(limit + 1, offset, after_id)
+    return product_page_response(page, limit, offset, after_id, products.count() if include_total else None)
+
+@router.get("/products/search", response_model=CommonResponse[ProductSearchPayload], status_code=status.HTTP_200_OK)
+def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_db)
+):
+    """
+    Search products by SKU and name. Every word of the query must start a word of the SKU or name,
+    so partial input such as "red sh" already matches "Red Shoes".
+    :param q: The search query.
+    :param limit: Page size.
+    :param cursor: next_cursor from the previous page of the same query.
+    :return: Matching products, best first, and a pagination block with next_cursor (null on the last page).
+    """
+    after = decode_search_cursor(cursor, q)
+    # fetch one extra result to learn whether another page exists
+    return product_search_response(ProductRepository(session).search(q, limit + 1, after), q, limit)
+
+@router.get("/products/export", response_model=None, status_code=status.HTTP_200_OK)
+def export_products(
+    output_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    compress: bool = Query(False, alias="gzip"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """
+    Export all products, or those created in a date range, as one CSV or NDJSON download.
+    The rows are streamed as they are read, so the export never holds the catalog in memory.
+    :param output_format: 'csv' (with a header row) or 'ndjson'.
+    :param compress: gzip the download.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    :return: The products by product_id.
+    """
+    chunks = DataExport.export_products(output_format, compress, created_from, created_to)
+    return export_response(chunks, "products", output_format, compress)
+
+@router.get("/products/{product_id}", response_model=CommonResponse[ProductPayload], status_code=status.HTTP_200_OK)
+def get_product_by_id(product_id: int, session: Session = Depends(get_db)):
+    product = ProductRepository(session).get(product_id)
+
+    if not product:
+        raise ProductNotFound()
+
+    return CommonResponseUtil.create_common_response("SUCCESS", "Product fetched successfully", {"product": product})
+
+@router.put("/products/{product_id}", response_model=CommonResponse[ProductUpdatePayload], status_code=status.HTTP_200_OK)
+def update_product(product_id: int, product: ProductUpdateBO.ProductUpdateBO, session: Session = Depends(get_db)):
+    """
+    Partially update a product: only the fields sent are applied, and only the columns whose value
+    actually changes are written.
+    :param product_id: ID of the product to update.
+    :param product: The fields to change.
+    :return: The product after the update and the names of the columns that were written.
+    """
+    result = WriteQueue.run_write(session, lambda session: ProductRepository(session).update(product_id, product.changes()))
+    return product_updated_response(result)
+
+# delete product by id
+@router.delete("/products/{product_id}", status_code=status.HTTP_200_OK)
+def delete_product(product_id: int, session: Session = Depends(get_db)):
+    WriteQueue.run_write(session, lambda session: ProductRepository(session).delete(product_id))
+    return CommonResponseUtil.create_common_response("SUCCESS", "Product deleted successfully", {"product_id": product_id})
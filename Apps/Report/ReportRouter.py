@@ -0,0 +1,79 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from Database import Reporting
+from Database.DbEngine import get_db
+from Utils import CommonResponseUtil
+from Utils.OrderStatus import INVALID_STATUS_MESSAGE, is_valid_status
+
+'''
+Sales and inventory reports, read from the rollup tables (see Reporting.py).
+'''
+
+router = APIRouter()
+
+def _report_statuses(status_filter: Optional[List[str]]):
+    if not status_filter:
+        return Reporting.SALES_STATUSES
+    invalid = [value for value in status_filter if not is_valid_status(value)]
+    if invalid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_STATUS_MESSAGE)
+    return tuple(status_filter)
+
+@router.get("/reports/products", response_model=None, status_code=status.HTTP_200_OK)
+def get_product_sales(
+    status_filter: Optional[List[str]] = Query(None, alias="status"),
+    sort: str = Query("revenue", pattern="^(revenue|units)$"),
+    limit: int = Query(100, ge=1, le=10000),
+    session: Session = Depends(get_db)
+):
+    """
+    Orders, units and revenue per product, best sellers first.
+    :param status_filter: Order statuses to count (repeatable); every status except CANCELLED by default.
+    :param sort: revenue or units.
+    :param limit: Number of products returned.
+    :return: One entry per product.
+    """
+    products = Reporting.product_sales(session, _report_statuses(status_filter), sort, limit)
+    return CommonResponseUtil.create_common_response("SUCCESS", "Product sales fetched successfully", {"products": products})
+
+@router.get("/reports/daily", response_model=None, status_code=status.HTTP_200_OK)
+def get_daily_sales(
+    status_filter: Optional[List[str]] = Query(None, alias="status"),
+    day_from: Optional[date] = Query(None, alias="from"),
+    day_to: Optional[date] = Query(None, alias="to"),
+    session: Session = Depends(get_db)
+):
+    """
+    Orders, units and revenue per day the orders were placed.
+    :param status_filter: Order statuses to count (repeatable); every status except CANCELLED by default.
+    :param day_from: Inclusive first day.
+    :param day_to: Inclusive last day.
+    :return: One entry per day with orders, oldest first.
+    """
+    days = Reporting.daily_sales(session, _report_statuses(status_filter), day_from, day_to)
+    return CommonResponseUtil.create_common_response("SUCCESS", "Daily sales fetched successfully", {"days": days})
+
+@router.get("/reports/status", response_model=None, status_code=status.HTTP_200_OK)
+def get_status_totals(session: Session = Depends(get_db)):
+    """
+    Orders, units and value of the orders currently in each status.
+    :return: One entry per status with orders.
+    """
+    return CommonResponseUtil.create_common_response("SUCCESS", "Status totals fetched successfully", {"statuses": Reporting.status_totals(session)})
+
+@router.get("/reports/low-stock", response_model=None, status_code=status.HTTP_200_OK)
+def get_low_stock(
+    threshold: int = Query(10, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    session: Session = Depends(get_db)
+):
+    """
+    Products running out of stock.
+    :param threshold: Highest stock quantity reported.
+    :param limit: Number of products returned.
+    :return: Products with at most threshold units left, emptiest first, with the units sold so far.
+    """
+    products = Reporting.low_stock(session, threshold, limit)
+    return CommonResponseUtil.create_common_response("SUCCESS", "Low stock products fetched successfully", {"products": products})
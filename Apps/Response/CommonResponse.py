@@ -1,16 +1,14 @@
-class CommonResponse:
+from typing import Generic, TypeVar
+from pydantic import BaseModel, Field
+
+DataT = TypeVar("DataT")
+
+class CommonResponse(BaseModel, Generic[DataT]):
     """
-    A class to represent a common response structure.
+    The envelope every endpoint answers with.
+    Parametrize it with the payload type, e.g. CommonResponse[ProductPayload], to document the response.
     """
 
-    def __init__(self, status: str, message: str, data: dict = None):
-        """
-        Initializes the CommonResponse with status, message, and optional data.
-
-        :param status: The status of the response (e.g., 'success', 'error').
-        :param message: A message providing additional information about the response.
-        :param data: Optional dictionary containing additional data related to the response.
-        """
-        self.status = status
-        self.message = message
-        self.data = data if data is not None else {}
\ No newline at end of file
+    status: str = Field(..., description="The status of the response (e.g., 'SUCCESS')")
+    message: str = Field(..., description="A message providing additional information about the response")
+    data: DataT = Field(default_factory=dict, description="Payload of the response")
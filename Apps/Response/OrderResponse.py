@@ -1,9 +1,24 @@
 from pydantic import BaseModel, Field, validator
+from typing import List, Optional
 from datetime import date
+from Apps.Response.ProductResponse import ProductResponse
 
 class OrderResponse(BaseModel):
     order_id: int = Field(..., description="Unique identifier for the order")
+    product_id: Optional[int] = Field(..., gt=0, description="Unique identifier for the product; null when the order has several lines")
+    quantity: Optional[int] = Field(..., gt=0, description="Quantity of the product ordered; null when the order has several lines")
+    status: str = Field(..., description="Current status of the order (e.g., PENDING, SHIPPED, DELIVERED, CANCELLED, PAID)")
+    created_at: date = Field(..., description="Date when the order was placed")
+class OrderLineResponse(BaseModel):
+    line_no: int = Field(..., description="Position of the line in the order, from 1")
     product_id: int = Field(..., gt=0, description="Unique identifier for the product")
     quantity: int = Field(..., gt=0, description="Quantity of the product ordered")
+    unit_price: Optional[float] = Field(None, description="Product price when the order was placed")
+    product: Optional[ProductResponse] = Field(None, description="The product as it is now; null if it was deleted")
+
+class MultiLineOrderResponse(BaseModel):
+    order_id: int = Field(..., description="Unique identifier for the order")
     status: str = Field(..., description="Current status of the order (e.g., PENDING, SHIPPED, DELIVERED, CANCELLED, PAID)")
-    created_at: date = Field(..., description="Date when the order was placed")
\ No newline at end of file
+    created_at: date = Field(..., description="Date when the order was placed")
+    total: float = Field(..., description="Sum of quantity * unit_price over the lines")
+    lines: List[OrderLineResponse]
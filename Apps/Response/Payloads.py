@@ -0,0 +1,54 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from Apps.Response.OrderResponse import MultiLineOrderResponse, OrderResponse
+from Apps.Response.ProductResponse import ProductResponse
+
+'''
+Payloads carried in CommonResponse.data. They describe the responses in the
+OpenAPI schema; handlers serialize plain dicts with the same shape.
+'''
+
+class ProductPayload(BaseModel):
+    product: ProductResponse
+
+class ProductUpdatePayload(BaseModel):
+    product: ProductResponse
+    updated_fields: List[str]
+
+class ProductPagination(BaseModel):
+    total_count: Optional[int]
+    limit: int
+    offset: Optional[int]
+    next_cursor: Optional[str]
+
+class ProductPagePayload(BaseModel):
+    products: List[ProductResponse]
+    pagination: ProductPagination
+
+class CursorPagination(BaseModel):
+    limit: int
+    count: int
+    next_cursor: Optional[str]
+
+class ProductSearchPayload(BaseModel):
+    products: List[ProductResponse]
+    pagination: CursorPagination
+
+class OrderPayload(BaseModel):
+    order: OrderResponse
+
+class BatchFailure(BaseModel):
+    line: int
+    product_id: int
+    detail: str
+
+class OrderBatchPayload(BaseModel):
+    orders: List[OrderResponse]
+    failed: List[BatchFailure]
+
+class MultiLineOrderPayload(BaseModel):
+    order: MultiLineOrderResponse
+
+class MultiLineOrderPagePayload(BaseModel):
+    orders: List[MultiLineOrderResponse]
+    pagination: CursorPagination
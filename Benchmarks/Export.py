@@ -0,0 +1,93 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from Benchmarks.Harness import seed_database, use_temporary_database
+
+'''
+Streaming export against paging through the list endpoint.
+
+Seeds a temporary SQLite file, then exports every product the way finance
+used to (GET /products?limit=&offset= until the last page) and through
+GET /products/export, and every order through GET /orders/export. Each
+export is timed over HTTP in-process; the Python memory peak is measured
+by consuming DataExport directly, in CSV, NDJSON and gzipped CSV. The peak
+should not grow with the number of rows.
+
+    python -m Benchmarks.Export --products 100000 --orders 500000
+'''
+
+def _time_paged_products(client, page_size: int) -> dict:
+    start = time.perf_counter()
+    rows = 0
+    offset = 0
+    while True:
+        page = client.get(f"/products?limit={page_size}&offset={offset}").json()["data"]["products"]
+        rows += len(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+    return {"rows": rows, "seconds": round(time.perf_counter() - start, 3)}
+
+def _time_export(client, url: str) -> dict:
+    start = time.perf_counter()
+    response = client.get(url)
+    response.raise_for_status()
+    return {"bytes": len(response.content), "seconds": round(time.perf_counter() - start, 3)}
+
+def _memory_peak(chunks) -> dict:
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"bytes": size, "seconds": round(elapsed, 3), "peak_kib": round(peak / 1024, 1)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the streaming exports with paging through GET /products")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=500000)
+    parser.add_argument("--page-size", type=int, default=1000, help="Page size of the paged product export")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    use_temporary_database("oms-export-")
+
+    from fastapi.testclient import TestClient
+    import App
+    from Database import DataExport
+
+    seed_database(args.products, args.orders)
+    client = TestClient(App.app)
+
+    results = {
+        "products": args.products,
+        "orders": args.orders,
+        "http": {
+            "products_paged": _time_paged_products(client, args.page_size),
+            "products_export": _time_export(client, "/products/export"),
+            "orders_export": _time_export(client, "/orders/export"),
+            "orders_export_gzip": _time_export(client, "/orders/export?gzip=true")
+        },
+        "memory": {
+            "products_csv": _memory_peak(DataExport.export_products("csv")),
+            "orders_csv": _memory_peak(DataExport.export_orders("csv")),
+            "orders_ndjson": _memory_peak(DataExport.export_orders("ndjson")),
+            "orders_csv_gzip": _memory_peak(DataExport.export_orders("csv", compress=True))
+        }
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+'''
+Shared helpers for the benchmarks: a temporary, seeded database, an in-process
+HTTP driver with bounded concurrency, and latency summaries.
+'''
+
+def use_temporary_database(prefix: str = "oms-bench-") -> str:
+    """
+    Points OMS_DATABASE_URL at a new SQLite file in a temporary directory.
+    Must run before the service modules are imported, because they configure the engine on import.
+
+    :return: Path of the database file.
+    """
+    directory = tempfile.mkdtemp(prefix=prefix)
+    path = os.path.join(directory, "bench.db")
+    os.environ["OMS_DATABASE_URL"] = "sqlite:///" + path
+    return path
+
+def seed_database(products: int, orders: int):
+    """
+    Fills the configured database with products SEED-0.. (practically unlimited stock) and PENDING orders.
+    Must run after the service modules are imported.
+    """
+    from sqlalchemy import insert, literal, select
+    from Database import OrderDb, ProductImport, Reporting
+
+    OrderDb.init_database()
+    rows = (
+        json.dumps({"sku": f"SEED-{number}", "product_name": f"Seed product {number}", "price": 10.0 + number % 90,
+                    "stock_quantity": 10 ** 9, "created_at": "2025-01-01"})
+        for number in range(products)
+    )
+    ProductImport.import_products(rows, "ndjson", batch_size=5000)
+
+    session = OrderDb.get_database_session()
+    try:
+        for start in range(0, orders, 5000):
+            session.execute(insert(OrderDb.Order), [
+                {"product_id": 1 + number % products, "quantity": 1, "status": "PENDING",
+                 "created_at": datetime(2025, 1, 1 + number % 28)}
+                for number in range(start, min(orders, start + 5000))
+            ])
+            session.commit()
+        # the raw inserts bypass the order lines and the rollups
+        Order = OrderDb.Order
+        session.execute(insert(OrderDb.OrderLine).from_select(
+            ["order_id", "line_no", "product_id", "quantity", "unit_price"],
+            select(Order.order_id, literal(1), Order.product_id, Order.quantity, Order.unit_price)
+        ))
+        Reporting.rebuild(session)
+        session.commit()
+    finally:
+        session.close()
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list, elapsed: float, errors: int = 0) -> dict:
+    """
+    Latency percentiles in milliseconds and throughput of one run.
+
+    :param latencies: Per-request latencies in seconds.
+    :param elapsed: Wall-clock duration of the run in seconds.
+    :param errors: Number of requests that returned an unexpected status.
+    """
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
+
+async def drive(app, make_request, total: int, concurrency: int, expected=(200, 201)) -> dict:
+    """
+    Sends total requests to an ASGI app in-process, at most concurrency at a time.
+
+    :param app: ASGI application.
+    :param make_request: Callable taking the request number and returning (method, url, json body or None).
+    :param total: Number of requests.
+    :param concurrency: Requests in flight at once.
+    :param expected: Status codes counted as success.
+    :return: summarize() of the run.
+    """
+    import httpx
+
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for number in counter:
+                method, url, body = make_request(number)
+                start = time.perf_counter()
+                response = await client.request(method, url, json=body)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code not in expected:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, errors)
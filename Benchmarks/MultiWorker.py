@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Multi-worker correctness check.
+
+Starts the service with several worker processes against one SQLite file,
+the way it is deployed, and drives it over HTTP:
+
+1. concurrent single-unit orders, more than there is stock, spread over the workers,
+2. every worker caches the product and the product count (many reads on
+   fresh connections), then a few orders are cancelled, giving stock back,
+   and a second product is created, each change made by whichever worker
+   accepts the connection,
+3. reads on fresh connections once the cache bus had time to deliver: every
+   worker must answer with the stock and the product count in the database,
+4. the file sink must hold each order.created event exactly once, although
+   every worker runs an outbox dispatcher.
+
+The run fails (exit code 1) on oversell, on a mismatch between accepted
+orders, stored orders and stock, on a stale read or on a lost or duplicated
+event.
+
+    python -m Benchmarks.MultiWorker --workers 4 --orders 2000 --stock 500
+    python -m Benchmarks.MultiWorker --server uvicorn --no-cache-bus   # shows the stale reads
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def _start_server(server: str, workers: int, port: int, environment: dict, log) -> subprocess.Popen:
+    if server == "gunicorn":
+        # gunicorn.conf.py in the working directory sets up preload and the uvicorn workers
+        command = [sys.executable, "-m", "gunicorn", "App:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "App:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    return subprocess.Popen(command, cwd=ROOT, env=environment, stdout=log, stderr=subprocess.STDOUT)
+
+def _client():
+    import httpx
+    # no keep-alive: every request opens a connection, which any worker may accept.
+    # One client is shared by all threads; building one per request costs more than the request.
+    return httpx.Client(timeout=30.0, limits=httpx.Limits(max_connections=None, max_keepalive_connections=0))
+
+def _wait_until_up(client, base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup, see its log")
+        try:
+            if client.get(base_url + "/products?limit=1").status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not come up")
+
+def _in_parallel(concurrency: int, work, items) -> list:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(work, items))
+
+def _worker_pids(client, base_url: str, requests: int, concurrency: int) -> set:
+    def scrape(_):
+        text = client.get(base_url + "/metrics").text
+        return int(re.search(r"^oms_worker_pid (\d+)", text, re.MULTILINE).group(1))
+    return set(_in_parallel(concurrency, scrape, range(requests)))
+
+def _read_events(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def run(server: str, workers: int, orders: int, stock: int, concurrency: int, cache_bus: bool) -> dict:
+    directory = tempfile.mkdtemp(prefix="oms-workers-")
+    database = os.path.join(directory, "workers.db")
+    events_path = os.path.join(directory, "events.ndjson")
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    environment = dict(
+        os.environ,
+        OMS_DATABASE_URL="sqlite:///" + database,
+        OMS_WORKERS=str(workers),
+        OMS_BIND=f"127.0.0.1:{port}",
+        OMS_CACHE_BUS_ENABLED=str(cache_bus).lower(),
+        OMS_OUTBOX_SINKS="file:" + events_path,
+        OMS_OUTBOX_POLL_INTERVAL="0.2"
+    )
+    reads = 10 * workers
+
+    with open(os.path.join(directory, "server.log"), "wb") as log:
+        process = _start_server(server, workers, port, environment, log)
+        client = _client()
+        try:
+            _wait_until_up(client, base_url, process)
+            response = client.post(base_url + "/products", json={
+                "sku": f"WORKERS-{time.time_ns()}", "product_name": "Multi-worker product",
+                "price": 1.0, "stock_quantity": stock, "created_at": "2025-01-01"
+            })
+            response.raise_for_status()
+            product_id = response.json()["data"]["product"]["product_id"]
+
+            def read_product(_):
+                return client.get(f"{base_url}/products/{product_id}").json()["data"]["product"]["stock_quantity"]
+
+            def read_count(_):
+                return client.get(base_url + "/products?limit=1").json()["data"]["pagination"]["total_count"]
+
+            def place_order(_):
+                response = client.post(base_url + "/orders", json={
+                    "product_id": product_id, "quantity": 1, "status": "PENDING", "created_at": "2025-01-01"
+                })
+                return response.status_code, response.json()["data"]["order"]["order_id"] if response.status_code == 201 else None
+
+            start = time.perf_counter()
+            placed = _in_parallel(concurrency, place_order, range(orders))
+            elapsed = time.perf_counter() - start
+            codes = [code for code, _ in placed]
+            order_ids = [order_id for _, order_id in placed if order_id is not None]
+
+            # every worker caches the product and the product count
+            _in_parallel(concurrency, read_product, range(reads))
+            _in_parallel(concurrency, read_count, range(reads))
+            pids = _worker_pids(client, base_url, reads, concurrency)
+
+            def cancel(order_id):
+                return client.put(f"{base_url}/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code
+            cancelled = _in_parallel(concurrency, cancel, order_ids[:workers]).count(200)
+            client.post(base_url + "/products", json={
+                "sku": f"WORKERS-{time.time_ns()}", "product_name": "Second product",
+                "price": 1.0, "stock_quantity": 1, "created_at": "2025-01-01"
+            }).raise_for_status()
+            # the bus delivers within a poll interval; give it several
+            time.sleep(0.5)
+            stocks = _in_parallel(concurrency, read_product, range(reads))
+            counts = _in_parallel(concurrency, read_count, range(reads))
+
+            accepted = codes.count(201)
+            expected_events = accepted
+            deadline = time.monotonic() + 10.0
+            while time.monotonic() < deadline:
+                created = [event for event in _read_events(events_path) if event["type"] == "order.created"]
+                if len(created) >= expected_events:
+                    break
+                time.sleep(0.2)
+            # give a second dispatcher that should not be delivering the chance to show up
+            time.sleep(1.0)
+            created = [event for event in _read_events(events_path) if event["type"] == "order.created"]
+        finally:
+            client.close()
+            process.terminate()
+            process.wait(timeout=30)
+
+    connection = sqlite3.connect(database)
+    try:
+        remaining = connection.execute('SELECT stock_quantity FROM "Product" WHERE product_id = ?', (product_id,)).fetchone()[0]
+        stored_orders = connection.execute('SELECT COUNT(*) FROM "Order" WHERE product_id = ?', (product_id,)).fetchone()[0]
+        product_count = connection.execute('SELECT COUNT(*) FROM "Product"').fetchone()[0]
+    finally:
+        connection.close()
+
+    event_ids = [event["aggregate_id"] for event in created]
+    return {
+        "server": server,
+        "workers": workers,
+        "workers_seen": len(pids),
+        "cache_bus": cache_bus,
+        "orders": orders,
+        "stock": stock,
+        "accepted": accepted,
+        "cancelled": cancelled,
+        "rejected_insufficient_stock": codes.count(400),
+        "errors": len(codes) - accepted - codes.count(400),
+        "stored_orders": stored_orders,
+        "remaining_stock": remaining,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(orders / elapsed, 1),
+        "stale_stock_reads": sum(1 for value in stocks if value != remaining),
+        "stale_count_reads": sum(1 for value in counts if value != product_count),
+        "events_delivered": len(event_ids),
+        "duplicate_events": len(event_ids) - len(set(event_ids)),
+        "oversold": accepted > stock or remaining < 0,
+        "consistent": stored_orders == accepted and remaining == stock - accepted + cancelled,
+        "log": os.path.join(directory, "server.log")
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent orders and reads against several worker processes")
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn",
+                        help="gunicorn with gunicorn.conf.py (preload), or uvicorn --workers")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=250)
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    parser.add_argument("--cache-bus", action=argparse.BooleanOptionalAction, default=True,
+                        help="Share cache invalidations between the workers")
+    args = parser.parse_args(argv)
+
+    result = run(args.server, args.workers, args.orders, args.stock, args.concurrency, args.cache_bus)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    failures = []
+    if result["oversold"] or not result["consistent"]:
+        failures.append("stock reservation is not consistent")
+    if result["stale_stock_reads"] or result["stale_count_reads"]:
+        failures.append("workers served stale reads")
+    if result["events_delivered"] != result["accepted"] or result["duplicate_events"]:
+        failures.append("order.created events were lost or delivered twice")
+    if failures:
+        print("FAILED: " + "; ".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from Benchmarks.Harness import percentile, use_temporary_database
+
+'''
+Product search on a large catalog.
+
+Seeds a temporary SQLite file with --products products named from a fixed
+vocabulary, some words far more common than others, inserted in batches so
+the product_search triggers index every row as it arrives. Then it times
+each query of QUERIES, from a word most products carry to a term only a few
+match, for the first page and for a page reached through the cursor, and
+compares with the LIKE scan other databases fall back to.
+
+    python -m Benchmarks.ProductSearch --products 1000000 --repeat 50
+'''
+
+ADJECTIVES = ["red", "blue", "green", "black", "white", "steel", "wooden", "leather", "cotton", "organic",
+              "compact", "deluxe", "portable", "vintage", "wireless"]
+NOUNS = ["shoes", "shirt", "lamp", "chair", "table", "kettle", "backpack", "jacket", "speaker", "blender",
+         "notebook", "bottle", "helmet", "watch", "pillow", "router", "camera", "drill", "tent", "scarf"]
+BRANDS = [f"brand{number}" for number in range(500)]
+
+# (label, query): a common word, a common pair, a prefix, a rare brand, a rare brand with a noun, a sku
+QUERIES = [
+    ("common", "red"),
+    ("pair", "red shoes"),
+    ("prefix", "bla"),
+    ("rare", "brand497"),
+    ("rare pair", "brand497 lamp"),
+    ("sku", "SKU-123456"),
+]
+
+def _product_name(rng) -> str:
+    # adjectives and nouns are skewed towards the front of their lists; brands are uniform
+    adjective = ADJECTIVES[min(len(ADJECTIVES) - 1, int(rng.expovariate(0.4)))]
+    noun = NOUNS[min(len(NOUNS) - 1, int(rng.expovariate(0.25)))]
+    return f"{rng.choice(BRANDS)} {adjective} {noun}"
+
+def seed_catalog(products: int, batch_size: int = 10000) -> float:
+    """
+    Inserts products in raw batches, so the time measured is the insert plus the index triggers.
+
+    :return: Seconds spent inserting.
+    """
+    from sqlalchemy import insert
+    from Database import OrderDb
+
+    OrderDb.init_database()
+    rng = random.Random(42)
+    session = OrderDb.get_database_session()
+    elapsed = 0.0
+    try:
+        for start in range(0, products, batch_size):
+            rows = [
+                {"sku": f"SKU-{number}", "product_name": _product_name(rng), "price": 10.0,
+                 "stock_quantity": 100, "created_at": datetime(2025, 1, 1)}
+                for number in range(start, min(products, start + batch_size))
+            ]
+            began = time.perf_counter()
+            session.execute(insert(OrderDb.Product), rows)
+            session.commit()
+            elapsed += time.perf_counter() - began
+    finally:
+        session.close()
+    return elapsed
+
+def _latencies(function, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {"p50_ms": round(percentile(timings, 0.50) * 1000, 3), "p95_ms": round(percentile(timings, 0.95) * 1000, 3)}
+
+def measure(query: str, limit: int, pages: int, repeat: int) -> dict:
+    """
+    Latency of the first page, of the page after pages cursor steps, and of the LIKE scan's first page.
+    """
+    from sqlalchemy import text
+    from Database import OrderDb, ProductSearch
+
+    session = OrderDb.get_database_session()
+    try:
+        matches = session.execute(
+            text("SELECT COUNT(*) FROM product_search WHERE product_search MATCH :match"),
+            {"match": ProductSearch.match_expression(ProductSearch.query_tokens(query))}
+        ).scalar()
+
+        after = None
+        for _ in range(pages):
+            hits = ProductSearch.search(session, query, limit, after)
+            if len(hits) < limit:
+                break
+            after = hits[-1]
+
+        tokens = ProductSearch.query_tokens(query)
+        return {
+            "matches": matches,
+            "first_page": _latencies(lambda: ProductSearch.search(session, query, limit), repeat),
+            "cursor_page": _latencies(lambda: ProductSearch.search(session, query, limit, after), repeat),
+            "like_scan": _latencies(lambda: ProductSearch._like_search(session, tokens, limit), max(1, repeat // 10))
+        }
+    finally:
+        session.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text product search latency on a large catalog")
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20, help="Results per page")
+    parser.add_argument("--pages", type=int, default=5, help="Cursor steps before the measured cursor page")
+    parser.add_argument("--repeat", type=int, default=50, help="Searches per measurement")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    use_temporary_database("oms-search-")
+
+    insert_seconds = seed_catalog(args.products)
+    results = {
+        "products": args.products,
+        "insert_seconds": round(insert_seconds, 1),
+        "inserts_per_second": round(args.products / insert_seconds, 1) if insert_seconds else 0.0,
+        "queries": {}
+    }
+    print(f"inserted {args.products} products in {insert_seconds:.1f} s ({results['inserts_per_second']} per second, index included)")
+
+    for label, query in QUERIES:
+        result = measure(query, args.limit, args.pages, args.repeat)
+        results["queries"][label] = {"query": query, **result}
+        print(f"{label:<10} {query!r:<18} matches {result['matches']:>8}  "
+              f"first p50 {result['first_page']['p50_ms']:>8.3f} p95 {result['first_page']['p95_ms']:>8.3f} ms  "
+              f"cursor p50 {result['cursor_page']['p50_ms']:>8.3f} p95 {result['cursor_page']['p95_ms']:>8.3f} ms  "
+              f"like p50 {result['like_scan']['p50_ms']:>9.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
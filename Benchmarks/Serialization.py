@@ -0,0 +1,116 @@
+import argparse
+import json
+import sys
+import time
+from Benchmarks.Harness import seed_database, use_temporary_database
+
+'''
+Per-request serialization cost of the list and lookup responses.
+
+Each case builds the response body the way the service used to (ORM objects
+or pydantic models wrapped in the untyped CommonResponse class, then
+FastAPI's jsonable_encoder and json.dumps) and the way it does now (column
+tuples turned into dicts and rendered with orjson), reading from the same
+seeded SQLite file. Query time is included, since skipping ORM hydration is
+part of the saving.
+
+    python -m Benchmarks.Serialization --rows 10 100 1000 --repeat 200
+'''
+
+class _LegacyCommonResponse:
+    # the plain envelope class the handlers used to return
+    def __init__(self, status: str, message: str, data: dict = None):
+        self.status = status
+        self.message = message
+        self.data = data if data is not None else {}
+
+def _legacy_render(envelope) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+
+    return JSONResponse(jsonable_encoder(envelope)).body
+
+def _cases(rows: int):
+    from sqlalchemy import select
+    from Apps.Response.OrderResponse import OrderResponse
+    from Database import OrderDb, ProductCache
+    from Utils import CommonResponseUtil
+    from Utils.JsonResponse import dumps, rows_to_dicts
+
+    def products_before(session):
+        products = session.query(OrderDb.Product).order_by(OrderDb.Product.product_id).limit(rows).all()
+        return _legacy_render(_LegacyCommonResponse("SUCCESS", "Products fetched successfully", {"products": products}))
+
+    def products_after(session):
+        result = session.execute(select(*ProductCache.PRODUCT_COLUMNS).order_by(OrderDb.Product.product_id).limit(rows))
+        products = rows_to_dicts(ProductCache.PRODUCT_FIELDS, result)
+        return CommonResponseUtil.create_common_response("SUCCESS", "Products fetched successfully", {"products": products}).body
+
+    def orders_before(session):
+        orders = session.query(OrderDb.Order).order_by(OrderDb.Order.order_id).limit(rows).all()
+        orders = [
+            OrderResponse(order_id=order.order_id, product_id=order.product_id, quantity=order.quantity,
+                          status=order.status, created_at=order.created_at)
+            for order in orders
+        ]
+        return _legacy_render(_LegacyCommonResponse("SUCCESS", "Orders fetched successfully", {"orders": orders}))
+
+    def orders_after(session):
+        result = session.execute(select(*OrderDb.ORDER_COLUMNS).order_by(OrderDb.Order.order_id).limit(rows))
+        return dumps({"status": "SUCCESS", "message": "Orders fetched successfully",
+                      "data": {"orders": [OrderDb.order_to_dict(row) for row in result]}})
+
+    return {
+        "products": (products_before, products_after),
+        "orders": (orders_before, orders_after)
+    }
+
+def _time_per_call(function, session, repeat: int) -> float:
+    function(session)
+    session.expunge_all()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(session)
+        # keep the identity map from turning later iterations into cache hits
+        session.expunge_all()
+    return (time.perf_counter() - start) / repeat
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure response serialization cost before and after the orjson path")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000], help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=200, help="Responses built per measurement")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    use_temporary_database("oms-serialization-")
+
+    from Database import OrderDb
+
+    largest = max(args.rows)
+    seed_database(largest, largest)
+
+    results = {}
+    session = OrderDb.get_database_session()
+    try:
+        for rows in args.rows:
+            for name, (before, after) in _cases(rows).items():
+                assert json.loads(before(session))["data"] == json.loads(after(session))["data"], f"{name} bodies differ"
+                before_us = _time_per_call(before, session, args.repeat) * 1e6
+                after_us = _time_per_call(after, session, args.repeat) * 1e6
+                results[f"{name}:{rows}"] = {
+                    "before_us": round(before_us, 1),
+                    "after_us": round(after_us, 1),
+                    "speedup": round(before_us / after_us, 2) if after_us else 0.0
+                }
+                print(f"{name:<9} rows {rows:>6}  before {before_us:>10.1f} us  after {after_us:>10.1f} us  "
+                      f"x{results[f'{name}:{rows}']['speedup']}")
+    finally:
+        session.close()
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
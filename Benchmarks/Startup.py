@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+'''
+Worker startup time.
+
+Every measurement runs in a fresh interpreter, the way a uvicorn or gunicorn
+worker starts: import App, run the lifespan (migrations, outbox dispatcher),
+serve one GET /products. The phases are timed separately. A second run
+starts several workers at the same time against one database, which is what
+a multi-worker deploy does.
+
+Most of a start is spent importing FastAPI, SQLAlchemy and pydantic. A server
+that preloads the application (gunicorn --preload) pays that once and forks
+its workers afterwards, which is only safe because importing the service
+opens no connection. The preload run measures that: one process imports App,
+then forks the workers, which only run the lifespan and serve. A last probe
+checks that importing the service touches no database file.
+
+    python -m Benchmarks.Startup --runs 5 --workers 8
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import asyncio, json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import App
+imported = time.perf_counter()
+database_created_on_import = os.path.exists({database!r})
+
+async def serve():
+    import httpx
+    app = App.app
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://probe") as client:
+            response = await client.get("/products")
+        response.raise_for_status()
+        return ready, time.perf_counter()
+
+ready, answered = asyncio.run(serve())
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (answered - ready) * 1000,
+    "database_created_on_import": database_created_on_import
+}}))
+"""
+
+_PRELOAD_PROBE = """
+import asyncio, json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import httpx
+import App
+
+async def serve():
+    app = App.app
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://probe") as client:
+            response = await client.get("/products")
+        response.raise_for_status()
+
+imported = time.perf_counter()
+workers = []
+for _ in range({workers}):
+    pid = os.fork()
+    if pid == 0:
+        asyncio.run(serve())
+        os._exit(0)
+    workers.append(pid)
+failed = sum(1 for pid in workers if os.waitpid(pid, 0)[1] != 0)
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "workers_ready_ms": (time.perf_counter() - imported) * 1000,
+    "failed": failed
+}}))
+"""
+
+def _start(database: str, mode: str, probe: str = _PROBE, workers: int = 1) -> subprocess.Popen:
+    environment = dict(os.environ, OMS_DATABASE_URL="sqlite:///" + database, OMS_SERVICE_MODE=mode)
+    return subprocess.Popen(
+        [sys.executable, "-c", probe.format(root=ROOT, database=database, workers=workers)],
+        env=environment, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+
+def _result(process: subprocess.Popen) -> dict:
+    output, errors = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"Probe failed:\n{errors}")
+    return json.loads(output.strip().splitlines()[-1])
+
+def _median(samples: list, key: str) -> float:
+    return round(statistics.median(sample[key] for sample in samples), 1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure worker startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Sequential worker starts to measure")
+    parser.add_argument("--workers", type=int, default=8, help="Workers started at the same time in the concurrent run")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="OMS_SERVICE_MODE of the workers")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="oms-startup-")
+    database = os.path.join(directory, "startup.db")
+
+    # a first start creates the schema and the bytecode caches, as a previous deploy would have
+    first = _result(_start(database, args.mode))
+
+    samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        sample = _result(_start(database, args.mode))
+        sample["process_ms"] = (time.perf_counter() - start) * 1000
+        samples.append(sample)
+
+    start = time.perf_counter()
+    concurrent = [_result(process) for process in [_start(database, args.mode) for _ in range(args.workers)]]
+    concurrent_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    preloaded = _result(_start(database, args.mode, _PRELOAD_PROBE, args.workers))
+    preloaded_ms = (time.perf_counter() - start) * 1000
+    if preloaded["failed"]:
+        raise RuntimeError(f"{preloaded['failed']} forked workers failed")
+
+    fresh = _result(_start(os.path.join(directory, "untouched.db"), args.mode))
+
+    results = {
+        "mode": args.mode,
+        "first_start_ms": round(first["import_ms"] + first["startup_ms"] + first["first_request_ms"], 1),
+        "import_ms": _median(samples, "import_ms"),
+        "startup_ms": _median(samples, "startup_ms"),
+        "first_request_ms": _median(samples, "first_request_ms"),
+        "process_ms": _median(samples, "process_ms"),
+        "workers": args.workers,
+        "all_workers_ready_ms": round(concurrent_ms, 1),
+        "slowest_worker_startup_ms": round(max(sample["startup_ms"] for sample in concurrent), 1),
+        "preloaded_workers_ready_ms": round(preloaded_ms, 1),
+        "preloaded_fork_to_ready_ms": round(preloaded["workers_ready_ms"], 1),
+        "database_created_on_import": fresh["database_created_on_import"]
+    }
+    print(f"first start (creates schema)  {results['first_start_ms']:>8.1f} ms")
+    print(f"import App                    {results['import_ms']:>8.1f} ms")
+    print(f"lifespan startup              {results['startup_ms']:>8.1f} ms")
+    print(f"first request                 {results['first_request_ms']:>8.1f} ms")
+    print(f"whole process                 {results['process_ms']:>8.1f} ms")
+    print(f"{args.workers} workers at once          {results['all_workers_ready_ms']:>8.1f} ms  "
+          f"(slowest lifespan {results['slowest_worker_startup_ms']} ms)")
+    print(f"{args.workers} workers forked after preload {results['preloaded_workers_ready_ms']:>8.1f} ms  "
+          f"(fork to all ready {results['preloaded_fork_to_ready_ms']} ms)")
+    print(f"database created on import    {results['database_created_on_import']}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Concurrency stress check for stock reservation.
+
+Many threads place single-unit orders against one product whose stock is
+smaller than the number of orders. The run fails (exit code 1) if more
+orders succeed than there was stock, or if the remaining stock does not
+match the orders that were accepted.
+
+    python -m Benchmarks.StockStress --threads 32 --orders 2000 --stock 500
+'''
+
+def run(threads: int, orders: int, stock: int) -> dict:
+    # the engine is configured from the environment when the service is imported
+    from fastapi.testclient import TestClient
+    import App
+    from Database import OrderDb
+
+    OrderDb.init_database()
+    client = TestClient(App.app)
+    response = client.post("/products", json={
+        "sku": f"STRESS-{time.time_ns()}",
+        "product_name": "Stress test product",
+        "price": 1.0,
+        "stock_quantity": stock,
+        "created_at": "2025-01-01"
+    })
+    response.raise_for_status()
+    product_id = response.json()["data"]["product"]["product_id"]
+
+    def place_order(_):
+        return client.post("/orders", json={
+            "product_id": product_id,
+            "quantity": 1,
+            "status": "PENDING",
+            "created_at": "2025-01-01"
+        }).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        codes = list(pool.map(place_order, range(orders)))
+    elapsed = time.perf_counter() - start
+
+    session = OrderDb.get_database_session()
+    try:
+        remaining = session.get(OrderDb.Product, product_id).stock_quantity
+        stored_orders = session.query(OrderDb.Order).filter(OrderDb.Order.product_id == product_id).count()
+    finally:
+        session.close()
+
+    accepted = codes.count(201)
+    return {
+        "threads": threads,
+        "orders": orders,
+        "stock": stock,
+        "accepted": accepted,
+        "rejected_insufficient_stock": codes.count(400),
+        "errors": len(codes) - accepted - codes.count(400),
+        "stored_orders": stored_orders,
+        "remaining_stock": remaining,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(orders / elapsed, 1),
+        "oversold": accepted > stock or remaining < 0,
+        "consistent": stored_orders == accepted and remaining == stock - accepted
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent order placement against a single product")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=250)
+    parser.add_argument("--database-url", help="Database to run against, defaults to a temporary SQLite file")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["OMS_DATABASE_URL"] = args.database_url
+    else:
+        directory = tempfile.mkdtemp(prefix="oms-stress-")
+        os.environ["OMS_DATABASE_URL"] = "sqlite:///" + os.path.join(directory, "stress.db")
+    os.environ.setdefault("OMS_MAX_OVERFLOW", str(args.threads))
+
+    result = run(args.threads, args.orders, args.stock)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    if result["oversold"] or not result["consistent"]:
+        print("FAILED: stock reservation is not consistent", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
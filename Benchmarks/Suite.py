@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from datetime import datetime, timezone
+from Benchmarks.Harness import drive, seed_database, use_temporary_database
+
+'''
+Reproducible benchmark suite for the product and order endpoints.
+
+Runs offline against a temporary SQLite file seeded with a configurable
+dataset, drives every scenario in-process with the given concurrency and
+reports p50/p95/p99 latency and requests/second. Results are written as JSON
+together with the commit they were measured on, so two runs can be compared:
+
+    python -m Benchmarks.Suite run --products 10000 --orders 20000 --concurrency 32 --output-dir bench-results
+    python -m Benchmarks.Suite compare bench-results/before.json bench-results/after.json
+'''
+
+SCENARIOS = ("create_product", "get_products", "get_product_by_id", "create_order", "update_order_status")
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _scenario_requests(name: str, products: int, orders: int, run_id: str):
+    if name == "create_product":
+        return lambda number: ("POST", "/products", {
+            "sku": f"RUN-{run_id}-{number}", "product_name": f"Product {number}", "price": 19.99,
+            "stock_quantity": 100, "created_at": "2025-01-01"
+        })
+    if name == "get_products":
+        return lambda number: ("GET", f"/products?limit=50&offset={random.randrange(max(1, products - 50))}", None)
+    if name == "get_product_by_id":
+        return lambda number: ("GET", f"/products/{random.randint(1, products)}", None)
+    if name == "create_order":
+        return lambda number: ("POST", "/orders", {
+            "product_id": random.randint(1, products), "quantity": 1, "status": "PENDING", "created_at": "2025-01-01"
+        })
+    if name == "update_order_status":
+        # each request moves a different seeded order from PENDING to PAID
+        return lambda number: ("PUT", f"/orders/{1 + number % orders}?status_update=PAID", None)
+    raise ValueError(f"Unknown scenario {name!r}")
+
+def run(args) -> dict:
+    if args.database_url:
+        os.environ["OMS_DATABASE_URL"] = args.database_url
+    else:
+        use_temporary_database("oms-suite-")
+    if args.no_cache:
+        os.environ["OMS_PRODUCT_CACHE_BACKEND"] = "none"
+    os.environ.setdefault("OMS_MAX_OVERFLOW", str(args.concurrency))
+
+    import App
+
+    random.seed(args.seed)
+    seed_database(args.products, args.orders)
+
+    scenarios = args.scenarios or list(SCENARIOS)
+    results = {}
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    for name in scenarios:
+        requests = min(args.requests, args.orders) if name == "update_order_status" else args.requests
+        results[name] = asyncio.run(drive(
+            App.app, _scenario_requests(name, args.products, args.orders, run_id), requests, args.concurrency
+        ))
+        print(f"{name:<22} {results[name]['requests_per_second']:>10} req/s  "
+              f"p50 {results[name]['p50_ms']:>8} ms  p95 {results[name]['p95_ms']:>8} ms  "
+              f"p99 {results[name]['p99_ms']:>8} ms  errors {results[name]['errors']}")
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "products": args.products,
+            "orders": args.orders,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "cache": not args.no_cache,
+            "service_mode": os.environ.get("OMS_SERVICE_MODE", "sync")
+        },
+        "scenarios": results
+    }
+
+def compare(baseline: dict, candidate: dict) -> list:
+    """
+    Per-scenario relative change of throughput and latency percentiles between two runs.
+
+    :return: Rows of (scenario, metric, baseline, candidate, change in percent).
+    """
+    rows = []
+    for name, before in baseline["scenarios"].items():
+        after = candidate["scenarios"].get(name)
+        if after is None:
+            continue
+        for metric in ("requests_per_second", "p50_ms", "p95_ms", "p99_ms"):
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            rows.append((name, metric, before[metric], after[metric], round(change, 1)))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite for the product and order endpoints")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runner = commands.add_parser("run", help="Run the suite against a temporary database")
+    runner.add_argument("--products", type=int, default=5000, help="Products seeded before the run")
+    runner.add_argument("--orders", type=int, default=5000, help="Orders seeded before the run")
+    runner.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    runner.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    runner.add_argument("--scenarios", nargs="*", choices=SCENARIOS, help="Scenarios to run, all by default")
+    runner.add_argument("--seed", type=int, default=42, help="Random seed for request generation")
+    runner.add_argument("--no-cache", action="store_true", help="Disable the product cache")
+    runner.add_argument("--database-url", help="Run against this database instead of a temporary SQLite file")
+    runner.add_argument("--output", help="Write the results to this JSON file")
+    runner.add_argument("--output-dir", help="Write the results to <timestamp>-<commit>.json in this directory")
+
+    comparer = commands.add_parser("compare", help="Compare two result files")
+    comparer.add_argument("baseline")
+    comparer.add_argument("candidate")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as baseline, open(args.candidate) as candidate:
+            rows = compare(json.load(baseline), json.load(candidate))
+        for name, metric, before, after, change in rows:
+            print(f"{name:<22} {metric:<20} {before:>12} {after:>12} {change:>+8}%")
+        return 0
+
+    result = run(args)
+    paths = [args.output] if args.output else []
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        paths.append(os.path.join(args.output_dir, f"{stamp}-{result['commit']}.json"))
+    for path in paths:
+        with open(path, "w") as output:
+            json.dump(result, output, indent=2)
+        print(f"results written to {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from Benchmarks.Harness import drive, use_temporary_database
+
+'''
+Throughput of the sync and async request paths on the same workload.
+
+Both applications are driven in-process over ASGI with the same mix of
+product reads and order writes against the same temporary SQLite file. The
+product cache is off by default so every request reaches the database.
+
+    python -m Benchmarks.SyncVsAsync --requests 2000 --concurrency 64
+'''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare sync and async request paths")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight at once")
+    parser.add_argument("--products", type=int, default=200, help="Products seeded before the run")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of requests that place an order")
+    parser.add_argument("--cache", action="store_true", help="Keep the product cache enabled")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    use_temporary_database("oms-sync-async-")
+    if not args.cache:
+        os.environ["OMS_PRODUCT_CACHE_BACKEND"] = "none"
+    os.environ.setdefault("OMS_MAX_OVERFLOW", str(args.concurrency))
+
+    import App
+    from Database import OrderDb, ProductImport
+
+    OrderDb.init_database()
+    rows = (
+        json.dumps({"sku": f"BENCH-{number}", "product_name": f"Product {number}", "price": 9.99,
+                    "stock_quantity": 10 ** 9, "created_at": "2025-01-01"})
+        for number in range(args.products)
+    )
+    ProductImport.import_products(rows, "ndjson", batch_size=1000)
+
+    def make_request(number):
+        product_id = random.randint(1, args.products)
+        if random.random() < args.write_ratio:
+            return "POST", "/orders", {"product_id": product_id, "quantity": 1, "status": "PENDING", "created_at": "2025-01-01"}
+        return "GET", f"/products/{product_id}", None
+
+    results = {"config": vars(args)}
+    for mode in ("sync", "async"):
+        app = App.create_app(mode)
+        random.seed(42)
+        results[mode] = asyncio.run(drive(app, make_request, args.requests, args.concurrency))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
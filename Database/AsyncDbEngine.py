@@ -0,0 +1,74 @@
+import threading
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from Database.SqliteProfile import apply_profile
+from Utils.Settings import get_settings
+
+'''
+Async counterpart of Database/DbEngine.py: one async engine and session factory
+for the process, used by the async request path (the Async* routers). Like
+the sync engine it is created on first use.
+'''
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(settings=None) -> str:
+    """
+    Returns the async URL from the settings, deriving it from database_url when not set.
+    """
+    settings = settings or get_settings()
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend!r}, set OMS_ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def build_async_engine(settings=None):
+    """
+    Creates an async engine with the pool configured from the settings.
+    """
+    settings = settings or get_settings()
+    url = async_database_url(settings)
+    engine = create_async_engine(
+        url,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping
+    )
+    if make_url(url).get_backend_name() == "sqlite":
+        apply_profile(engine.sync_engine, settings)
+    return engine
+
+_async_engine = None
+_async_engine_lock = threading.Lock()
+# objects stay usable after commit without another round trip to reload them
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
+
+def get_async_engine():
+    """
+    Returns the process-wide async engine, creating it on first use.
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                engine = build_async_engine()
+                AsyncSessionLocal.configure(bind=engine)
+                _async_engine = engine
+    return _async_engine
+
+async def get_async_db():
+    """
+    FastAPI dependency yielding an async session that lives for the duration of the request.
+    """
+    if _async_engine is None:
+        get_async_engine()
+    async with AsyncSessionLocal() as session:
+        yield session
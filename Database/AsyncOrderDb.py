@@ -0,0 +1,32 @@
+import asyncio
+from sqlalchemy.exc import OperationalError
+from Database.StockReservation import busy_retry_delay, is_database_busy
+from Utils.Settings import get_settings
+
+'''
+Transaction runner for the async request path. The data access itself lives
+in the repositories (ProductRepository.py, OrderRepository.py), which serve
+both paths.
+'''
+
+async def run_with_retry(session, work, attempts: int = None, backoff: float = None):
+    """
+    Async counterpart of StockReservation.run_with_retry: awaits work(session) and commits,
+    retrying the whole transaction when the database is busy.
+    """
+    settings = get_settings()
+    attempts = attempts or settings.busy_retry_attempts
+    backoff = settings.busy_retry_backoff if backoff is None else backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            result = await work(session)
+            await session.commit()
+            return result
+        except OperationalError as e:
+            await session.rollback()
+            if attempt == attempts or not is_database_busy(e):
+                raise
+            await asyncio.sleep(busy_retry_delay(attempt, backoff))
+        except Exception:
+            await session.rollback()
+            raise
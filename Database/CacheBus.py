@@ -0,0 +1,202 @@
+import logging
+import os
+import socket
+import threading
+import time
+import orjson
+from sqlalchemy import delete, func, insert, select
+from Database.DbEngine import get_database_session
+from Database.OrderDb import CacheInvalidation
+from Utils.Settings import get_settings
+
+'''
+Cache invalidation shared between worker processes.
+
+Every worker keeps its own product cache and product count. When a worker
+commits a product change it drops its own entries right away, but the other
+workers would keep serving the old values until their TTL runs out. With
+cache_bus_enabled, the committing transaction also inserts one row into
+cache_invalidation listing the products it changed, so the message exists
+exactly when the change committed. Each worker polls the table every
+cache_bus_poll_interval seconds and drops the entries named by the other
+workers' messages; a write is therefore visible in every worker within about
+one poll interval.
+
+A worker that could not read the bus for longer than cache_bus_retention
+may have missed messages that were already purged, and drops its whole cache.
+'''
+
+logger = logging.getLogger(__name__)
+
+_origin = {"pid": None, "name": None}
+
+def enabled() -> bool:
+    return get_settings().cache_bus_enabled
+
+def origin() -> str:
+    """
+    Identifies this process in the messages it publishes; changes after a fork.
+    """
+    pid = os.getpid()
+    if _origin["pid"] != pid:
+        _origin["pid"], _origin["name"] = pid, f"{socket.gethostname()}:{pid}"
+    return _origin["name"]
+
+def publish(session, product_ids=(), listing: bool = False, everything: bool = False):
+    """
+    Inserts an invalidation message in the session's transaction. Does not commit.
+
+    :param product_ids: Products whose cached entries are stale.
+    :param listing: Products were created or deleted, so cached pages and the product count are stale.
+    :param everything: Drop every cached product, e.g. after a bulk import.
+    """
+    session.execute(insert(CacheInvalidation).values(
+        product_ids=orjson.dumps(sorted(product_ids)).decode(),
+        listing=listing,
+        everything=everything,
+        origin=origin(),
+        created_at=time.time()
+    ))
+
+def _apply(messages: list):
+    # imported here because Database.ProductCache publishes through this module
+    from Database import ProductCache
+    product_ids, listing, everything = set(), False, False
+    for message in messages:
+        product_ids.update(orjson.loads(message.product_ids))
+        listing = listing or message.listing
+        everything = everything or message.everything
+    if everything:
+        ProductCache.invalidate_all()
+    elif product_ids or listing:
+        ProductCache.invalidate_products(*product_ids, listing=listing)
+
+class CacheBusListener:
+    """
+    Thread applying the invalidations published by the other processes.
+    """
+
+    def __init__(self, poll_interval: float = 0.05, retention: float = 60.0, batch_size: int = 1000, session_factory=get_database_session):
+        """
+        :param poll_interval: Seconds between reads of the bus.
+        :param retention: Seconds messages are kept before the listener purges them.
+        :param batch_size: Most messages read at once.
+        :param session_factory: Creates the sessions used to read and purge the bus.
+        """
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.last_seq = 0
+        self.applied = 0
+        self.resets = 0
+        self._last_read = 0.0
+        self._last_purge = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        session = self.session_factory()
+        try:
+            # the cache of a starting process is empty, older messages are of no use to it
+            self.last_seq = session.execute(select(func.max(CacheInvalidation.seq))).scalar() or 0
+        finally:
+            session.close()
+        self._last_read = self._last_purge = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self) -> int:
+        """
+        Reads and applies the messages published since the last poll.
+
+        :return: Number of messages read, including this process's own.
+        """
+        session = self.session_factory()
+        try:
+            messages = session.execute(
+                select(CacheInvalidation)
+                .where(CacheInvalidation.seq > self.last_seq)
+                .order_by(CacheInvalidation.seq)
+                .limit(self.batch_size)
+            ).scalars().all()
+        finally:
+            session.close()
+        now = time.monotonic()
+        if now - self._last_read > self.retention:
+            # messages we never saw may have been purged already
+            from Database import ProductCache
+            ProductCache.invalidate_all()
+            self.resets += 1
+        self._last_read = now
+        if not messages:
+            return 0
+        self.last_seq = messages[-1].seq
+        own = origin()
+        foreign = [message for message in messages if message.origin != own]
+        if foreign:
+            _apply(foreign)
+            self.applied += len(foreign)
+        return len(messages)
+
+    def purge(self) -> int:
+        # imported here because Database.WriteQueue imports Database.ProductCache, which publishes through this module
+        from Database import WriteQueue
+        cutoff = time.time() - self.retention
+        session = self.session_factory()
+        try:
+            return WriteQueue.run_write(
+                session, lambda writer: writer.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < cutoff)).rowcount
+            )
+        finally:
+            session.close()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                while self.poll() == self.batch_size:
+                    pass
+                if time.monotonic() - self._last_purge > self.retention:
+                    self._last_purge = time.monotonic()
+                    self.purge()
+            except Exception:
+                # e.g. the database is busy; the next poll catches up
+                logger.exception("Reading the cache invalidation bus failed")
+
+    def stats(self) -> dict:
+        return {
+            "last_seq": self.last_seq,
+            "applied": self.applied,
+            "resets": self.resets,
+            "poll_interval": self.poll_interval
+        }
+
+_listener = None
+
+def start_listener():
+    """
+    Starts this process's listener when cache_bus_enabled is set. Called from the app lifespan, in every worker.
+    """
+    global _listener
+    if _listener is not None or not enabled():
+        return _listener
+    settings = get_settings()
+    listener = CacheBusListener(settings.cache_bus_poll_interval, settings.cache_bus_retention)
+    listener.start()
+    _listener = listener
+    return listener
+
+def stop_listener():
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+def bus_stats() -> dict:
+    return _listener.stats() if _listener is not None else {"enabled": False}
@@ -0,0 +1,196 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import func, select
+from Database.OrderDb import Order, OrderArchive, OrderLine, OrderLineArchive, Product, get_database_session
+from Database.ProductCache import PRODUCT_COLUMNS, PRODUCT_FIELDS
+from Utils.JsonResponse import dumps
+
+'''
+Streaming export of orders and products as CSV or NDJSON.
+
+Rows are read through a server-side cursor (yield_per), EXPORT_CHUNK_ROWS
+at a time, rendered to bytes and handed on chunk by chunk, optionally
+through a gzip compressor. Nothing holds more than one chunk, so memory stays
+flat however many rows are exported, and no page is counted or skipped with
+OFFSET. An export reads in one explicit read transaction (REPEATABLE READ
+outside SQLite), so all of its queries, e.g. archived and live orders, see
+one snapshot of the database; in WAL mode, writers are not blocked by it.
+
+Orders are exported one row per order line, so multi-line orders are
+complete. Lines placed before unit_price was recorded are valued at the
+current product price, as in the sales rollups.
+'''
+
+FORMATS = ("csv", "ndjson")
+
+# rows fetched from the cursor and rendered per chunk
+EXPORT_CHUNK_ROWS = 1000
+
+ORDER_EXPORT_FIELDS = ("order_id", "status", "created_at", "line_no", "product_id", "quantity", "unit_price")
+PRODUCT_EXPORT_FIELDS = PRODUCT_FIELDS
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _order_lines_statement(header, line, status=None, created_from=None, created_to=None):
+    unit_price = func.coalesce(line.unit_price, select(Product.price).where(Product.product_id == line.product_id).scalar_subquery())
+    statement = (
+        select(header.order_id, header.status, header.created_at, line.line_no, line.product_id, line.quantity, unit_price)
+        .join(line, line.order_id == header.order_id)
+    )
+    if status is not None:
+        statement = statement.where(header.status == status)
+    if created_from is not None:
+        statement = statement.where(header.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(header.created_at < created_to)
+    return statement.order_by(header.order_id, line.line_no)
+
+def order_rows(session, status=None, created_from=None, created_to=None, include_archived=False):
+    """
+    Yields one tuple of ORDER_EXPORT_FIELDS per order line, by order_id.
+
+    :param session: Session to read with.
+    :param status: Only orders with this status.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    :param include_archived: Export the archived orders too, before the live ones.
+    """
+    tables = [(OrderArchive, OrderLineArchive)] if include_archived else []
+    tables.append((Order, OrderLine))
+    for header, line in tables:
+        statement = _order_lines_statement(header, line, status, created_from, created_to)
+        for order_id, order_status, created_at, *values in session.execute(statement, execution_options={"yield_per": EXPORT_CHUNK_ROWS}):
+            # orders are dated, the time part is always midnight
+            yield (order_id, order_status, created_at.date() if isinstance(created_at, datetime) else created_at, *values)
+
+def product_rows(session, created_from=None, created_to=None):
+    """
+    Yields one tuple of PRODUCT_EXPORT_FIELDS per product, by product_id.
+
+    :param session: Session to read with.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    """
+    statement = select(*PRODUCT_COLUMNS)
+    if created_from is not None:
+        statement = statement.where(Product.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(Product.created_at < created_to)
+    for *values, created_at in session.execute(statement.order_by(Product.product_id), execution_options={"yield_per": EXPORT_CHUNK_ROWS}):
+        # dated as in the API, see ProductCache.product_to_dict
+        yield (*values, created_at.date() if isinstance(created_at, datetime) else created_at)
+
+# columns CSV writes with isoformat(), as JSON does; str() of a datetime has a space instead of the T
+TIMESTAMP_FIELDS = frozenset({"created_at"})
+
+def _batches(rows):
+    rows = iter(rows)
+    while batch := list(islice(rows, EXPORT_CHUNK_ROWS)):
+        yield batch
+
+def render(rows, fields, output_format: str):
+    """
+    Renders rows as CSV (with a header row) or NDJSON, one bytes chunk per EXPORT_CHUNK_ROWS rows.
+
+    :param rows: Iterable of tuples with one value per field.
+    :param fields: Column names.
+    :param output_format: 'csv' or 'ndjson'.
+    """
+    if output_format == "csv":
+        stamps = [index for index, field in enumerate(fields) if field in TIMESTAMP_FIELDS]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for batch in _batches(rows):
+            if stamps:
+                batch = [list(row) for row in batch]
+                for row in batch:
+                    for index in stamps:
+                        if row[index] is not None:
+                            row[index] = row[index].isoformat()
+            writer.writerows(batch)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # the header of an empty export
+            yield buffer.getvalue().encode("utf-8")
+    elif output_format == "ndjson":
+        for batch in _batches(rows):
+            yield b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in batch)
+    else:
+        raise ValueError(f"Unsupported format {output_format!r}, must be one of {FORMATS}")
+
+def gzip_chunks(chunks, level: int = 6):
+    """
+    Compresses a stream of bytes chunks into one gzip member, without buffering the whole stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def _export(read_rows, fields, output_format: str, compress: bool, session_factory):
+    if output_format not in FORMATS:
+        raise ValueError(f"Unsupported format {output_format!r}, must be one of {FORMATS}")
+    return _stream(read_rows, fields, output_format, compress, session_factory)
+
+def _begin_snapshot(session):
+    if session.get_bind().dialect.name == "sqlite":
+        # pysqlite only opens a transaction before a write; without one every query reads its own snapshot
+        session.connection().exec_driver_sql("BEGIN")
+    else:
+        session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+def _stream(read_rows, fields, output_format: str, compress: bool, session_factory):
+    # the export owns its session: a streamed response outlives the request-scoped one
+    session = session_factory()
+    try:
+        _begin_snapshot(session)
+        chunks = render(read_rows(session), fields, output_format)
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        session.close()
+
+def export_orders(output_format: str = "csv", compress: bool = False, status=None, created_from=None, created_to=None,
+                  include_archived: bool = False, session_factory=get_database_session):
+    """
+    Streams order lines as bytes chunks; see order_rows for the filters.
+
+    :param output_format: 'csv' or 'ndjson'.
+    :param compress: gzip the stream.
+    :param session_factory: Creates the session the export reads with.
+    :return: Generator of bytes; the rows are read while it is consumed.
+    :raises ValueError: If the format is not supported.
+    """
+    return _export(
+        lambda session: order_rows(session, status, created_from, created_to, include_archived),
+        ORDER_EXPORT_FIELDS, output_format, compress, session_factory
+    )
+
+def export_products(output_format: str = "csv", compress: bool = False, created_from=None, created_to=None,
+                    session_factory=get_database_session):
+    """
+    Streams products as bytes chunks; see product_rows for the filters.
+
+    :param output_format: 'csv' or 'ndjson'.
+    :param compress: gzip the stream.
+    :param session_factory: Creates the session the export reads with.
+    :return: Generator of bytes; the rows are read while it is consumed.
+    :raises ValueError: If the format is not supported.
+    """
+    return _export(
+        lambda session: product_rows(session, created_from, created_to),
+        PRODUCT_EXPORT_FIELDS, output_format, compress, session_factory
+    )
+
+def filename(kind: str, output_format: str, compress: bool) -> str:
+    """
+    Download name of an export, e.g. orders-export.csv.gz.
+    """
+    return f"{kind}-export.{output_format}" + (".gz" if compress else "")
@@ -0,0 +1,179 @@
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from Database import QueryMetrics
+from Database.SqliteProfile import apply_profile
+from Utils.Settings import get_settings
+
+'''
+One engine and one session factory for the whole process.
+Creating an engine per request pays dialect initialisation and a fresh
+connection every time, so everything goes through the pool defined here.
+
+The engine is created on first use, not on import: importing the service
+opens no connection and creates no database file, so workers start fast and
+a parent process that preloads the application (gunicorn --preload) never
+holds connections its forked workers would share.
+'''
+
+class PoolStats:
+    """
+    Counters describing how the connection pool is being used.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+                "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0
+            }
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long callers wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # keep the counters when the pool is recreated (e.g. after dispose())
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+def is_sqlite(settings=None) -> bool:
+    settings = settings or get_settings()
+    return make_url(settings.database_url).get_backend_name() == "sqlite"
+
+def build_engine(settings=None, pool_size: int = None, max_overflow: int = None, immediate_transactions: bool = False):
+    """
+    Creates an engine with the pool configured from the settings.
+
+    :param settings: Settings to use, defaults to the process settings.
+    :param pool_size: Overrides the pool_size setting.
+    :param max_overflow: Overrides the max_overflow setting.
+    :param immediate_transactions: SQLite only, start every transaction with BEGIN IMMEDIATE.
+    :return: A SQLAlchemy engine.
+    """
+    settings = settings or get_settings()
+    url = make_url(settings.database_url)
+    connect_args = {}
+    if url.get_backend_name() == "sqlite":
+        # sessions are handed between FastAPI's worker threads
+        connect_args["check_same_thread"] = False
+    new_engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.pool_size if pool_size is None else pool_size,
+        max_overflow=settings.max_overflow if max_overflow is None else max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        connect_args=connect_args
+    )
+    if url.get_backend_name() == "sqlite":
+        apply_profile(new_engine, settings, immediate_transactions=immediate_transactions)
+    return new_engine
+
+if get_settings().metrics_enabled:
+    QueryMetrics.install()
+
+_engine = None
+_engine_lock = threading.Lock()
+# bound to the engine when it is created
+SessionLocal = sessionmaker()
+
+def get_engine():
+    """
+    Returns the process-wide engine, creating it on first use.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                new_engine = build_engine()
+                SessionLocal.configure(bind=new_engine)
+                _engine = new_engine
+    return _engine
+
+def dispose_engine(close: bool = True):
+    """
+    Closes the pooled connections and forgets the engine; the next use creates a new one.
+
+    :param close: False in a freshly forked worker: the connections belong to the parent and are
+        only dropped from this process's pool, never closed from here.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=close)
+            _engine = None
+
+def get_database_session():
+    """
+    Returns a new session bound to the shared engine. The caller must close it.
+    """
+    if _engine is None:
+        get_engine()
+    return SessionLocal()
+
+def get_db():
+    """
+    FastAPI dependency yielding a session that lives for the duration of the request.
+    """
+    session = get_database_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def get_pool_metrics() -> dict:
+    """
+    Returns the current state of the connection pool and the checkout counters.
+    """
+    pool = get_engine().pool
+    metrics = {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow
+    }
+    if isinstance(pool, TimedQueuePool):
+        metrics.update(pool.stats.snapshot())
+    return metrics
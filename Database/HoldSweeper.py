@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+import time
+from Database import OrderTransitions, StockHolds, WriteQueue
+from Database.DbEngine import get_database_session
+from Utils import Metrics
+from Utils.Settings import get_settings
+
+'''
+Background task releasing expired stock holds.
+
+Every stock_hold_sweep_interval seconds the sweeper cancels the PENDING
+orders whose hold ran out, stock_hold_sweep_batch orders per write
+transaction, oldest hold first, until no expired hold is left. Each batch
+reads stock_hold by range on its expires_at index; see StockHolds.py.
+
+The sweeper runs on the application's event loop (started and stopped by the
+app's lifespan); the batches run in worker threads through the write queue.
+Every worker process runs one. The cancellations are guarded updates of
+PENDING orders, so two workers sweeping the same holds release each of them
+once.
+'''
+
+logger = logging.getLogger(__name__)
+
+class HoldSweeper:
+    """
+    Periodically cancels the orders whose stock hold expired.
+    """
+
+    def __init__(self, interval: float = 5.0, batch_size: int = 500, session_factory=get_database_session):
+        """
+        :param interval: Seconds between sweeps.
+        :param batch_size: Most holds released per transaction.
+        :param session_factory: Creates the sessions the batches run on.
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.sweeps = 0
+        self.released = 0
+        self.released_units = 0
+        self.last_sweep_seconds = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._task = None
+
+    def _release_batch(self) -> int:
+        session = self.session_factory()
+        try:
+            report, holds = WriteQueue.run_write(
+                session, lambda writer: OrderTransitions.release_expired_holds(writer, time.time(), self.batch_size)
+            )
+        finally:
+            session.close()
+        released_at = time.time()
+        expired_at = dict(holds)
+        for order_id in report.updated:
+            Metrics.hold_release_lag.observe((), max(0.0, released_at - expired_at[order_id]))
+        with self._lock:
+            self.released += len(report.updated)
+            self.released_units += sum(report.restocked.values())
+        return len(holds)
+
+    def sweep(self) -> int:
+        """
+        Releases every hold expired by now, one batch per transaction. Blocks; run it in a worker thread.
+
+        :return: Number of expired holds read.
+        """
+        start = time.perf_counter()
+        total = 0
+        while True:
+            count = self._release_batch()
+            total += count
+            if count < self.batch_size:
+                break
+        with self._lock:
+            self.sweeps += 1
+            self.last_sweep_seconds = time.perf_counter() - start
+        return total
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="stock-hold-sweeper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. the database is busy; the holds are still there on the next round
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Stock hold sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sweeps": self.sweeps,
+                "released": self.released,
+                "released_units": self.released_units,
+                "last_sweep_seconds": self.last_sweep_seconds,
+                "last_error": self.last_error
+            }
+
+_sweeper = None
+
+def get_sweeper():
+    """
+    Returns the running sweeper of this process, or None.
+    """
+    return _sweeper
+
+async def start_sweeper():
+    """
+    Starts the process-wide sweeper when stock_hold_sweep_enabled is set. Called from the app lifespan.
+    """
+    global _sweeper
+    settings = get_settings()
+    if _sweeper is not None or not settings.stock_hold_sweep_enabled:
+        return _sweeper
+    sweeper = HoldSweeper(settings.stock_hold_sweep_interval, settings.stock_hold_sweep_batch)
+    await sweeper.start()
+    _sweeper = sweeper
+    return sweeper
+
+async def stop_sweeper():
+    global _sweeper
+    if _sweeper is not None:
+        sweeper, _sweeper = _sweeper, None
+        await sweeper.stop()
+
+def hold_stats(session) -> dict:
+    """
+    Active and expired holds in the database, and what this process's sweeper released.
+    """
+    stats = {"ttl": get_settings().stock_hold_ttl, **StockHolds.hold_counts(session)}
+    stats["sweeper"] = _sweeper.stats() if _sweeper is not None else {"enabled": False}
+    return stats
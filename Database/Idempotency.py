@@ -0,0 +1,197 @@
+import hashlib
+import threading
+import time
+from sqlalchemy import delete, select
+from starlette.responses import Response
+from Database import WriteQueue
+from Database.AsyncOrderDb import run_with_retry as run_with_retry_async
+from Database.OrderDb import IdempotencyKey
+from Utils.Cache import LruTtlCache
+from Utils.Settings import get_settings
+
+'''
+Idempotency-Key support for write endpoints.
+
+The first request carrying a key runs normally. Its response is stored in the
+idempotency_key table in the same transaction as the write, so either both
+commit or neither does. A retry with the same key gets the stored response
+back without running the transaction again. Two requests racing with the same
+key both run, but only the first to commit keeps its write; the other's
+transaction is rolled back when its key insert conflicts, and it replays the
+winner's response.
+
+Only successful responses are stored: a request rejected with an error (e.g.
+insufficient stock) changed nothing, and retrying it runs it again. Keys are
+scoped per endpoint, expire after idempotency_ttl seconds, and the most
+recently used ones are kept in a bounded in-process index so replays usually
+skip the database.
+'''
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# expired rows are purged after this many stored responses
+PURGE_EVERY = 1000
+
+class IdempotencyKeyReused(Exception):
+    """
+    Raised when a key is sent again with a different request body.
+    """
+
+class _KeyTaken(Exception):
+    # another request stored a response under the key first; rolls our transaction back
+    pass
+
+# sized once at import; entries take the TTL in force when they are stored
+index = LruTtlCache(get_settings().idempotency_cache_size, get_settings().idempotency_ttl)
+_stored = 0
+_stored_lock = threading.Lock()
+
+def request_fingerprint(*parts) -> str:
+    """
+    Hash identifying a request body, so a key reused for a different request can be told apart.
+
+    :param parts: Pydantic models or strings making up the request.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part.model_dump_json() if hasattr(part, "model_dump_json") else str(part)).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _index_key(scope: str, key: str) -> str:
+    return f"{scope}\0{key}"
+
+def find(session, scope: str, key: str):
+    """
+    Returns the stored response for a key as a dict (request_hash, status_code, response), or None.
+    """
+    stored = index.get(_index_key(scope, key))
+    if stored is not None:
+        return stored
+    ttl = get_settings().idempotency_ttl
+    row = session.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response, IdempotencyKey.created_at)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.created_at >= time.time() - ttl)
+    ).first()
+    if row is None:
+        return None
+    stored = {"request_hash": row.request_hash, "status_code": row.status_code, "response": row.response}
+    index.set(_index_key(scope, key), stored, ttl=row.created_at + ttl - time.time())
+    return stored
+
+def replay(stored: dict, request_hash: str) -> Response:
+    """
+    Rebuilds the stored response.
+
+    :raises IdempotencyKeyReused: If the stored response belongs to a different request.
+    """
+    if stored["request_hash"] != request_hash:
+        raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+    return Response(stored["response"], status_code=stored["status_code"], media_type="application/json",
+                    headers={REPLAYED_HEADER: "true"})
+
+def _upsert_statement(session, values: dict):
+    # take the key unless a live (unexpired) response is already stored under it
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(IdempotencyKey.__table__).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+        set_={
+            "request_hash": statement.excluded.request_hash,
+            "status_code": statement.excluded.status_code,
+            "response": statement.excluded.response,
+            "created_at": statement.excluded.created_at
+        },
+        where=IdempotencyKey.__table__.c.created_at < values["created_at"] - get_settings().idempotency_ttl
+    )
+
+def record(session, scope: str, key: str, request_hash: str, response: Response) -> dict:
+    """
+    Stores a response under the key in the session's transaction.
+
+    :raises _KeyTaken: If a live response is already stored under the key.
+    :return: The stored entry.
+    """
+    stored = {"request_hash": request_hash, "status_code": response.status_code, "response": response.body.decode()}
+    result = session.execute(_upsert_statement(session, dict(stored, scope=scope, key=key, created_at=time.time())))
+    if result.rowcount != 1:
+        raise _KeyTaken()
+    return stored
+
+def _remember(scope: str, key: str, stored: dict) -> bool:
+    # returns whether expired keys are due to be purged
+    global _stored
+    index.set(_index_key(scope, key), stored, ttl=get_settings().idempotency_ttl)
+    with _stored_lock:
+        _stored += 1
+        purge = _stored % PURGE_EVERY == 0
+    return purge
+
+def purge_expired(session) -> int:
+    """
+    Deletes expired keys. Does not commit.
+
+    :return: Number of keys deleted.
+    """
+    result = session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < time.time() - get_settings().idempotency_ttl))
+    return result.rowcount
+
+def run_idempotent(session, scope: str, key, request_hash: str, work, respond) -> Response:
+    """
+    Runs a write transaction at most once per idempotency key.
+
+    :param session: The request-scoped session.
+    :param scope: Endpoint the key belongs to, e.g. 'POST /orders'.
+    :param key: Value of the Idempotency-Key header; None runs the transaction unconditionally.
+    :param request_hash: request_fingerprint() of the request.
+    :param work: Unit of work as accepted by WriteQueue.run_write.
+    :param respond: Builds the Response from what work returned.
+    :return: The new response, or the stored one for a replay.
+    :raises IdempotencyKeyReused: If the key was used with a different request.
+    """
+    if key is None:
+        return respond(WriteQueue.run_write(session, work))
+    stored = find(session, scope, key)
+    if stored is not None:
+        return replay(stored, request_hash)
+
+    def write_once(session):
+        response = respond(work(session))
+        return response, record(session, scope, key, request_hash, response)
+
+    try:
+        response, stored = WriteQueue.run_write(session, write_once)
+    except _KeyTaken:
+        # end any transaction still open on the request session so the winner's row is visible
+        session.rollback()
+        return replay(find(session, scope, key), request_hash)
+    if _remember(scope, key, stored):
+        WriteQueue.run_write(session, purge_expired)
+    return response
+
+async def run_idempotent_async(session, scope: str, key, request_hash: str, work, respond) -> Response:
+    """
+    Async counterpart of run_idempotent for handlers on an AsyncSession; work is awaited.
+    """
+    if key is None:
+        return respond(await run_with_retry_async(session, work))
+    stored = await session.run_sync(find, scope, key)
+    if stored is not None:
+        return replay(stored, request_hash)
+
+    async def write_once(session):
+        response = respond(await work(session))
+        return response, await session.run_sync(record, scope, key, request_hash, response)
+
+    try:
+        response, stored = await run_with_retry_async(session, write_once)
+    except _KeyTaken:
+        return replay(await session.run_sync(find, scope, key), request_hash)
+    if _remember(scope, key, stored):
+        async def purge(session):
+            return await session.run_sync(purge_expired)
+        await run_with_retry_async(session, purge)
+    return response
@@ -0,0 +1,392 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+'''
+A small built-in schema migrator.
+
+Migrations are numbered and applied in order; the versions already applied
+are recorded in the schema_migrations table. Every migration is written to
+be idempotent (IF NOT EXISTS) so it can be applied to database files that
+were created by the old Base.metadata.create_all call. Each migration runs
+in its own transaction under a write lock (BEGIN IMMEDIATE on SQLite, an
+advisory lock elsewhere) and checks schema_migrations again once it holds
+it, so several workers starting at the same time apply every migration once.
+
+To change the schema, append a new migration to MIGRATIONS. Never edit one
+that has already shipped.
+'''
+
+def _create_base_tables(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS "Product" (
+            product_id INTEGER NOT NULL,
+            sku VARCHAR NOT NULL,
+            product_name VARCHAR NOT NULL,
+            price FLOAT NOT NULL,
+            stock_quantity INTEGER NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (product_id)
+        )
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS "Order" (
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            status VARCHAR NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (order_id),
+            CONSTRAINT check_quantity_positive CHECK (quantity > 0),
+            FOREIGN KEY(product_id) REFERENCES "Product" (product_id)
+        )
+    """))
+
+def _create_product_sku_index(connection):
+    duplicates = connection.execute(text(
+        'SELECT sku FROM "Product" GROUP BY sku HAVING COUNT(*) > 1 LIMIT 10'
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(f"Cannot create unique index on Product.sku, duplicate SKUs found: {duplicates}")
+    connection.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ux_product_sku ON "Product" (sku)'))
+
+def _create_order_indexes(connection):
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_order_product_id ON "Order" (product_id)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_order_status_created_at ON "Order" (status, created_at)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_order_created_at ON "Order" (created_at)'))
+
+def _create_idempotency_table(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS idempotency_key (
+            scope VARCHAR NOT NULL,
+            key VARCHAR NOT NULL,
+            request_hash VARCHAR NOT NULL,
+            status_code INTEGER NOT NULL,
+            response TEXT NOT NULL,
+            created_at FLOAT NOT NULL,
+            PRIMARY KEY (scope, key)
+        )
+    """))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_idempotency_key_created_at ON idempotency_key (created_at)'))
+
+def _create_sales_rollups(connection):
+    if "unit_price" not in {column["name"] for column in inspect(connection).get_columns("Order")}:
+        connection.execute(text('ALTER TABLE "Order" ADD COLUMN unit_price FLOAT'))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+            day VARCHAR NOT NULL,
+            status VARCHAR NOT NULL,
+            orders INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            revenue FLOAT NOT NULL,
+            PRIMARY KEY (day, status)
+        )
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS product_sales_rollup (
+            product_id INTEGER NOT NULL,
+            status VARCHAR NOT NULL,
+            orders INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            revenue FLOAT NOT NULL,
+            PRIMARY KEY (product_id, status)
+        )
+    """))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_product_stock_quantity ON "Product" (stock_quantity)'))
+
+    # backfill from the orders placed so far; orders from before unit_price existed are valued at today's price
+    if connection.execute(text("SELECT COUNT(*) FROM daily_sales_rollup")).scalar() == 0:
+        connection.execute(text("""
+            INSERT INTO daily_sales_rollup (day, status, orders, units, revenue)
+            SELECT date(o.created_at), o.status, COUNT(*), SUM(o.quantity), SUM(o.quantity * COALESCE(o.unit_price, p.price, 0))
+            FROM "Order" o LEFT JOIN "Product" p ON p.product_id = o.product_id
+            GROUP BY date(o.created_at), o.status
+        """))
+    if connection.execute(text("SELECT COUNT(*) FROM product_sales_rollup")).scalar() == 0:
+        connection.execute(text("""
+            INSERT INTO product_sales_rollup (product_id, status, orders, units, revenue)
+            SELECT o.product_id, o.status, COUNT(*), SUM(o.quantity), SUM(o.quantity * COALESCE(o.unit_price, p.price, 0))
+            FROM "Order" o LEFT JOIN "Product" p ON p.product_id = o.product_id
+            GROUP BY o.product_id, o.status
+        """))
+
+def _create_outbox(connection):
+    # AUTOINCREMENT: event ids are never reused, so subscribers can resume from the last id they saw
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS outbox_event (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type VARCHAR NOT NULL,
+            aggregate_id INTEGER NOT NULL,
+            payload VARCHAR NOT NULL,
+            created_at FLOAT NOT NULL
+        )
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS outbox_cursor (
+            sink VARCHAR NOT NULL PRIMARY KEY,
+            last_event_id INTEGER NOT NULL
+        )
+    """))
+
+def _create_worker_coordination(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS outbox_lease (
+            name VARCHAR NOT NULL PRIMARY KEY,
+            owner VARCHAR NOT NULL,
+            expires_at FLOAT NOT NULL
+        )
+    """))
+    # AUTOINCREMENT: workers read the bus by sequence number, which must never go backwards
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS cache_invalidation (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_ids VARCHAR NOT NULL,
+            listing BOOLEAN NOT NULL,
+            everything BOOLEAN NOT NULL,
+            origin VARCHAR NOT NULL,
+            created_at FLOAT NOT NULL
+        )
+    """))
+
+_ORDER_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_order_product_id ON "Order" (product_id)',
+    'CREATE INDEX IF NOT EXISTS ix_order_status_created_at ON "Order" (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_order_created_at ON "Order" (created_at)'
+)
+
+def _create_order_lines(connection):
+    # Order becomes the header: product_id and quantity only repeat the line of a single-line order
+    columns = {column["name"]: column for column in inspect(connection).get_columns("Order")}
+    if not columns["product_id"]["nullable"] or not columns["quantity"]["nullable"]:
+        if connection.dialect.name == "sqlite":
+            # SQLite cannot drop NOT NULL in place; rebuild the table under the same name
+            connection.execute(text('DROP TABLE IF EXISTS "Order_rebuild"'))
+            connection.execute(text("""
+                CREATE TABLE "Order_rebuild" (
+                    order_id INTEGER NOT NULL,
+                    product_id INTEGER,
+                    quantity INTEGER,
+                    status VARCHAR NOT NULL,
+                    created_at DATETIME NOT NULL,
+                    unit_price FLOAT,
+                    PRIMARY KEY (order_id),
+                    CONSTRAINT check_quantity_positive CHECK (quantity > 0),
+                    FOREIGN KEY(product_id) REFERENCES "Product" (product_id)
+                )
+            """))
+            connection.execute(text("""
+                INSERT INTO "Order_rebuild" (order_id, product_id, quantity, status, created_at, unit_price)
+                SELECT order_id, product_id, quantity, status, created_at, unit_price FROM "Order"
+            """))
+            connection.execute(text('DROP TABLE "Order"'))
+            connection.execute(text('ALTER TABLE "Order_rebuild" RENAME TO "Order"'))
+            for statement in _ORDER_INDEXES:
+                connection.execute(text(statement))
+        else:
+            connection.execute(text('ALTER TABLE "Order" ALTER COLUMN product_id DROP NOT NULL'))
+            connection.execute(text('ALTER TABLE "Order" ALTER COLUMN quantity DROP NOT NULL'))
+
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS order_line (
+            line_id INTEGER NOT NULL,
+            order_id INTEGER NOT NULL,
+            line_no INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price FLOAT,
+            PRIMARY KEY (line_id),
+            CONSTRAINT check_line_quantity_positive CHECK (quantity > 0),
+            FOREIGN KEY(order_id) REFERENCES "Order" (order_id),
+            FOREIGN KEY(product_id) REFERENCES "Product" (product_id)
+        )
+    """))
+    # lines are always read by order; the unique index is also the lookup path
+    connection.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ux_order_line_order ON order_line (order_id, line_no)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_order_line_product_id ON order_line (product_id)'))
+    # every order placed so far has one line
+    connection.execute(text("""
+        INSERT INTO order_line (order_id, line_no, product_id, quantity, unit_price)
+        SELECT o.order_id, 1, o.product_id, o.quantity, o.unit_price FROM "Order" o
+        WHERE o.product_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM order_line l WHERE l.order_id = o.order_id)
+    """))
+
+def _create_stock_holds(connection):
+    # orders that were PENDING before holds existed keep their stock without a time limit
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS stock_hold (
+            order_id INTEGER NOT NULL PRIMARY KEY,
+            expires_at FLOAT NOT NULL,
+            FOREIGN KEY(order_id) REFERENCES "Order" (order_id)
+        )
+    """))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_stock_hold_expires_at ON stock_hold (expires_at)'))
+
+def _create_order_archive(connection):
+    # no foreign keys: archived orders outlive the products they reference
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS order_archive (
+            order_id INTEGER NOT NULL PRIMARY KEY,
+            product_id INTEGER,
+            quantity INTEGER,
+            status VARCHAR NOT NULL,
+            created_at DATETIME NOT NULL,
+            unit_price FLOAT,
+            archived_at FLOAT NOT NULL
+        )
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS order_line_archive (
+            order_id INTEGER NOT NULL,
+            line_no INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price FLOAT,
+            PRIMARY KEY (order_id, line_no)
+        )
+    """))
+
+def _create_product_search(connection):
+    if connection.dialect.name != "sqlite":
+        # other databases search with LIKE, see ProductSearch.py
+        return
+    # external content: the index stores tokens only and reads the columns from Product
+    connection.execute(text("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+            sku, product_name,
+            content='Product', content_rowid='product_id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS product_search_insert AFTER INSERT ON "Product" BEGIN
+            INSERT INTO product_search (rowid, sku, product_name) VALUES (new.product_id, new.sku, new.product_name);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS product_search_delete AFTER DELETE ON "Product" BEGIN
+            INSERT INTO product_search (product_search, rowid, sku, product_name) VALUES ('delete', old.product_id, old.sku, old.product_name);
+        END
+    """))
+    # stock and price updates do not name these columns and leave the index alone
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS product_search_update AFTER UPDATE OF sku, product_name ON "Product" BEGIN
+            INSERT INTO product_search (product_search, rowid, sku, product_name) VALUES ('delete', old.product_id, old.sku, old.product_name);
+            INSERT INTO product_search (rowid, sku, product_name) VALUES (new.product_id, new.sku, new.product_name);
+        END
+    """))
+    connection.execute(text("INSERT INTO product_search (product_search) VALUES ('rebuild')"))
+
+def _order_ids_autoincrement(connection):
+    if connection.dialect.name != "sqlite":
+        # sequences never hand out an id twice
+        return
+    # without AUTOINCREMENT SQLite reuses the ids above the highest one left in the table,
+    # which after archiving or deleting the newest orders are ids order_archive still holds
+    table_sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'Order'")).scalar()
+    if "AUTOINCREMENT" not in table_sql.upper():
+        connection.execute(text('DROP TABLE IF EXISTS "Order_rebuild"'))
+        connection.execute(text("""
+            CREATE TABLE "Order_rebuild" (
+                order_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER,
+                quantity INTEGER,
+                status VARCHAR NOT NULL,
+                created_at DATETIME NOT NULL,
+                unit_price FLOAT,
+                CONSTRAINT check_quantity_positive CHECK (quantity > 0),
+                FOREIGN KEY(product_id) REFERENCES "Product" (product_id)
+            )
+        """))
+        connection.execute(text("""
+            INSERT INTO "Order_rebuild" (order_id, product_id, quantity, status, created_at, unit_price)
+            SELECT order_id, product_id, quantity, status, created_at, unit_price FROM "Order"
+        """))
+        connection.execute(text('DROP TABLE "Order"'))
+        connection.execute(text('ALTER TABLE "Order_rebuild" RENAME TO "Order"'))
+        for statement in _ORDER_INDEXES:
+            connection.execute(text(statement))
+    # the next id comes after every order ever placed, live or archived
+    highest = connection.execute(text("""
+        SELECT MAX(
+            COALESCE((SELECT MAX(order_id) FROM "Order"), 0),
+            COALESCE((SELECT MAX(order_id) FROM order_archive), 0),
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'Order'), 0)
+        )
+    """)).scalar()
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'Order'"))
+    connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('Order', :seq)"), {"seq": highest})
+
+MIGRATIONS = [
+    (1, "create Product and Order tables", _create_base_tables),
+    (2, "unique index on Product.sku", _create_product_sku_index),
+    (3, "Order indexes on product_id, (status, created_at) and created_at", _create_order_indexes),
+    (4, "idempotency_key dedupe table", _create_idempotency_table),
+    (5, "Order.unit_price, sales rollup tables and Product.stock_quantity index", _create_sales_rollups),
+    (6, "outbox_event and outbox_cursor tables", _create_outbox),
+    (7, "outbox_lease and cache_invalidation tables for multi-worker deployments", _create_worker_coordination),
+    (8, "order_line table; Order.product_id and Order.quantity become optional", _create_order_lines),
+    (9, "stock_hold table for time-limited stock holds of PENDING orders", _create_stock_holds),
+    (10, "order_archive and order_line_archive tables for archived terminal orders", _create_order_archive),
+    (11, "product_search FTS5 index over Product.sku and Product.product_name, kept in sync by triggers", _create_product_search),
+    (12, "Order.order_id becomes AUTOINCREMENT so ids of archived or deleted orders are never reused", _order_ids_autoincrement),
+]
+
+# advisory lock id taken by migrating processes outside SQLite
+MIGRATION_LOCK_KEY = 7_301_955
+
+def _ensure_version_table(connection):
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER NOT NULL PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """))
+
+def _lock(connection):
+    # serialises migrating processes: the lock is held until the migration's transaction ends
+    if connection.dialect.name == "sqlite":
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def applied_versions(engine) -> set:
+    """
+    Returns the migration versions already applied to the database.
+    """
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        return set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+def pending_migrations(engine) -> list:
+    """
+    Returns the (version, name) pairs not yet applied, in order.
+    """
+    applied = applied_versions(engine)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+def migrate(engine, target: int = None) -> list:
+    """
+    Applies every pending migration up to target, each in its own transaction.
+
+    :param engine: Engine of the database to migrate.
+    :param target: Highest version to apply, defaults to the latest.
+    :return: The versions that were applied.
+    """
+    applied = applied_versions(engine)
+    newly_applied = []
+    for version, name, upgrade in MIGRATIONS:
+        if version in applied or (target is not None and version > target):
+            continue
+        with engine.begin() as connection:
+            _lock(connection)
+            # another process may have applied it since applied_versions() read the table
+            if connection.execute(text("SELECT 1 FROM schema_migrations WHERE version = :version"), {"version": version}).first():
+                continue
+            upgrade(connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at) ON CONFLICT (version) DO NOTHING"),
+                {"version": version, "name": name, "applied_at": datetime.now()}
+            )
+        newly_applied.append(version)
+    return newly_applied
@@ -0,0 +1,159 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, literal, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload
+from Database import WriteQueue
+from Database.DbEngine import get_database_session, get_engine
+from Database.OrderDb import ARCHIVED_ORDER_COLUMNS, Order, OrderArchive, OrderLine, OrderLineArchive, order_to_dict
+from Utils.OrderStatus import TERMINAL_STATUSES
+from Utils.Settings import get_settings
+
+'''
+Archival of terminal orders.
+
+DELIVERED and CANCELLED orders never change again and are rarely read, yet
+they make up most of the Order and order_line tables and of their indexes.
+archive_orders() moves those older than archive_after_days into
+order_archive and order_line_archive, archive_batch_size orders per write
+transaction: each batch is two INSERT ... SELECT and two DELETE statements,
+with the orders picked through ix_order_status_created_at.
+
+Reads by id fall back to the archive (see OrderRepository), status changes
+and deletion report archived orders as terminal, and the sales rollups keep
+counting them (Reporting.rebuild reads both). Listings only cover the live
+table.
+
+Order.order_id is AUTOINCREMENT (migration 12), so a new order never takes
+the id of an archived one, even once the newest orders are archived or deleted.
+
+Deleted rows leave free pages in the database file; storage_report() shows
+them and vacuum() gives them back to the file system.
+'''
+
+
+ARCHIVED_STATUSES = sorted(TERMINAL_STATUSES)
+
+def archive_batch(session, cutoff: datetime, limit: int) -> int:
+    """
+    Moves up to limit terminal orders created before cutoff, with their lines, to the archive. Does not commit.
+
+    :param session: Session whose transaction the move joins.
+    :param cutoff: Orders created before this are archived.
+    :param limit: Most orders moved.
+    :return: Number of orders moved.
+    """
+    order_ids = session.scalars(
+        select(Order.order_id)
+        .where(
+            Order.status.in_(ARCHIVED_STATUSES),
+            Order.created_at < cutoff
+        )
+        .limit(limit)
+    ).all()
+    if not order_ids:
+        return 0
+    session.execute(insert(OrderArchive).from_select(
+        ["order_id", "product_id", "quantity", "status", "created_at", "unit_price", "archived_at"],
+        select(Order.order_id, Order.product_id, Order.quantity, Order.status, Order.created_at, Order.unit_price, literal(time.time()))
+        .where(Order.order_id.in_(order_ids))
+    ))
+    session.execute(insert(OrderLineArchive).from_select(
+        ["order_id", "line_no", "product_id", "quantity", "unit_price"],
+        select(OrderLine.order_id, OrderLine.line_no, OrderLine.product_id, OrderLine.quantity, OrderLine.unit_price)
+        .where(OrderLine.order_id.in_(order_ids))
+    ))
+    session.execute(delete(OrderLine).where(OrderLine.order_id.in_(order_ids)).execution_options(synchronize_session=False))
+    session.execute(delete(Order).where(Order.order_id.in_(order_ids)).execution_options(synchronize_session=False))
+    return len(order_ids)
+
+def archive_orders(older_than_days: int = None, batch_size: int = None, max_batches: int = None) -> dict:
+    """
+    Archives terminal orders in batches, one write transaction each, until none is left or max_batches ran.
+
+    :param older_than_days: Minimum age by created_at, defaults to archive_after_days.
+    :param batch_size: Orders per transaction, defaults to archive_batch_size.
+    :param max_batches: Stop after this many batches; None runs until done.
+    :return: Number of orders archived, batches run and the cutoff used.
+    """
+    settings = get_settings()
+    older_than_days = settings.archive_after_days if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.archive_batch_size
+    cutoff = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(days=older_than_days)
+
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        session = get_database_session()
+        try:
+            count = WriteQueue.run_write(session, lambda writer: archive_batch(writer, cutoff, batch_size))
+        finally:
+            session.close()
+        batches += 1
+        archived += count
+        if count < batch_size:
+            break
+    return {"archived": archived, "batches": batches, "cutoff": cutoff.date().isoformat()}
+
+def get_archived_order(session, order_id: int):
+    """
+    :return: The archived order as a dict shaped like a live one, or None.
+    """
+    row = session.execute(select(*ARCHIVED_ORDER_COLUMNS).where(OrderArchive.order_id == order_id)).first()
+    return order_to_dict(row) if row else None
+
+def get_archived_order_with_lines(session, order_id: int):
+    """
+    :return: The OrderArchive with its lines loaded, or None.
+    """
+    return session.scalars(
+        select(OrderArchive).options(selectinload(OrderArchive.lines)).where(OrderArchive.order_id == order_id)
+    ).first()
+
+def archived_statuses(session, order_ids) -> dict:
+    """
+    :return: Mapping of order_id to status for the given orders that are archived.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    return dict(session.execute(select(OrderArchive.order_id, OrderArchive.status).where(OrderArchive.order_id.in_(order_ids))).all())
+
+STORAGE_TABLES = ("Order", "order_line", "order_archive", "order_line_archive")
+
+def storage_report(session) -> dict:
+    """
+    Rows per order table and, on SQLite, bytes per table (with its indexes) and free pages in the file.
+    """
+    report = {"tables": {}}
+    for table in STORAGE_TABLES:
+        report["tables"][table] = {"rows": session.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()}
+    if session.get_bind().dialect.name != "sqlite":
+        return report
+
+    page_size = session.execute(text("PRAGMA page_size")).scalar()
+    page_count = session.execute(text("PRAGMA page_count")).scalar()
+    free_pages = session.execute(text("PRAGMA freelist_count")).scalar()
+    report["file"] = {"bytes": page_size * page_count, "free_bytes": page_size * free_pages}
+    try:
+        # dbstat is compiled into most SQLite builds; aggregate=TRUE reads one summary row per table or index
+        for table in STORAGE_TABLES:
+            names = session.scalars(text("SELECT name FROM sqlite_master WHERE tbl_name = :table"), {"table": table}).all()
+            report["tables"][table]["bytes"] = sum(
+                session.execute(text("SELECT pgsize FROM dbstat WHERE name = :name AND aggregate = TRUE"), {"name": name}).scalar() or 0
+                for name in names
+            )
+    except OperationalError:
+        pass
+    return report
+
+def vacuum():
+    """
+    Rewrites the SQLite database file without its free pages. Needs temporary disk space up to the file's
+    size and blocks writers while it runs; does nothing on other databases.
+    """
+    engine = get_engine()
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM"))
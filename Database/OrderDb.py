@@ -1,14 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float,DateTime, ForeignKey, CheckConstraint
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import Boolean, Column, Integer, String, Float,DateTime, ForeignKey, CheckConstraint, Index, func, select, tuple_
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
+from Database.DbEngine import get_database_session, get_engine
+from Database.Migrations import migrate
+from Utils.Settings import get_settings
 
 Base = declarative_base()
 
-def get_database_session():
-    engine = create_engine('sqlite:///ecommerce.db')
-    Session = sessionmaker(bind=engine)
-    return Session()
-
 class Product(Base):
     __tablename__ = 'Product'
 
@@ -19,65 +20,324 @@ class Product(Base):
     stock_quantity = Column(Integer, nullable=False)
     created_at = Column(DateTime, nullable=False)
 
-Base.metadata.create_all(create_engine('sqlite:///ecommerce.db'))
+    __table_args__ = (
+        # SKU lookups and INSERT ... ON CONFLICT (sku) upserts need a unique index
+        Index('ux_product_sku', 'sku', unique=True),
+    )
 
 class Order(Base):
     __tablename__ = 'Order'
 
     order_id = Column(Integer, primary_key=True, autoincrement=True)
+    # product_id, quantity and unit_price repeat the only line of a single-line order,
+    # so the single-item endpoints never join order_line; they are NULL when an order has several lines
+    product_id = Column(Integer, ForeignKey('Product.product_id'), nullable=True)
+    quantity = Column(Integer, nullable=True)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    # product price when the order was placed, used for revenue reporting
+    unit_price = Column(Float, nullable=True)
+
+    # lazy loads raise instead of issuing one SELECT per order; load them with selectinload()
+    product = relationship('Product', lazy='raise_on_sql')
+    lines = relationship('OrderLine', back_populates='order', order_by='OrderLine.line_no', lazy='raise_on_sql')
+
+    __table_args__ = (
+        CheckConstraint('quantity > 0', name='check_quantity_positive'),
+        Index('ix_order_product_id', 'product_id'),
+        Index('ix_order_status_created_at', 'status', 'created_at'),
+        Index('ix_order_created_at', 'created_at'),
+        # ids of archived and deleted orders are never handed out again
+        {'sqlite_autoincrement': True}
+    )
+
+class OrderLine(Base):
+    __tablename__ = 'order_line'
+
+    line_id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, ForeignKey('Order.order_id'), nullable=False)
+    line_no = Column(Integer, nullable=False)
     product_id = Column(Integer, ForeignKey('Product.product_id'), nullable=False)
     quantity = Column(Integer, nullable=False)
+    # product price when the order was placed
+    unit_price = Column(Float, nullable=True)
+
+    order = relationship('Order', back_populates='lines', lazy='raise_on_sql')
+    product = relationship('Product', lazy='raise_on_sql')
+
+    __table_args__ = (
+        CheckConstraint('quantity > 0', name='check_line_quantity_positive'),
+        Index('ux_order_line_order', 'order_id', 'line_no', unique=True),
+        Index('ix_order_line_product_id', 'product_id'),
+    )
+
+class OrderArchive(Base):
+    __tablename__ = 'order_archive'
+
+    # terminal orders moved out of Order by OrderArchive.archive_orders, with the same columns
+    order_id = Column(Integer, primary_key=True, autoincrement=False)
+    product_id = Column(Integer, nullable=True)
+    quantity = Column(Integer, nullable=True)
     status = Column(String, nullable=False)
     created_at = Column(DateTime, nullable=False)
+    unit_price = Column(Float, nullable=True)
+    # epoch seconds
+    archived_at = Column(Float, nullable=False)
+
+    lines = relationship('OrderLineArchive', order_by='OrderLineArchive.line_no', lazy='raise_on_sql')
+
+class OrderLineArchive(Base):
+    __tablename__ = 'order_line_archive'
+
+    order_id = Column(Integer, ForeignKey('order_archive.order_id'), primary_key=True)
+    line_no = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=True)
+
+class DailySalesRollup(Base):
+    __tablename__ = 'daily_sales_rollup'
+
+    day = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    orders = Column(Integer, nullable=False)
+    units = Column(Integer, nullable=False)
+    revenue = Column(Float, nullable=False)
+
+class ProductSalesRollup(Base):
+    __tablename__ = 'product_sales_rollup'
+
+    product_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    orders = Column(Integer, nullable=False)
+    units = Column(Integer, nullable=False)
+    revenue = Column(Float, nullable=False)
+
+class OutboxEvent(Base):
+    __tablename__ = 'outbox_event'
+
+    event_id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(String, nullable=False)
+    # epoch seconds
+    created_at = Column(Float, nullable=False)
+
+    # ids are never reused, so subscribers can resume from the last one they saw
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class OutboxCursor(Base):
+    __tablename__ = 'outbox_cursor'
+
+    sink = Column(String, primary_key=True)
+    last_event_id = Column(Integer, nullable=False)
 
-    product = relationship('Product')
+class OutboxLease(Base):
+    __tablename__ = 'outbox_lease'
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    # epoch seconds after which another process may take the lease over
+    expires_at = Column(Float, nullable=False)
+
+class StockHold(Base):
+    __tablename__ = 'stock_hold'
+
+    # one row per PENDING order whose stock is held for a limited time
+    order_id = Column(Integer, ForeignKey('Order.order_id'), primary_key=True)
+    # epoch seconds after which the sweeper cancels the order and gives its stock back
+    expires_at = Column(Float, nullable=False)
 
     __table_args__ = (
-        CheckConstraint('quantity > 0', name='check_quantity_positive'),
+        Index('ix_stock_hold_expires_at', 'expires_at'),
     )
-Base.metadata.create_all(create_engine('sqlite:///ecommerce.db'))
-
-def insert_product(product):
-    session = get_database_session()
-    session.add(product)
-    session.commit()
-    session.close()
-
-def get_products(limit=10, offset=0):
-    session = get_database_session()
-    products = session.query(Product).limit(limit).offset(offset).all()
-    session.close()
-    return products
-
-def get_total_product_count():
-    session = get_database_session()
-    total_count = session.query(Product).count()
-    session.close()
+
+class CacheInvalidation(Base):
+    __tablename__ = 'cache_invalidation'
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    # JSON list of product ids
+    product_ids = Column(String, nullable=False)
+    listing = Column(Boolean, nullable=False)
+    everything = Column(Boolean, nullable=False)
+    origin = Column(String, nullable=False)
+    # epoch seconds
+    created_at = Column(Float, nullable=False)
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_key'
+
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(String, nullable=False)
+    # seconds since the epoch, compared against idempotency_ttl
+    created_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+# the schema is owned by Database/Migrations.py; keep the models above in step with it
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def init_database() -> list:
+    """
+    Applies pending migrations, once per process. Runs from the application lifespan and the
+    maintenance commands, never on import.
+
+    :return: The versions that were applied.
+    """
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return []
+        applied = migrate(get_engine())
+        _schema_ready = True
+        return applied
+
+_product_count_lock = threading.Lock()
+_product_count = {"value": None, "expires_at": 0.0}
+
+def invalidate_product_count():
+    """
+    Drops the cached product count. ProductCache calls it whenever products are created or deleted.
+    """
+    with _product_count_lock:
+        _product_count["value"] = None
+
+def cached_product_count():
+    """
+    Returns the cached product count, or None when it is missing or expired.
+    """
+    with _product_count_lock:
+        if _product_count["value"] is not None and _product_count["expires_at"] > time.monotonic():
+            return _product_count["value"]
+    return None
+
+def store_product_count(total_count: int):
+    """
+    Caches a freshly counted number of products for product_count_ttl seconds.
+    """
+    with _product_count_lock:
+        _product_count["value"] = total_count
+        _product_count["expires_at"] = time.monotonic() + get_settings().product_count_ttl
+
+def get_total_product_count(session=None, use_cache=False):
+    """
+    Returns the number of products. With use_cache the count is served from memory for
+    product_count_ttl seconds instead of running COUNT(*) on every page request.
+    """
+    if use_cache:
+        total_count = cached_product_count()
+        if total_count is not None:
+            return total_count
+    own_session = session is None
+    session = session or get_database_session()
+    try:
+        total_count = session.query(Product).count()
+    finally:
+        if own_session:
+            session.close()
+    store_product_count(total_count)
     return total_count
 
-def delete_product_by_id(product_id: int):
-    session = get_database_session()
-    product = session.query(Product).filter(Product.product_id == product_id).first()
-    if product:
-        session.delete(product)
-        session.commit()
-    session.close()
-
-def update_product_by_id(product_id: int, product_data):
-    session = get_database_session()
-    product = session.query(Product).filter(Product.product_id == product_id).first()
-    if product:
-        product.sku = product_data.sku
-        product.product_name = product_data.product_name
-        product.price = product_data.price
-        product.stock_quantity = product_data.stock_quantity
-        product.created_at = product_data.created_at
-        session.commit()
-    session.close()
-    
-
-def insert_order(order):
-    session = get_database_session()
-    session.add(order)
-    session.commit()
-    session.close()
\ No newline at end of file
+def order_columns(order=Order, line=OrderLine, product_id=None) -> tuple:
+    """
+    The columns behind the order dict served by the API. A multi-line order has no product_id or
+    quantity of its own, so they are read from its first line, or from its line for product_id when
+    given, through a lookup on ux_order_line_order.
+
+    :param order: Order or OrderArchive.
+    :param line: OrderLine or OrderLineArchive.
+    :param product_id: Read a multi-line order's fields from its line for this product.
+    """
+    def from_line(column):
+        lines = select(column).where(line.order_id == order.order_id)
+        if product_id is not None:
+            lines = lines.where(line.product_id == product_id)
+        return lines.order_by(line.line_no).limit(1).scalar_subquery()
+
+    return (
+        order.order_id,
+        func.coalesce(order.product_id, from_line(line.product_id)).label("product_id"),
+        func.coalesce(order.quantity, from_line(line.quantity)).label("quantity"),
+        order.status,
+        order.created_at
+    )
+
+ORDER_COLUMNS = order_columns()
+ARCHIVED_ORDER_COLUMNS = order_columns(OrderArchive, OrderLineArchive)
+
+def order_to_dict(row) -> dict:
+    """
+    Turns a tuple of ORDER_COLUMNS into the order dict served by the API, without loading an Order object.
+    """
+    order_id, product_id, quantity, status, created_at = row
+    return {
+        "order_id": order_id,
+        "product_id": product_id,
+        "quantity": quantity,
+        "status": status,
+        # orders are dated, the time part is always midnight
+        "created_at": created_at.date() if isinstance(created_at, datetime) else created_at
+    }
+
+def order_with_lines_to_dict(order: Order, products: dict) -> dict:
+    """
+    Turns an Order loaded with its lines into the dict served by the /orders/full endpoints.
+
+    :param order: Order (or OrderArchive) whose lines relationship is loaded.
+    :param products: Mapping of product_id to product dict; a product that no longer exists is served as null.
+    """
+    created_at = order.created_at
+    return {
+        "order_id": order.order_id,
+        "status": order.status,
+        "created_at": created_at.date() if isinstance(created_at, datetime) else created_at,
+        "total": round(sum(line.quantity * (line.unit_price or 0.0) for line in order.lines), 2),
+        "lines": [
+            {"line_no": line.line_no, "product_id": line.product_id, "quantity": line.quantity,
+             "unit_price": line.unit_price, "product": products.get(line.product_id)}
+            for line in order.lines
+        ]
+    }
+
+def order_listing_statement(status=None, product_id=None, created_from=None, created_to=None,
+                            sort="created_at", descending=False, after=None, columns=ORDER_COLUMNS):
+    """
+    Builds the SELECT behind order listing, using keyset pagination on (created_at, order_id)
+    or order_id so every page is an index range scan.
+
+    :param status: Only orders with this status.
+    :param product_id: Only orders with a line for this product.
+    :param created_from: Inclusive lower bound on created_at.
+    :param created_to: Exclusive upper bound on created_at.
+    :param sort: 'created_at' or 'order_id'.
+    :param descending: Newest / highest first.
+    :param after: Sort key of the last row of the previous page, (created_at, order_id) or (order_id,).
+    :param columns: What to select, e.g. (Order,) to load Order objects. With the default
+        ORDER_COLUMNS and product_id, a multi-line order reports its line for that product.
+    :return: A select() over columns.
+    """
+    if columns is ORDER_COLUMNS and product_id is not None:
+        columns = order_columns(product_id=product_id)
+    statement = select(*columns)
+    if status is not None:
+        statement = statement.where(Order.status == status)
+    if product_id is not None:
+        statement = statement.where(Order.order_id.in_(select(OrderLine.order_id).where(OrderLine.product_id == product_id)))
+    if created_from is not None:
+        statement = statement.where(Order.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(Order.created_at < created_to)
+
+    sort_columns = (Order.created_at, Order.order_id) if sort == "created_at" else (Order.order_id,)
+    if after is not None:
+        key, values = tuple_(*sort_columns), tuple_(*after)
+        statement = statement.where(key < values if descending else key > values)
+    return statement.order_by(*[column.desc() if descending else column for column in sort_columns])
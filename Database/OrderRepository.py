@@ -0,0 +1,380 @@
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+from Database import OrderArchive, OrderDb, OrderTransitions, Outbox, Reporting, StockHolds, StockReservation
+from Database.OrderDb import Order, OrderLine
+from Database.ProductRepository import ProductNotFound, ProductRepository
+from Database.StockReservation import InsufficientStock
+from Utils.OrderStatus import INVALID_INITIAL_STATUS_MESSAGE, OrderStatus, is_initial_status
+
+'''
+Data access for orders, shared by the sync and async routers.
+
+Placing an order reserves its stock with a conditional UPDATE and writes the
+order, the sales rollups (Reporting.py) and the outbox events (Outbox.py) in
+the caller's transaction, and a PENDING order starts a time-limited stock
+hold (StockHolds.py). Status changes and deletion go through
+OrderTransitions.py.
+
+Every order has one or more order_line rows. A single-line order also keeps
+its product, quantity and price on the Order header, which the single-item
+endpoints read and write; orders with several lines are read through
+get_full() and page_full(), which load the lines of a whole page with one
+selectin query and their products with one batched lookup, however many
+lines there are. Both fall back to the archive (OrderArchive.py) for orders
+that were archived. Writes do not commit; the routers run them through
+WriteQueue.run_write or Idempotency.run_idempotent. AsyncOrderRepository runs
+the same code on an AsyncSession.
+'''
+
+class OrderNotFound(LookupError):
+    """
+    Raised when the order does not exist.
+    """
+
+    def __init__(self):
+        super().__init__("Order not found")
+
+class OrderStateError(ValueError):
+    """
+    Raised when the order's current status does not allow the change, or a new order is given a status it
+    cannot start in.
+    """
+
+def check_initial_status(status: str):
+    """
+    :raises OrderStateError: Unless an order may be created in status, see OrderStatus.INITIAL_STATUSES.
+    """
+    if not is_initial_status(status):
+        raise OrderStateError(INVALID_INITIAL_STATUS_MESSAGE)
+
+class ProductsNotFound(LookupError):
+    """
+    Raised by an all-or-nothing batch when lines reference products that do not exist.
+    """
+
+    def __init__(self, lines: list):
+        """
+        :param lines: {"line": index, "product_id": id} for every offending line.
+        """
+        super().__init__("Product not found")
+        self.lines = lines
+
+class OrderRepository:
+    """
+    Orders on a sync Session.
+    """
+
+    def __init__(self, session):
+        """
+        :param session: Session the reads and writes run on; writes join its transaction.
+        """
+        self.session = session
+        self.products = ProductRepository(session)
+
+    def get(self, order_id: int):
+        """
+        :return: The order as a dict, live or archived, or None if it does not exist.
+        """
+        row = self.session.execute(select(*OrderDb.ORDER_COLUMNS).where(Order.order_id == order_id)).first()
+        if row is None:
+            return OrderArchive.get_archived_order(self.session, order_id)
+        return OrderDb.order_to_dict(row)
+
+    def place(self, order) -> int:
+        """
+        Reserves stock with one conditional UPDATE, then inserts the order in the same transaction.
+        Does not commit.
+
+        :param order: An OrderBo.
+        :return: ID of the new order.
+        :raises OrderStateError: If the status is not one an order may be created in.
+        :raises ProductNotFound: If the product does not exist.
+        :raises InsufficientStock: If the product has less stock than ordered.
+        """
+        check_initial_status(order.status)
+        reserved = StockReservation.reserve_stock_returning(self.session, order.product_id, order.quantity)
+        if reserved is None:
+            if self.products.get(order.product_id) is None:
+                raise ProductNotFound()
+            raise InsufficientStock({order.product_id: order.quantity})
+
+        unit_price, stock_quantity = reserved
+        # SQLite returns a whole price as an int; events carry it as a float like the batch path
+        unit_price = float(unit_price)
+        order_id = self.session.execute(
+            insert(Order).values(
+                product_id=order.product_id,
+                quantity=order.quantity,
+                status=order.status,
+                created_at=order.created_at,
+                unit_price=unit_price
+            ).returning(Order.order_id)
+        ).scalar_one()
+        self.session.execute(insert(OrderLine).values(
+            order_id=order_id, line_no=1, product_id=order.product_id, quantity=order.quantity, unit_price=unit_price
+        ))
+        Reporting.record_orders(self.session, [(order.product_id, order.status, order.quantity, unit_price, order.created_at)])
+        Outbox.orders_created(self.session, [{
+            "order_id": order_id, "product_id": order.product_id, "quantity": order.quantity,
+            "status": order.status, "unit_price": unit_price, "created_at": order.created_at
+        }])
+        Outbox.stock_taken(self.session, order.product_id, stock_quantity, order.quantity)
+        if order.status == OrderStatus.PENDING.value:
+            StockHolds.add_holds(self.session, [order_id])
+        return order_id
+
+    def place_batch(self, lines: list, all_or_nothing: bool = True):
+        """
+        Places many orders in the caller's transaction. Does not commit.
+
+        :param lines: OrderBo lines.
+        :param all_or_nothing: Fail the whole batch on the first unfulfillable line, otherwise skip such lines.
+        :return: (accepted (index, line) pairs, their new order IDs in the same order, failed lines).
+        :raises OrderStateError: If a line's status is not one an order may be created in, in either mode.
+        :raises ProductsNotFound: All-or-nothing only, if a line's product does not exist.
+        :raises InsufficientStock: All-or-nothing only, if a product has less stock than its lines ask for;
+            the caller must roll back, the reservations of the other products are not undone.
+        """
+        for line in lines:
+            check_initial_status(line.status)
+        # One IN query for every referenced product not already cached
+        products = self.products.get_many([line.product_id for line in lines])
+
+        accepted = []
+        failed = []
+        if all_or_nothing:
+            missing = [{"line": index, "product_id": line.product_id} for index, line in enumerate(lines) if line.product_id not in products]
+            if missing:
+                raise ProductsNotFound(missing)
+
+            quantities = {}
+            for line in lines:
+                quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+            if not StockReservation.reserve_stock_bulk(self.session, quantities):
+                raise InsufficientStock(quantities)
+            accepted = list(enumerate(lines))
+        else:
+            for index, line in enumerate(lines):
+                if line.product_id not in products:
+                    failed.append({"line": index, "product_id": line.product_id, "detail": "Product not found"})
+                elif not StockReservation.reserve_stock(self.session, line.product_id, line.quantity):
+                    failed.append({"line": index, "product_id": line.product_id, "detail": "Insufficient stock"})
+                else:
+                    accepted.append((index, line))
+
+        order_ids = []
+        if accepted:
+            order_ids = self.session.scalars(
+                insert(Order).returning(Order.order_id, sort_by_parameter_order=True),
+                [
+                    {"product_id": line.product_id, "quantity": line.quantity, "status": line.status, "created_at": line.created_at,
+                     "unit_price": products[line.product_id]["price"]}
+                    for _, line in accepted
+                ]
+            ).all()
+            self.session.execute(insert(OrderLine), [
+                {"order_id": order_id, "line_no": 1, "product_id": line.product_id, "quantity": line.quantity,
+                 "unit_price": products[line.product_id]["price"]}
+                for order_id, (_, line) in zip(order_ids, accepted)
+            ])
+            Reporting.record_orders(self.session, [
+                (line.product_id, line.status, line.quantity, products[line.product_id]["price"], line.created_at) for _, line in accepted
+            ])
+            Outbox.orders_created(self.session, [
+                {"order_id": order_id, "product_id": line.product_id, "quantity": line.quantity, "status": line.status,
+                 "unit_price": products[line.product_id]["price"], "created_at": line.created_at}
+                for order_id, (_, line) in zip(order_ids, accepted)
+            ])
+            taken = {}
+            for _, line in accepted:
+                taken[line.product_id] = taken.get(line.product_id, 0) + line.quantity
+            Outbox.check_low_stock(self.session, taken)
+            StockHolds.add_holds(self.session, [
+                order_id for order_id, (_, line) in zip(order_ids, accepted) if line.status == OrderStatus.PENDING.value
+            ])
+        return accepted, order_ids, failed
+
+    def place_full(self, order) -> dict:
+        """
+        Places one order with several lines: reserves the stock of every line with one executemany,
+        then inserts the header and the lines. Does not commit.
+
+        :param order: A MultiLineOrderBO.
+        :return: The order as served by get_full().
+        :raises OrderStateError: If the status is not one an order may be created in.
+        :raises ProductsNotFound: If a line's product does not exist.
+        :raises InsufficientStock: If a product has less stock than its line asks for; the caller must roll back.
+        """
+        check_initial_status(order.status)
+        lines = order.lines
+        products = self.products.get_many([line.product_id for line in lines])
+        missing = [{"line": index, "product_id": line.product_id} for index, line in enumerate(lines) if line.product_id not in products]
+        if missing:
+            raise ProductsNotFound(missing)
+
+        quantities = {line.product_id: line.quantity for line in lines}
+        if not StockReservation.reserve_stock_bulk(self.session, quantities):
+            raise InsufficientStock(quantities)
+
+        line_rows = [
+            {"line_no": line_no, "product_id": line.product_id, "quantity": line.quantity, "unit_price": products[line.product_id]["price"]}
+            for line_no, line in enumerate(lines, start=1)
+        ]
+        # a single-line order keeps its line on the header too, like the orders placed by POST /orders
+        single = line_rows[0] if len(line_rows) == 1 else {}
+        order_id = self.session.execute(
+            insert(Order).values(
+                product_id=single.get("product_id"),
+                quantity=single.get("quantity"),
+                unit_price=single.get("unit_price"),
+                status=order.status,
+                created_at=order.created_at
+            ).returning(Order.order_id)
+        ).scalar_one()
+        self.session.execute(insert(OrderLine), [{"order_id": order_id, **row} for row in line_rows])
+
+        Reporting.record_orders(self.session, [
+            (row["product_id"], order.status, row["quantity"], row["unit_price"], order.created_at, row["line_no"]) for row in line_rows
+        ])
+        Outbox.orders_created(self.session, [{
+            "order_id": order_id, "product_id": single.get("product_id"), "quantity": single.get("quantity"),
+            "status": order.status, "unit_price": single.get("unit_price"), "created_at": order.created_at, "lines": line_rows
+        }])
+        Outbox.check_low_stock(self.session, quantities)
+        if order.status == OrderStatus.PENDING.value:
+            StockHolds.add_holds(self.session, [order_id])
+
+        total = sum(row["quantity"] * row["unit_price"] for row in line_rows)
+        return {
+            "order_id": order_id,
+            "status": order.status,
+            "created_at": order.created_at,
+            "total": round(total, 2),
+            "lines": [{**row, "product": products[row["product_id"]]} for row in line_rows]
+        }
+
+    def _with_products(self, orders: list) -> list:
+        products = self.products.get_many([line.product_id for order in orders for line in order.lines])
+        return [OrderDb.order_with_lines_to_dict(order, products) for order in orders]
+
+    def get_full(self, order_id: int):
+        """
+        Reads an order with its lines and their products in at most three queries, plus two for an archived order.
+
+        :return: The order as a dict with its lines, or None if it does not exist.
+        """
+        order = self.session.scalars(
+            select(Order).options(selectinload(Order.lines)).where(Order.order_id == order_id)
+        ).first()
+        if order is None:
+            order = OrderArchive.get_archived_order_with_lines(self.session, order_id)
+        return self._with_products([order])[0] if order is not None else None
+
+    def page_full(self, limit: int, status: str = None, product_id: int = None, created_from=None, created_to=None,
+                  descending: bool = False, after_id: int = None) -> list:
+        """
+        Reads a page of orders by order_id with their lines and products: one query for the orders,
+        one for all their lines and at most one for the products missing from the product cache.
+
+        :param limit: Number of orders.
+        :param after_id: Continue after this order_id.
+        :return: Orders as dicts with their lines; see OrderDb.order_listing_statement for the filters.
+        """
+        statement = OrderDb.order_listing_statement(
+            status=status, product_id=product_id, created_from=created_from, created_to=created_to,
+            sort="order_id", descending=descending, after=(after_id,) if after_id is not None else None, columns=(Order,)
+        ).options(selectinload(Order.lines)).limit(limit)
+        return self._with_products(self.session.scalars(statement).all())
+
+    def short_products(self, quantities: dict) -> list:
+        """
+        Reports, against current stock, which products cannot cover the requested quantities.
+        Run it after the failed batch was rolled back.
+
+        :param quantities: Mapping of product_id to requested quantity, as carried by InsufficientStock.
+        :return: IDs of the products that are short.
+        """
+        stock = self.products.stock(quantities)
+        return [product_id for product_id, quantity in quantities.items() if stock.get(product_id, 0) < quantity]
+
+    def transition(self, order_ids, status: str):
+        """
+        Moves orders to status where allowed, see OrderTransitions.apply_transition. Does not commit.
+
+        :return: A TransitionReport.
+        """
+        return OrderTransitions.apply_transition(self.session, order_ids, status)
+
+    def set_status(self, order_id: int, status: str):
+        """
+        Moves one order to status; moving to CANCELLED gives its stock back in the same transaction.
+        Does not commit.
+
+        :raises OrderNotFound: If the order does not exist.
+        :raises OrderStateError: If its current status does not allow the move.
+        """
+        report = self.transition([order_id], status)
+        if report.missing:
+            raise OrderNotFound()
+        if report.rejected:
+            raise OrderStateError(f"Cannot change order status from {report.rejected[0]['status']} to {status}")
+
+    def delete(self, order_id: int):
+        """
+        Deletes an order that is not in a terminal status, giving its stock back if it still holds it.
+        Does not commit.
+
+        :raises OrderNotFound: If the order does not exist.
+        :raises OrderStateError: If the order is in a terminal status.
+        """
+        try:
+            deleted = OrderTransitions.delete_order(self.session, order_id)
+        except ValueError as e:
+            raise OrderStateError(str(e))
+        if not deleted:
+            raise OrderNotFound()
+
+class AsyncOrderRepository:
+    """
+    OrderRepository on an AsyncSession. Each method runs the sync implementation with
+    AsyncSession.run_sync, whose statements are awaited on the async driver underneath.
+    """
+
+    def __init__(self, session):
+        """
+        :param session: AsyncSession the reads and writes run on.
+        """
+        self.session = session
+
+    async def get(self, order_id: int):
+        row = (await self.session.execute(select(*OrderDb.ORDER_COLUMNS).where(Order.order_id == order_id))).first()
+        if row is None:
+            return await self.session.run_sync(lambda session: OrderArchive.get_archived_order(session, order_id))
+        return OrderDb.order_to_dict(row)
+
+    async def place(self, order) -> int:
+        return await self.session.run_sync(lambda session: OrderRepository(session).place(order))
+
+    async def place_batch(self, lines: list, all_or_nothing: bool = True):
+        return await self.session.run_sync(lambda session: OrderRepository(session).place_batch(lines, all_or_nothing))
+
+    async def place_full(self, order) -> dict:
+        return await self.session.run_sync(lambda session: OrderRepository(session).place_full(order))
+
+    async def get_full(self, order_id: int):
+        return await self.session.run_sync(lambda session: OrderRepository(session).get_full(order_id))
+
+    async def page_full(self, limit: int, **filters) -> list:
+        return await self.session.run_sync(lambda session: OrderRepository(session).page_full(limit, **filters))
+
+    async def short_products(self, quantities: dict) -> list:
+        return await self.session.run_sync(lambda session: OrderRepository(session).short_products(quantities))
+
+    async def transition(self, order_ids, status: str):
+        return await self.session.run_sync(lambda session: OrderRepository(session).transition(order_ids, status))
+
+    async def set_status(self, order_id: int, status: str):
+        return await self.session.run_sync(lambda session: OrderRepository(session).set_status(order_id, status))
+
+    async def delete(self, order_id: int):
+        return await self.session.run_sync(lambda session: OrderRepository(session).delete(order_id))
@@ -0,0 +1,225 @@
+from collections import defaultdict
+from sqlalchemy import delete, func, select, update
+from Database import OrderArchive, Outbox, Reporting, StockHolds
+from Database.OrderDb import Order, OrderLine, Product
+from Database.StockReservation import release_stock_bulk
+from Utils import OrderStatus
+
+'''
+Status changes and deletion of orders, with their side effects in the same
+transaction.
+
+Every change is a guarded UPDATE/DELETE (... WHERE status = <status read>),
+so an order that changed in between is left alone instead of being moved
+twice, and stock is given back exactly once. Stock goes back with an atomic
+increment of Product.stock_quantity, never a read-modify-write. The sales
+rollups (see Reporting.py) and the outbox events (see Outbox.py) are written
+in the same transaction, and so is dropping the stock hold (see
+StockHolds.py) of an order that leaves PENDING.
+
+An order with a product_id on its header is a single-line order and is
+handled from the header alone; the lines of the other orders are read with
+one IN query per chunk of orders.
+'''
+
+# order ids per IN (...) list, well below SQLite's bound parameter limit
+ID_CHUNK_SIZE = 5000
+
+class TransitionReport:
+    """
+    Outcome of moving a set of orders to one status.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self.updated = []
+        self.unchanged = []
+        self.rejected = []
+        self.missing = []
+        self.restocked = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.target,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "rejected": self.rejected,
+            "missing": self.missing,
+            "restocked": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in self.restocked.items()]
+        }
+
+def _chunks(values: list):
+    for start in range(0, len(values), ID_CHUNK_SIZE):
+        yield values[start:start + ID_CHUNK_SIZE]
+
+def _order_lines(session, orders) -> list:
+    """
+    Expands order headers into their lines.
+
+    :param orders: (order_id, product_id, quantity, unit_price, created_at) per order.
+    :return: (order_id, product_id, quantity, unit_price, created_at, line_no) per line, unit_price falling back to
+        the current product price for orders placed before it was recorded.
+    """
+    lines = []
+    created = {}
+    for order_id, product_id, quantity, unit_price, created_at in orders:
+        if product_id is not None:
+            lines.append((order_id, product_id, quantity, unit_price, created_at, 1))
+        else:
+            created[order_id] = created_at
+    unit_price = func.coalesce(OrderLine.unit_price, select(Product.price).where(Product.product_id == OrderLine.product_id).scalar_subquery())
+    for chunk in _chunks(list(created)):
+        lines.extend(
+            (order_id, product_id, quantity, price, created[order_id], line_no)
+            for order_id, product_id, quantity, price, line_no in session.execute(
+                select(OrderLine.order_id, OrderLine.product_id, OrderLine.quantity, unit_price, OrderLine.line_no)
+                .where(OrderLine.order_id.in_(chunk))
+            )
+        )
+    return lines
+
+def apply_transition(session, order_ids, target: str, only_from: str = None) -> TransitionReport:
+    """
+    Moves orders to target where TRANSITIONS allows it, restoring stock of orders that are cancelled
+    while they still hold it. Orders already in target are reported unchanged, the rest rejected.
+    Does not commit.
+
+    :param session: Session whose transaction the change joins.
+    :param order_ids: IDs of the orders to move.
+    :param target: The new status; must be a valid OrderStatus value.
+    :param only_from: Move only orders currently in this status and reject the others.
+    :return: A TransitionReport.
+    """
+    report = TransitionReport(target)
+    order_ids = list(dict.fromkeys(order_ids))
+
+    # current status of every order, then one guarded UPDATE per source status
+    by_source = defaultdict(list)
+    found = set()
+    for chunk in _chunks(order_ids):
+        for order_id, current in session.execute(select(Order.order_id, Order.status).where(Order.order_id.in_(chunk))):
+            found.add(order_id)
+            if current == target:
+                report.unchanged.append(order_id)
+            elif OrderStatus.can_transition(current, target) and only_from in (None, current):
+                by_source[current].append(order_id)
+            else:
+                report.rejected.append({"order_id": order_id, "status": current})
+    report.missing = [order_id for order_id in order_ids if order_id not in found]
+    if report.missing:
+        # archived orders are terminal and stay as they are
+        archived = OrderArchive.archived_statuses(session, report.missing)
+        for order_id, current in archived.items():
+            if current == target:
+                report.unchanged.append(order_id)
+            else:
+                report.rejected.append({"order_id": order_id, "status": current})
+        report.missing = [order_id for order_id in report.missing if order_id not in archived]
+
+    # orders placed before unit_price was recorded are valued at the current price, as in the backfill
+    unit_price = func.coalesce(Order.unit_price, select(Product.price).where(Product.product_id == Order.product_id).scalar_subquery())
+    restock = defaultdict(int)
+    for source, ids in by_source.items():
+        gives_back_stock = target == OrderStatus.OrderStatus.CANCELLED.value and OrderStatus.holds_stock(source)
+        for chunk in _chunks(ids):
+            rows = session.execute(
+                update(Order)
+                .where(Order.order_id.in_(chunk), Order.status == source)
+                .values(status=target)
+                .returning(Order.order_id, Order.product_id, Order.quantity, unit_price, Order.created_at)
+                .execution_options(synchronize_session=False)
+            ).all()
+            moved = set()
+            for row in rows:
+                moved.add(row.order_id)
+                report.updated.append(row.order_id)
+            lines = _order_lines(session, rows)
+            if gives_back_stock:
+                for _, product_id, quantity, _, _, _ in lines:
+                    restock[product_id] += quantity
+            Reporting.move_orders(session, (line[1:] for line in lines), source, target)
+            Outbox.orders_moved(session, ((order_id, product_id) for order_id, product_id, _, _, _ in rows), source, target)
+            if source == OrderStatus.OrderStatus.PENDING.value:
+                # paid: the hold is committed; cancelled: the stock was given back above
+                StockHolds.release_holds(session, moved)
+            lost = [order_id for order_id in chunk if order_id not in moved]
+            if lost:
+                # changed by someone else since it was read, or deleted
+                current_statuses = dict(session.execute(select(Order.order_id, Order.status).where(Order.order_id.in_(lost))).all())
+                for order_id in lost:
+                    current = current_statuses.get(order_id)
+                    if current is None:
+                        report.missing.append(order_id)
+                    elif current == target:
+                        report.unchanged.append(order_id)
+                    else:
+                        report.rejected.append({"order_id": order_id, "status": current})
+
+    release_stock_bulk(session, restock)
+    Outbox.stock_released(session, restock)
+    report.restocked = dict(restock)
+    return report
+
+def delete_order(session, order_id: int) -> bool:
+    """
+    Deletes an order that is not in a terminal status, giving its stock back if it still holds it.
+    Does not commit.
+
+    :param session: Session whose transaction the deletion joins.
+    :param order_id: ID of the order.
+    :return: True if deleted, False if the order does not exist.
+    :raises ValueError: If the order is in a terminal status.
+    """
+    unit_price = func.coalesce(Order.unit_price, select(Product.price).where(Product.product_id == Order.product_id).scalar_subquery())
+    row = session.execute(
+        select(Order.status, Order.product_id, Order.quantity, unit_price, Order.created_at).where(Order.order_id == order_id)
+    ).first()
+    if row is None:
+        if OrderArchive.archived_statuses(session, [order_id]):
+            raise ValueError("Cannot delete order in terminal state")
+        return False
+    current = row[0]
+    if OrderStatus.is_terminal(current):
+        raise ValueError("Cannot delete order in terminal state")
+    lines = _order_lines(session, [(order_id,) + tuple(row[1:])])
+
+    if current == OrderStatus.OrderStatus.PENDING.value:
+        StockHolds.release_holds(session, [order_id])
+    # the lines go first, under the same guard as the header
+    unchanged = select(Order.order_id).where(Order.order_id == order_id, Order.status == current)
+    session.execute(delete(OrderLine).where(OrderLine.order_id.in_(unchanged)).execution_options(synchronize_session=False))
+    result = session.execute(
+        delete(Order).where(Order.order_id == order_id, Order.status == current).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        # the status changed under us; read it again
+        return delete_order(session, order_id)
+    if OrderStatus.holds_stock(current):
+        released = defaultdict(int)
+        for _, product_id, quantity, _, _, _ in lines:
+            released[product_id] += quantity
+        release_stock_bulk(session, released)
+        Outbox.stock_released(session, released)
+    Reporting.remove_orders(session, [(product_id, current, quantity, price, created_at, line_no)
+                                      for _, product_id, quantity, price, created_at, line_no in lines])
+    Outbox.order_deleted(session, order_id, row.product_id, current)
+    return True
+
+def release_expired_holds(session, now: float, limit: int):
+    """
+    Cancels up to limit PENDING orders whose stock hold expired at or before now, giving their stock back.
+    Does not commit.
+
+    :param session: Session whose transaction the change joins.
+    :param now: Epoch seconds the holds are compared with.
+    :param limit: Most holds released.
+    :return: (TransitionReport of the cancellation, (order_id, expires_at) of every expired hold read).
+    """
+    holds = StockHolds.expired_holds(session, now, limit)
+    report = apply_transition(
+        session, [order_id for order_id, _ in holds], OrderStatus.OrderStatus.CANCELLED.value, only_from=OrderStatus.OrderStatus.PENDING.value
+    )
+    # holds of orders that are gone or no longer PENDING were left behind by changes made outside the service
+    stale = set(report.missing) | {rejected["order_id"] for rejected in report.rejected} | set(report.unchanged)
+    StockHolds.release_holds(session, stale)
+    return report, holds
@@ -0,0 +1,235 @@
+import threading
+import time
+import orjson
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from Database.OrderDb import OutboxCursor, OutboxEvent, OutboxLease, Product
+from Utils.JsonResponse import dumps
+from Utils.Settings import get_settings
+
+'''
+Transactional outbox for order and stock events.
+
+Events are inserted into outbox_event by the same transaction that makes the
+change, so an event exists exactly when its change committed: no event for a
+rolled-back order, no lost event for a committed one. Delivery is left to
+OutboxDispatcher, which reads the table in event_id order and remembers per
+sink how far it got (outbox_cursor), so delivery is at-least-once and
+survives restarts. Consumers should ignore event ids they have already seen.
+
+Committing a transaction that wrote events wakes the dispatcher up, so
+events are usually delivered within milliseconds; polling only covers
+events written by other processes. When several worker processes run a
+dispatcher, the one holding the outbox_lease row delivers to the durable
+sinks, so each event reaches them once rather than once per worker.
+'''
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS_CHANGED = "order.status_changed"
+ORDER_DELETED = "order.deleted"
+PRODUCT_LOW_STOCK = "product.low_stock"
+PRODUCT_STOCK_RELEASED = "product.stock_released"
+PRODUCT_STOCK_CHANGED = "product.stock_changed"
+
+EVENT_TYPES = (ORDER_CREATED, ORDER_STATUS_CHANGED, ORDER_DELETED, PRODUCT_LOW_STOCK, PRODUCT_STOCK_RELEASED, PRODUCT_STOCK_CHANGED)
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+def add_events(session, events):
+    """
+    Inserts events in the session's transaction with one executemany. Does nothing when the outbox is disabled.
+
+    :param session: Session whose transaction the events join.
+    :param events: (event_type, aggregate_id, payload dict) tuples.
+    """
+    if not get_settings().outbox_enabled:
+        return
+    now = time.time()
+    rows = [
+        {"event_type": event_type, "aggregate_id": aggregate_id, "payload": dumps(payload).decode(), "created_at": now}
+        for event_type, aggregate_id, payload in events
+    ]
+    if rows:
+        session.execute(insert(OutboxEvent), rows)
+        session.info["outbox_written"] = True
+
+def orders_created(session, orders):
+    """
+    :param orders: Dicts with order_id, product_id, quantity, status, unit_price and created_at.
+    """
+    add_events(session, ((ORDER_CREATED, order["order_id"], order) for order in orders))
+
+def orders_moved(session, rows, source: str, target: str):
+    """
+    :param rows: (order_id, product_id) of every order moved from source to target.
+    """
+    add_events(session, (
+        (ORDER_STATUS_CHANGED, order_id, {"order_id": order_id, "product_id": product_id, "from": source, "to": target})
+        for order_id, product_id in rows
+    ))
+
+def order_deleted(session, order_id: int, product_id: int, status: str):
+    add_events(session, [(ORDER_DELETED, order_id, {"order_id": order_id, "product_id": product_id, "status": status})])
+
+def stock_released(session, quantities: dict):
+    """
+    :param quantities: Mapping of product_id to the quantity given back.
+    """
+    add_events(session, (
+        (PRODUCT_STOCK_RELEASED, product_id, {"product_id": product_id, "quantity": quantity})
+        for product_id, quantity in quantities.items() if quantity
+    ))
+
+def _low_stock_event(product_id: int, stock_quantity: int):
+    return PRODUCT_LOW_STOCK, product_id, {
+        "product_id": product_id, "stock_quantity": stock_quantity, "threshold": get_settings().low_stock_threshold
+    }
+
+def stock_taken(session, product_id: int, stock_after: int, quantity: int):
+    """
+    Raises product.low_stock when taking quantity brought the product down to the threshold or below.
+    Only the order that crosses the threshold raises it, not every order after it.
+    """
+    threshold = get_settings().low_stock_threshold
+    if stock_after <= threshold < stock_after + quantity:
+        add_events(session, [_low_stock_event(product_id, stock_after)])
+
+def stock_changed(session, changes, source: str):
+    """
+    Raises product.stock_changed for stock set directly rather than taken or given back by orders,
+    and product.low_stock when the new value brings the product down to the threshold or below.
+
+    :param changes: (product_id, previous, stock_quantity) of every product whose stock was written.
+    :param source: What set it, e.g. 'update' or 'import'.
+    """
+    threshold = get_settings().low_stock_threshold
+    events = []
+    for product_id, previous, stock_quantity in changes:
+        if previous == stock_quantity:
+            continue
+        events.append((PRODUCT_STOCK_CHANGED, product_id, {
+            "product_id": product_id, "stock_quantity": stock_quantity, "previous": previous, "source": source
+        }))
+        if stock_quantity <= threshold < previous:
+            events.append(_low_stock_event(product_id, stock_quantity))
+    add_events(session, events)
+
+def check_low_stock(session, quantities: dict):
+    """
+    stock_taken for several products at once, reading their stock with one query.
+
+    :param quantities: Mapping of product_id to the quantity just taken.
+    """
+    if not get_settings().outbox_enabled or not quantities:
+        return
+    threshold = get_settings().low_stock_threshold
+    rows = session.execute(
+        select(Product.product_id, Product.stock_quantity)
+        .where(Product.product_id.in_(list(quantities)), Product.stock_quantity <= threshold)
+    ).all()
+    add_events(session, (
+        _low_stock_event(product_id, stock_quantity)
+        for product_id, stock_quantity in rows if stock_quantity + quantities[product_id] > threshold
+    ))
+
+def event_to_dict(row) -> dict:
+    return {
+        "id": row.event_id,
+        "type": row.event_type,
+        "aggregate_id": row.aggregate_id,
+        "created_at": row.created_at,
+        "data": orjson.loads(row.payload)
+    }
+
+def fetch_after(session, after_id: int, limit: int, types=None) -> list:
+    """
+    Returns up to limit events with an id above after_id, oldest first.
+
+    :param types: Only events of these types; all when None.
+    """
+    statement = select(OutboxEvent).where(OutboxEvent.event_id > after_id).order_by(OutboxEvent.event_id).limit(limit)
+    if types:
+        statement = statement.where(OutboxEvent.event_type.in_(types))
+    return [event_to_dict(row) for row in session.execute(statement).scalars()]
+
+def last_event_id(session) -> int:
+    return session.execute(select(func.max(OutboxEvent.event_id))).scalar() or 0
+
+def load_cursor(session, sink: str):
+    """
+    :return: The last event id delivered to sink, or None if it never received one.
+    """
+    return session.execute(select(OutboxCursor.last_event_id).where(OutboxCursor.sink == sink)).scalar()
+
+def _dialect_insert(session):
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+def save_cursor(session, sink: str, event_id: int):
+    """
+    Records that every event up to event_id was delivered to sink. Does not commit.
+    """
+    statement = _dialect_insert(session)(OutboxCursor).values(sink=sink, last_event_id=event_id)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[OutboxCursor.sink], set_={"last_event_id": statement.excluded.last_event_id}
+    ))
+
+def acquire_lease(session, name: str, owner: str, ttl: float) -> bool:
+    """
+    Takes or renews the lease called name for ttl seconds, unless another owner holds it and it
+    has not expired. Decided by one conditional upsert, so two processes can never both get it. Does not commit.
+
+    :return: Whether owner holds the lease.
+    """
+    now = time.time()
+    statement = _dialect_insert(session)(OutboxLease).values(name=name, owner=owner, expires_at=now + ttl)
+    statement = statement.on_conflict_do_update(
+        index_elements=[OutboxLease.name],
+        set_={"owner": statement.excluded.owner, "expires_at": statement.excluded.expires_at},
+        where=(OutboxLease.owner == owner) | (OutboxLease.expires_at < now)
+    )
+    return session.execute(statement).rowcount == 1
+
+def release_lease(session, name: str, owner: str):
+    """
+    Gives the lease up if owner holds it, so another process can take over without waiting for it to expire. Does not commit.
+    """
+    session.execute(delete(OutboxLease).where(OutboxLease.name == name, OutboxLease.owner == owner))
+
+def purge_delivered(session, up_to: int = None) -> int:
+    """
+    Deletes events older than outbox_retention. Does not commit.
+
+    :param up_to: Keep events above this id, e.g. the lowest cursor of the sinks, so undelivered events survive.
+    :return: Number of events deleted.
+    """
+    statement = delete(OutboxEvent).where(OutboxEvent.created_at < time.time() - get_settings().outbox_retention)
+    if up_to is not None:
+        statement = statement.where(OutboxEvent.event_id <= up_to)
+    return session.execute(statement).rowcount
+
+def add_listener(callback):
+    """
+    Calls callback() after every commit that wrote events. It runs on the committing thread and must not block.
+    """
+    with _listeners_lock:
+        _listeners.append(callback)
+
+def remove_listener(callback):
+    with _listeners_lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session):
+    if session.info.pop("outbox_written", False):
+        for callback in list(_listeners):
+            callback()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("outbox_written", None)
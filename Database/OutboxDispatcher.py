@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from Database import Outbox, WriteQueue
+from Database.DbEngine import get_database_session
+from Utils.EventSinks import EventBroker, build_sinks
+from Utils.Settings import get_settings
+
+'''
+Background task delivering outbox events to the sinks.
+
+Each sink is fed independently from its own cursor, so a webhook that is down
+does not hold back the file sink or live subscribers. A failed batch is
+retried with exponential backoff and delivered again in full: delivery is
+at-least-once. Durable sinks store their cursor after every batch; the
+broker starts at the newest event when the process starts.
+
+The dispatcher runs on the application's event loop (started and stopped by
+the app's lifespan); database reads and cursor writes run in worker threads.
+
+Every worker process runs a dispatcher, since each feeds its own broker, but
+only the one holding the outbox lease delivers to the durable sinks. It
+renews the lease every third of outbox_lease_ttl; when it stops renewing,
+another worker takes over from the stored cursors.
+'''
+
+logger = logging.getLogger(__name__)
+
+# seconds between purges of delivered events older than outbox_retention
+PURGE_INTERVAL = 300.0
+MAX_BACKOFF = 60.0
+LEASE_NAME = "durable-sinks"
+
+class _SinkState:
+    __slots__ = ("sink", "cursor", "delivered", "failures", "last_error", "retry_at")
+
+    def __init__(self, sink, cursor: int):
+        self.sink = sink
+        self.cursor = cursor
+        self.delivered = 0
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = 0.0
+
+class OutboxDispatcher:
+    """
+    Delivers outbox events to a list of sinks plus an in-process EventBroker.
+    """
+
+    def __init__(self, sinks: list, broker: EventBroker, batch_size: int = 500, poll_interval: float = 1.0, lease_ttl: float = 15.0, session_factory=get_database_session):
+        """
+        :param sinks: Durable sinks, see Utils/EventSinks.py.
+        :param broker: Broker feeding live subscribers.
+        :param batch_size: Most events delivered to a sink at once.
+        :param poll_interval: Seconds between polls when no commit signalled new events.
+        :param lease_ttl: Seconds the lease on the durable sinks lasts without renewal.
+        :param session_factory: Creates the sessions used to read events and store cursors.
+        """
+        self.sinks = sinks
+        self.broker = broker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.holds_lease = False
+        self._lease_renew_at = 0.0
+        self._states = []
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._last_purge = 0.0
+
+    def _with_session(self, work):
+        session = self.session_factory()
+        try:
+            return work(session)
+        finally:
+            session.close()
+
+    def _load_cursors(self) -> list:
+        def load(session):
+            start = Outbox.last_event_id(session)
+            cursors = [Outbox.load_cursor(session, sink.name) for sink in self.sinks]
+            # a new durable sink starts with the events still in the table
+            return [0 if cursor is None else cursor for cursor in cursors] + [start]
+        return self._with_session(load)
+
+    async def start(self):
+        """
+        Starts delivering on the running event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        cursors = await asyncio.to_thread(self._load_cursors)
+        self._states = [_SinkState(sink, cursor) for sink, cursor in zip(self.sinks + [self.broker], cursors)]
+        Outbox.add_listener(self.notify)
+        self._task = asyncio.create_task(self._run(), name="outbox-dispatcher")
+
+    async def stop(self):
+        Outbox.remove_listener(self.notify)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.holds_lease:
+            self.holds_lease = False
+            try:
+                await asyncio.to_thread(self._write, lambda writer: Outbox.release_lease(writer, LEASE_NAME, self.owner))
+            except Exception:
+                logger.exception("Releasing the outbox lease failed")
+        for state in self._states:
+            await state.sink.close()
+
+    def notify(self):
+        """
+        Wakes the dispatcher up; safe to call from any thread.
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def _write(self, work):
+        return self._with_session(lambda session: WriteQueue.run_write(session, work))
+
+    async def _check_lease(self, now: float):
+        if not self.sinks or now < self._lease_renew_at:
+            return
+        try:
+            held = await asyncio.to_thread(self._write, lambda writer: Outbox.acquire_lease(writer, LEASE_NAME, self.owner, self.lease_ttl))
+        except Exception:
+            # without a renewal the lease may pass to another worker; stop delivering until it is confirmed
+            logger.exception("Renewing the outbox lease failed")
+            self.holds_lease = False
+            return
+        if held and not self.holds_lease:
+            # the previous holder advanced the stored cursors
+            durable = [state for state in self._states if state.sink.durable]
+            cursors = await asyncio.to_thread(
+                self._with_session, lambda session: [Outbox.load_cursor(session, state.sink.name) for state in durable]
+            )
+            for state, cursor in zip(durable, cursors):
+                state.cursor = cursor or 0
+            logger.info("Took the outbox lease as %s", self.owner)
+        self.holds_lease = held
+        self._lease_renew_at = now + self.lease_ttl / 3
+
+    async def _deliver(self, state: _SinkState) -> bool:
+        # returns whether the sink may have more events waiting
+        events = await asyncio.to_thread(self._with_session, lambda session: Outbox.fetch_after(session, state.cursor, self.batch_size))
+        if not events:
+            return False
+        try:
+            await state.sink.deliver(events)
+        except Exception as e:
+            state.failures += 1
+            state.last_error = f"{type(e).__name__}: {e}"
+            state.retry_at = time.monotonic() + min(MAX_BACKOFF, 0.5 * 2 ** (state.failures - 1))
+            logger.warning("Outbox delivery to %s failed (%d in a row): %s", state.sink.name, state.failures, state.last_error)
+            return False
+        last = events[-1]["id"]
+        if state.sink.durable:
+            await asyncio.to_thread(self._write, lambda writer: Outbox.save_cursor(writer, state.sink.name, last))
+        state.cursor = last
+        state.delivered += len(events)
+        state.failures = 0
+        state.last_error = None
+        return len(events) == self.batch_size
+
+    def _purge(self):
+        durable = [state.cursor for state in self._states if state.sink.durable]
+        up_to = min(durable) if durable else None
+        self._write(lambda writer: Outbox.purge_delivered(writer, up_to))
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            more = False
+            now = time.monotonic()
+            await self._check_lease(now)
+            for state in self._states:
+                if state.retry_at > now or (state.sink.durable and not self.holds_lease):
+                    continue
+                try:
+                    more = await self._deliver(state) or more
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # reading the outbox failed, e.g. the database is busy; try again on the next round
+                    logger.exception("Outbox dispatcher round failed")
+            # cursors of a worker without the lease are stale, the holder purges
+            if now - self._last_purge > PURGE_INTERVAL and (self.holds_lease or not self.sinks):
+                self._last_purge = now
+                try:
+                    await asyncio.to_thread(self._purge)
+                except Exception:
+                    logger.exception("Outbox purge failed")
+            if not more:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "subscribers": self.broker.subscribers,
+            "lease_holder": self.holds_lease,
+            "sinks": [
+                {
+                    "sink": state.sink.name,
+                    "durable": state.sink.durable,
+                    "cursor": state.cursor,
+                    "delivered": state.delivered,
+                    "failures": state.failures,
+                    "last_error": state.last_error,
+                    "retry_in": max(0.0, state.retry_at - now)
+                }
+                for state in self._states
+            ]
+        }
+
+_dispatcher = None
+
+def get_dispatcher():
+    """
+    Returns the running dispatcher of this process, or None.
+    """
+    return _dispatcher
+
+async def start_dispatcher():
+    """
+    Starts the process-wide dispatcher when outbox_dispatch_enabled is set. Called from the app lifespan.
+    """
+    global _dispatcher
+    settings = get_settings()
+    if _dispatcher is not None or not settings.outbox_dispatch_enabled:
+        return _dispatcher
+    dispatcher = OutboxDispatcher(
+        build_sinks(settings.outbox_sinks, settings.outbox_webhook_timeout),
+        EventBroker(),
+        batch_size=settings.outbox_batch_size,
+        poll_interval=settings.outbox_poll_interval,
+        lease_ttl=settings.outbox_lease_ttl
+    )
+    await dispatcher.start()
+    _dispatcher = dispatcher
+    return dispatcher
+
+async def stop_dispatcher():
+    global _dispatcher
+    if _dispatcher is not None:
+        dispatcher, _dispatcher = _dispatcher, None
+        await dispatcher.stop()
+
+def dispatcher_stats() -> dict:
+    return _dispatcher.stats() if _dispatcher is not None else {"enabled": False}
@@ -0,0 +1,204 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from Database import CacheBus, OrderDb
+from Database.OrderDb import Product
+from Utils.Cache import build_cache
+from Utils.Settings import get_settings
+
+'''
+Read-through cache of products.
+
+Single products are cached as dicts under product:<id>. Pages of GET /products
+are cached as lists of product ids under a generation token that changes
+whenever a product is created or deleted, so a stock change only evicts the
+one product it touched.
+
+Writers call mark_product_changed() on their session; the cached entries are
+dropped after the transaction commits. With several worker processes, the
+same transaction also publishes the change on the cache bus (CacheBus.py) so
+the other workers drop their copies too. Stock reservation never reads from this
+cache: it decides with a conditional UPDATE against the database.
+'''
+
+PRODUCT_COLUMNS = (
+    Product.product_id,
+    Product.sku,
+    Product.product_name,
+    Product.price,
+    Product.stock_quantity,
+    Product.created_at
+)
+
+PRODUCT_FIELDS = tuple(column.key for column in PRODUCT_COLUMNS)
+
+def product_to_dict(row) -> dict:
+    """
+    Turns a tuple of PRODUCT_COLUMNS into the product dict served by the API.
+    """
+    product = dict(zip(PRODUCT_FIELDS, row))
+    # products are dated like orders; created_at is stored as a DateTime at midnight
+    if isinstance(product["created_at"], datetime):
+        product["created_at"] = product["created_at"].date()
+    return product
+
+PAGE_GENERATION_KEY = "products:page-generation"
+
+def _build_cache():
+    # the backend and its size are fixed once the cache exists; TTLs are read on every write
+    settings = get_settings()
+    return build_cache(settings.product_cache_backend, settings.product_cache_size, settings.product_cache_ttl, redis_url=settings.cache_redis_url)
+
+cache = _build_cache()
+
+def _product_key(product_id: int) -> str:
+    return f"product:{product_id}"
+
+def get_product(session, product_id: int):
+    """
+    Returns a product as a dict, from the cache when possible.
+
+    :param session: Session used on a cache miss.
+    :param product_id: ID of the product.
+    :return: Product dict or None if it does not exist.
+    """
+    return get_products_by_ids(session, [product_id]).get(product_id)
+
+def get_products_by_ids(session, product_ids) -> dict:
+    """
+    Returns the products that exist among product_ids, loading every miss with one IN query.
+
+    :param session: Session used for the misses.
+    :param product_ids: IDs to look up.
+    :return: Mapping of product_id to product dict.
+    """
+    products, missing = cached_products(product_ids)
+    if missing:
+        store_products(products, session.execute(products_statement(missing)))
+    return products
+
+def cached_products(product_ids):
+    """
+    Splits product_ids into the products found in the cache and the ids that must be loaded.
+
+    :return: (mapping of product_id to product dict, list of missing ids)
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    cached = cache.get_many([_product_key(product_id) for product_id in product_ids])
+    products = {product["product_id"]: product for product in cached.values()}
+    return products, [product_id for product_id in product_ids if product_id not in products]
+
+def products_statement(product_ids):
+    """
+    SELECT of the cached product columns for the given ids.
+    """
+    return select(*PRODUCT_COLUMNS).where(Product.product_id.in_(product_ids))
+
+def store_products(products: dict, rows):
+    """
+    Caches rows loaded with products_statement and adds them to products.
+    """
+    for row in rows:
+        product = product_to_dict(row)
+        products[product["product_id"]] = product
+        cache.set(_product_key(product["product_id"]), product, ttl=get_settings().product_cache_ttl)
+
+def _page_generation() -> str:
+    generation = cache.get(PAGE_GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(PAGE_GENERATION_KEY, generation, ttl=get_settings().product_cache_ttl)
+    return generation
+
+def get_product_page(session, limit: int, offset: int = 0, after_id: int = None) -> list:
+    """
+    Returns a page of product dicts ordered by product_id.
+    The ids of the page are cached until a product is created or deleted; the rows come from
+    the per-product cache so their stock is as fresh as get_product's.
+    """
+    key = page_key(limit, offset, after_id)
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = list(session.execute(page_statement(limit, offset, after_id)).scalars())
+        cache.set(key, product_ids, ttl=get_settings().product_cache_ttl)
+    return ordered_page(product_ids, get_products_by_ids(session, product_ids))
+
+def page_key(limit: int, offset: int, after_id: int) -> str:
+    return f"products:page:{_page_generation()}:{after_id}:{offset}:{limit}"
+
+def page_statement(limit: int, offset: int, after_id: int):
+    """
+    SELECT of the product ids on one page, keyset on product_id when after_id is given.
+    """
+    statement = select(Product.product_id).order_by(Product.product_id)
+    if after_id is not None:
+        statement = statement.where(Product.product_id > after_id)
+    elif offset:
+        statement = statement.offset(offset)
+    return statement.limit(limit)
+
+def ordered_page(product_ids: list, products: dict) -> list:
+    # a product deleted since the page was cached is simply skipped
+    return [products[product_id] for product_id in product_ids if product_id in products]
+
+def invalidate_products(*product_ids: int, listing: bool = False):
+    """
+    Drops cached products immediately. With listing, cached pages and the product count are dropped as well.
+    """
+    cache.delete(*[_product_key(product_id) for product_id in product_ids])
+    if listing:
+        cache.delete(PAGE_GENERATION_KEY)
+        OrderDb.invalidate_product_count()
+
+def invalidate_all():
+    """
+    Drops every cached product and page and the product count, e.g. after a bulk import.
+    """
+    cache.clear()
+    OrderDb.invalidate_product_count()
+
+def mark_product_changed(session, product_id: int, listing: bool = False):
+    """
+    Schedules the product's cache entry (and with listing, the cached pages) to be dropped
+    once the session's transaction commits.
+    """
+    pending = session.info.setdefault("changed_products", set())
+    pending.add(product_id)
+    if listing:
+        session.info["changed_product_listing"] = True
+
+def mark_all_changed(session):
+    """
+    Schedules the whole cache to be dropped once the session's transaction commits, for changes
+    that do not know which products they touched, such as an import upserting by SKU.
+    """
+    session.info["changed_product_all"] = True
+
+@event.listens_for(Session, "before_commit")
+def _publish_before_commit(session):
+    if not CacheBus.enabled():
+        return
+    product_ids = session.info.get("changed_products")
+    listing = session.info.get("changed_product_listing", False)
+    everything = session.info.get("changed_product_all", False)
+    if product_ids or listing or everything:
+        CacheBus.publish(session, product_ids or (), listing=listing, everything=everything)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    product_ids = session.info.pop("changed_products", None)
+    listing = session.info.pop("changed_product_listing", False)
+    if session.info.pop("changed_product_all", False):
+        invalidate_all()
+    elif product_ids or listing:
+        invalidate_products(*(product_ids or ()), listing=listing)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("changed_products", None)
+    session.info.pop("changed_product_listing", None)
+    session.info.pop("changed_product_all", None)
+
+def cache_stats() -> dict:
+    return cache.stats()
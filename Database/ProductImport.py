@@ -0,0 +1,209 @@
+import csv
+import json
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from Database import Outbox, ProductCache, WriteQueue
+from Database.OrderDb import Product, get_database_session
+from Database.StockReservation import is_database_busy
+from Modules.Product.model.ProductBO import ProductBO
+
+'''
+Streaming bulk import of products, upserting on sku.
+
+Input is consumed one line at a time and written in batches of batch_size,
+each batch in its own transaction through the write queue, so memory stays
+flat however large the file is. Rows that fail validation or violate a
+constraint are reported with their row number and skipped, as are the rows
+of a batch the database stayed busy for after the usual retries; the rest
+of the load carries on. Stock changes to existing products are written to
+the outbox by the transaction that upserts them.
+'''
+
+FORMATS = ("csv", "ndjson")
+
+# skus per IN list when reading stock around an upsert, below SQLite's bound parameter limit
+SKU_CHUNK_SIZE = 500
+
+class ImportReport:
+    """
+    Running totals of a product import. Only the first max_errors row errors are kept.
+    """
+
+    def __init__(self, max_errors: int = 1000):
+        self.rows = 0
+        self.upserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row_number: int, error: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "error": error})
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+def format_from_filename(filename: str) -> str:
+    """
+    Guesses the input format from a file extension (.csv, .ndjson, .jsonl).
+    """
+    lowered = filename.lower()
+    if lowered.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def iter_rows(lines, input_format: str):
+    """
+    Yields (row_number, row) pairs from a line iterator without reading it all.
+
+    :param lines: Text line iterator, e.g. an open file.
+    :param input_format: 'csv' (with a header row) or 'ndjson'.
+    :return: Generator of (row_number, dict or error message).
+    """
+    if input_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif input_format == "ndjson":
+        for row_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, f"Invalid JSON: {e}"
+                continue
+            yield row_number, row if isinstance(row, dict) else "Expected a JSON object"
+    else:
+        raise ValueError(f"Unsupported format {input_format!r}, must be one of {FORMATS}")
+
+def _upsert_statement(session):
+    # ON CONFLICT is spelled the same way by SQLite and PostgreSQL
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(Product.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=[Product.__table__.c.sku],
+        set_={
+            "product_name": statement.excluded.product_name,
+            "price": statement.excluded.price,
+            "stock_quantity": statement.excluded.stock_quantity
+        }
+    )
+
+def _to_values(product: ProductBO) -> dict:
+    created_at = product.created_at
+    if not isinstance(created_at, datetime):
+        created_at = datetime(created_at.year, created_at.month, created_at.day)
+    return {
+        "sku": product.sku,
+        "product_name": product.product_name,
+        "price": product.price,
+        "stock_quantity": product.stock_quantity,
+        "created_at": created_at
+    }
+
+def _stock_by_sku(session, skus) -> dict:
+    skus = sorted(set(skus))
+    stock = {}
+    for start in range(0, len(skus), SKU_CHUNK_SIZE):
+        for sku, product_id, stock_quantity in session.execute(
+            select(Product.sku, Product.product_id, Product.stock_quantity).where(Product.sku.in_(skus[start:start + SKU_CHUNK_SIZE]))
+        ):
+            stock[sku] = (product_id, stock_quantity)
+    return stock
+
+def _upsert(session, statement, rows: list):
+    """
+    Upserts rows and raises product.stock_changed, in the same transaction, for every existing
+    product whose stock they change. New products are not stock changes.
+    """
+    skus = [values["sku"] for values in rows]
+    before = _stock_by_sku(session, skus)
+    session.execute(statement, rows)
+    product_ids = {sku: product_id for sku, (product_id, _) in _stock_by_sku(session, skus).items()}
+    # a sku may come twice in a batch; the later row changes the stock the earlier one set
+    current = {sku: stock_quantity for sku, (_, stock_quantity) in before.items()}
+    changes = []
+    for values in rows:
+        sku = values["sku"]
+        if sku in current:
+            changes.append((product_ids[sku], current[sku], values["stock_quantity"]))
+        current[sku] = values["stock_quantity"]
+    Outbox.stock_changed(session, changes, "import")
+    ProductCache.mark_all_changed(session)
+
+def _add_busy_errors(report: ImportReport, rows: list, error: OperationalError):
+    if not is_database_busy(error):
+        raise error
+    for row_number, _ in rows:
+        report.add_error(row_number, f"Database busy, row not written: {error.orig}")
+
+def _write_batch(batch: list, report: ImportReport):
+    # through the write queue like every other write, so the import takes turns with the request handlers
+    session = get_database_session()
+    try:
+        statement = _upsert_statement(session)
+        try:
+            WriteQueue.run_write(session, lambda writer: _upsert(writer, statement, [values for _, values in batch]))
+            report.upserted += len(batch)
+        except IntegrityError:
+            # isolate the offending rows instead of failing the whole batch
+            for index, (row_number, values) in enumerate(batch):
+                try:
+                    WriteQueue.run_write(session, lambda writer: _upsert(writer, statement, [values]))
+                    report.upserted += 1
+                except IntegrityError as e:
+                    report.add_error(row_number, str(e.orig))
+                except OperationalError as e:
+                    # still busy after the retries: the rest of the batch would be too
+                    _add_busy_errors(report, batch[index:], e)
+                    break
+        except OperationalError as e:
+            _add_busy_errors(report, batch, e)
+        report.batches += 1
+    finally:
+        session.close()
+
+def import_products(lines, input_format: str = "csv", batch_size: int = 1000, max_errors: int = 1000) -> ImportReport:
+    """
+    Upserts products read from a line iterator, committing every batch_size rows.
+
+    :param lines: Text line iterator with CSV (header row required) or NDJSON content.
+    :param input_format: 'csv' or 'ndjson'.
+    :param batch_size: Number of rows written per transaction.
+    :param max_errors: Number of row errors to keep in the report.
+    :return: ImportReport with totals and per-row errors.
+    """
+    report = ImportReport(max_errors=max_errors)
+    batch = []
+    for row_number, row in iter_rows(lines, input_format):
+        report.rows += 1
+        if isinstance(row, str):
+            report.add_error(row_number, row)
+            continue
+        try:
+            product = ProductBO(**row)
+        except (ValidationError, TypeError) as e:
+            report.add_error(row_number, str(e))
+            continue
+        batch.append((row_number, _to_values(product)))
+        if len(batch) >= batch_size:
+            _write_batch(batch, report)
+            batch = []
+    if batch:
+        _write_batch(batch, report)
+    return report
@@ -0,0 +1,220 @@
+from datetime import date, datetime
+from sqlalchemy import delete, insert, select, update
+from Database import OrderDb, Outbox, ProductCache, ProductSearch
+from Database.OrderDb import Product
+from Database.ProductCache import PRODUCT_COLUMNS, product_to_dict
+
+'''
+Data access for products, shared by the sync and async routers.
+
+Reads go through the product cache (ProductCache.py). Writes are units of
+work that do not commit: the routers run them through WriteQueue.run_write
+or Idempotency.run_idempotent, and every write marks the products it changed
+so the cache, and through the cache bus the other workers, drop them once
+the transaction commits. AsyncProductRepository runs the same code on an
+AsyncSession, so the two request paths cannot drift apart.
+'''
+
+class ProductNotFound(LookupError):
+    """
+    Raised when the product does not exist.
+    """
+
+    def __init__(self):
+        super().__init__("Product not found")
+
+class DuplicateSku(ValueError):
+    """
+    Raised when another product already has the SKU.
+    """
+
+    def __init__(self):
+        super().__init__("Product with this SKU already exists")
+
+def _stored_value(value):
+    # created_at is a DateTime column, requests send a date
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+class ProductRepository:
+    """
+    Products on a sync Session.
+    """
+
+    def __init__(self, session):
+        """
+        :param session: Session the reads and writes run on; writes join its transaction.
+        """
+        self.session = session
+
+    def get(self, product_id: int):
+        """
+        :return: The product as a dict, from the cache when possible, or None if it does not exist.
+        """
+        return ProductCache.get_product(self.session, product_id)
+
+    def get_many(self, product_ids) -> dict:
+        """
+        :return: Mapping of product_id to product dict for the products that exist, loading the misses with one IN query.
+        """
+        return ProductCache.get_products_by_ids(self.session, product_ids)
+
+    def search(self, query: str, limit: int, after=None) -> list:
+        """
+        Ranked product search, see ProductSearch.py.
+
+        :param after: (score, product_id) of the last result of the previous page.
+        :return: (score, product dict) per result, best first.
+        :raises InvalidSearchQuery: If the query has no searchable token.
+        """
+        hits = ProductSearch.search(self.session, query, limit, after)
+        products = self.get_many([product_id for _, product_id in hits])
+        # a product deleted since the index was read is skipped
+        return [(score, products[product_id]) for score, product_id in hits if product_id in products]
+
+    def page(self, limit: int, offset: int = 0, after_id: int = None) -> list:
+        """
+        :return: Products ordered by product_id, starting after after_id when given, otherwise at offset.
+        """
+        return ProductCache.get_product_page(self.session, limit=limit, offset=offset, after_id=after_id)
+
+    def count(self, use_cache: bool = True) -> int:
+        return OrderDb.get_total_product_count(session=self.session, use_cache=use_cache)
+
+    def stock(self, product_ids) -> dict:
+        """
+        Reads current stock, never the cached copy.
+
+        :return: Mapping of product_id to stock_quantity for the products that exist.
+        """
+        return dict(self.session.execute(
+            select(Product.product_id, Product.stock_quantity).where(Product.product_id.in_(list(product_ids)))
+        ).all())
+
+    def _sku_taken(self, sku: str, product_id: int = None) -> bool:
+        statement = select(Product.product_id).where(Product.sku == sku)
+        if product_id is not None:
+            statement = statement.where(Product.product_id != product_id)
+        return self.session.execute(statement.limit(1)).first() is not None
+
+    def create(self, product) -> dict:
+        """
+        Inserts a product. Does not commit.
+
+        :param product: A ProductBO.
+        :return: The stored product as a dict.
+        :raises DuplicateSku: If the SKU is taken.
+        """
+        if self._sku_taken(product.sku):
+            raise DuplicateSku()
+        product_id = self.session.execute(
+            insert(Product).values(
+                sku=product.sku,
+                product_name=product.product_name,
+                price=product.price,
+                stock_quantity=product.stock_quantity,
+                created_at=product.created_at
+            ).returning(Product.product_id)
+        ).scalar_one()
+        ProductCache.mark_product_changed(self.session, product_id, listing=True)
+        return {
+            "product_id": product_id,
+            "sku": product.sku,
+            "product_name": product.product_name,
+            "price": product.price,
+            "stock_quantity": product.stock_quantity,
+            "created_at": product.created_at
+        }
+
+    def update(self, product_id: int, changes: dict):
+        """
+        Applies a partial update, writing only the columns whose value differs from the stored row.
+        Does not commit.
+
+        :param product_id: ID of the product.
+        :param changes: New values by column name.
+        :return: (product dict after the update, sorted names of the columns that were written).
+            Nothing is written, and the list is empty, when every value is already stored.
+        :raises ProductNotFound: If the product does not exist.
+        :raises DuplicateSku: If the SKU changes to one another product has.
+        """
+        current = self.session.execute(select(*PRODUCT_COLUMNS).where(Product.product_id == product_id)).first()
+        if current is None:
+            raise ProductNotFound()
+        product = product_to_dict(current)
+        changed = {field: value for field, value in changes.items() if product[field] != value}
+        if not changed:
+            return product, []
+        if "sku" in changed and self._sku_taken(changed["sku"], product_id):
+            raise DuplicateSku()
+
+        result = self.session.execute(
+            update(Product).where(Product.product_id == product_id)
+            .values({field: _stored_value(value) for field, value in changed.items()})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # deleted since it was read
+            raise ProductNotFound()
+        if "stock_quantity" in changed:
+            Outbox.stock_changed(self.session, [(product_id, product["stock_quantity"], changed["stock_quantity"])], "update")
+        ProductCache.mark_product_changed(self.session, product_id)
+        # SQLite's RETURNING hands back a REAL with an integral value as an int, so the row is built here
+        return {**product, **changed}, sorted(changed)
+
+    def delete(self, product_id: int):
+        """
+        Deletes a product. Does not commit.
+
+        :raises ProductNotFound: If the product does not exist.
+        """
+        result = self.session.execute(
+            delete(Product).where(Product.product_id == product_id).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise ProductNotFound()
+        ProductCache.mark_product_changed(self.session, product_id, listing=True)
+
+class AsyncProductRepository:
+    """
+    ProductRepository on an AsyncSession. Each method runs the sync implementation with
+    AsyncSession.run_sync, whose statements are awaited on the async driver underneath.
+    """
+
+    def __init__(self, session):
+        """
+        :param session: AsyncSession the reads and writes run on.
+        """
+        self.session = session
+
+    async def get(self, product_id: int):
+        return (await self.get_many([product_id])).get(product_id)
+
+    async def get_many(self, product_ids) -> dict:
+        # the hottest read skips run_sync: hits come from the cache, misses are one awaited IN query
+        products, missing = ProductCache.cached_products(product_ids)
+        if missing:
+            ProductCache.store_products(products, await self.session.execute(ProductCache.products_statement(missing)))
+        return products
+
+    async def search(self, query: str, limit: int, after=None) -> list:
+        return await self.session.run_sync(lambda session: ProductRepository(session).search(query, limit, after))
+
+    async def page(self, limit: int, offset: int = 0, after_id: int = None) -> list:
+        return await self.session.run_sync(lambda session: ProductRepository(session).page(limit, offset, after_id))
+
+    async def count(self, use_cache: bool = True) -> int:
+        return await self.session.run_sync(lambda session: ProductRepository(session).count(use_cache))
+
+    async def stock(self, product_ids) -> dict:
+        return await self.session.run_sync(lambda session: ProductRepository(session).stock(product_ids))
+
+    async def create(self, product) -> dict:
+        return await self.session.run_sync(lambda session: ProductRepository(session).create(product))
+
+    async def update(self, product_id: int, changes: dict):
+        return await self.session.run_sync(lambda session: ProductRepository(session).update(product_id, changes))
+
+    async def delete(self, product_id: int):
+        return await self.session.run_sync(lambda session: ProductRepository(session).delete(product_id))
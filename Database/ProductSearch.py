@@ -0,0 +1,82 @@
+import re
+from sqlalchemy import or_, select, text
+from Database.OrderDb import Product
+
+'''
+Product search over sku and product_name.
+
+On SQLite the product_search FTS5 table (migration 11) indexes both columns;
+triggers on Product keep it in step with every insert, delete and rename in
+the same transaction. A query is split into tokens, and a product matches
+when each token is a prefix of a token in its sku or name: "red sh" finds
+"Red Shoes". Results are ranked with bm25, matches in the sku weighing
+SKU_WEIGHT times a match in the name, and paged by (score, product_id) so a
+cursor continues exactly where the previous page stopped. bm25 depends on
+statistics of the whole index, so this holds while no product is added,
+renamed or deleted between two pages; after such a change the next page can
+repeat or skip a few results, as an offset would.
+
+The search reads only product ids and scores; the products themselves come
+through the product cache. Other databases fall back to a LIKE scan ordered
+by product_id.
+'''
+
+# most tokens of a query used for matching
+MAX_TOKENS = 10
+SKU_WEIGHT = 2.0
+
+class InvalidSearchQuery(ValueError):
+    """
+    Raised when a query has no searchable token.
+    """
+
+def query_tokens(query: str) -> list:
+    """
+    :return: The lower-cased word tokens of the query, at most MAX_TOKENS.
+    :raises InvalidSearchQuery: If the query has none.
+    """
+    tokens = re.findall(r"\w+", query.lower())[:MAX_TOKENS]
+    if not tokens:
+        raise InvalidSearchQuery("Search query has no searchable terms")
+    return tokens
+
+def match_expression(tokens: list) -> str:
+    """
+    Builds the FTS5 MATCH expression requiring every token as a prefix. Tokens are quoted, so no
+    input is read as FTS5 syntax.
+    """
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+def search(session, query: str, limit: int, after=None) -> list:
+    """
+    :param session: Session to read with.
+    :param query: The user's query.
+    :param limit: Most results.
+    :param after: (score, product_id) of the last result of the previous page.
+    :return: (score, product_id) per result, best first.
+    :raises InvalidSearchQuery: If the query has no searchable token.
+    """
+    tokens = query_tokens(query)
+    if session.get_bind().dialect.name != "sqlite":
+        return _like_search(session, tokens, limit, after)
+
+    statement = text(
+        "SELECT score, product_id FROM ("
+        f" SELECT bm25(product_search, {SKU_WEIGHT}, 1.0) AS score, rowid AS product_id"
+        " FROM product_search WHERE product_search MATCH :match"
+        ")"
+        + (" WHERE (score, product_id) > (:after_score, :after_id)" if after is not None else "")
+        + " ORDER BY score, product_id LIMIT :limit"
+    )
+    params = {"match": match_expression(tokens), "limit": limit}
+    if after is not None:
+        params["after_score"], params["after_id"] = after
+    return [tuple(row) for row in session.execute(statement, params)]
+
+def _like_search(session, tokens: list, limit: int, after=None) -> list:
+    statement = select(Product.product_id)
+    for token in tokens:
+        statement = statement.where(or_(Product.sku.icontains(token, autoescape=True), Product.product_name.icontains(token, autoescape=True)))
+    if after is not None:
+        statement = statement.where(Product.product_id > after[1])
+    return [(0.0, product_id) for product_id in session.scalars(statement.order_by(Product.product_id).limit(limit))]
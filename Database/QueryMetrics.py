@@ -0,0 +1,31 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from Utils.Metrics import record_query
+
+'''
+SQLAlchemy hooks timing every query on every engine (the pooled engine, the
+write queue's engine and the async engine's sync core) and attributing it to
+the request being served, see Utils/Metrics.py.
+'''
+
+_installed = False
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info["query_started_at"] = time.perf_counter()
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    started_at = connection.info.pop("query_started_at", None)
+    if started_at is not None:
+        record_query(time.perf_counter() - started_at)
+
+def install():
+    """
+    Registers the query hooks once per process.
+    """
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
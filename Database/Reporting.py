@@ -0,0 +1,238 @@
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import String, cast, delete, func, insert, select, union_all
+from Database.OrderDb import DailySalesRollup, Order, OrderArchive, OrderLine, OrderLineArchive, Product, ProductSalesRollup
+from Utils.OrderStatus import OrderStatus
+
+'''
+Sales and inventory reporting backed by rollup tables.
+
+daily_sales_rollup (day, status) and product_sales_rollup (product_id, status)
+hold order count, units and revenue. They are maintained incrementally by
+the transactions that create, move and delete orders, so a report reads a
+few hundred rollup rows instead of scanning the Order table, and is always
+consistent with it. Revenue is quantity * unit_price, the price when the
+order was placed. Units and revenue add up over order lines; the daily order
+count counts each order once, through its first line, and the per-product
+count counts the orders with a line for the product.
+
+Writes go through one executemany upsert per rollup table that adds deltas
+(orders = orders + excluded.orders), so concurrent writers never lose each
+other's increments. rebuild() recomputes both tables from the orders, for
+the initial backfill or after orders were changed outside the service;
+archived orders (see OrderArchive.py) are included.
+'''
+
+# statuses reported as sales unless the caller asks for specific ones
+SALES_STATUSES = tuple(status.value for status in OrderStatus if status is not OrderStatus.CANCELLED)
+
+def _day(created_at) -> str:
+    if isinstance(created_at, datetime):
+        created_at = created_at.date()
+    return created_at.isoformat() if isinstance(created_at, date) else str(created_at)[:10]
+
+# built upserts per (dialect, table); building one costs more than executing it
+_upserts = {}
+
+def _upsert_statement(session, table):
+    dialect = session.get_bind().dialect.name
+    statement = _upserts.get((dialect, table.name))
+    if statement is not None:
+        return statement
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            "orders": table.c.orders + statement.excluded.orders,
+            "units": table.c.units + statement.excluded.units,
+            "revenue": table.c.revenue + statement.excluded.revenue
+        }
+    )
+    _upserts[(dialect, table.name)] = statement
+    return statement
+
+def _accumulate(daily: dict, products: dict, rows, sign: int):
+    for row in rows:
+        product_id, status, quantity, unit_price, created_at = row[:5]
+        revenue = quantity * (unit_price or 0.0)
+        day = daily[(_day(created_at), status)]
+        # rows without a line_no are whole single-line orders
+        if len(row) < 6 or row[5] == 1:
+            day[0] += sign
+        for totals in (day, products[(product_id, status)]):
+            totals[1] += sign * quantity
+            totals[2] += sign * revenue
+        products[(product_id, status)][0] += sign
+
+def _write(session, daily: dict, products: dict):
+    if not daily:
+        return
+    session.execute(
+        _upsert_statement(session, DailySalesRollup.__table__),
+        [{"day": day, "status": status, "orders": orders, "units": units, "revenue": revenue}
+         for (day, status), (orders, units, revenue) in daily.items()]
+    )
+    session.execute(
+        _upsert_statement(session, ProductSalesRollup.__table__),
+        [{"product_id": product_id, "status": status, "orders": orders, "units": units, "revenue": revenue}
+         for (product_id, status), (orders, units, revenue) in products.items()]
+    )
+
+def _deltas():
+    return defaultdict(lambda: [0, 0, 0.0]), defaultdict(lambda: [0, 0, 0.0])
+
+def record_orders(session, rows):
+    """
+    Adds newly created orders to the rollups. Does not commit.
+
+    :param session: Session whose transaction the change joins.
+    :param rows: (product_id, status, quantity, unit_price, created_at) per single-line order, or with a trailing
+        line_no per order line; a missing unit_price counts as 0.
+    """
+    daily, products = _deltas()
+    _accumulate(daily, products, rows, 1)
+    _write(session, daily, products)
+
+def remove_orders(session, rows):
+    """
+    Takes deleted orders out of the rollups. Does not commit.
+
+    :param rows: As for record_orders.
+    """
+    daily, products = _deltas()
+    _accumulate(daily, products, rows, -1)
+    _write(session, daily, products)
+
+def move_orders(session, rows, source: str, target: str):
+    """
+    Moves orders from source to target status in the rollups, with one upsert per table. Does not commit.
+
+    :param rows: (product_id, quantity, unit_price, created_at) per order that moved, or with a trailing line_no
+        per order line.
+    """
+    rows = list(rows)
+    daily, products = _deltas()
+    _accumulate(daily, products, ((row[0], source) + tuple(row[1:]) for row in rows), -1)
+    _accumulate(daily, products, ((row[0], target) + tuple(row[1:]) for row in rows), 1)
+    _write(session, daily, products)
+
+def rebuild(session) -> dict:
+    """
+    Recomputes both rollups from the order lines and their headers, live and archived. Does not commit.
+
+    :return: Number of rows written per rollup table.
+    """
+    lines = union_all(
+        select(OrderLine.order_id, OrderLine.product_id, OrderLine.quantity, OrderLine.unit_price, Order.status, Order.created_at)
+        .join(Order, Order.order_id == OrderLine.order_id),
+        select(OrderLineArchive.order_id, OrderLineArchive.product_id, OrderLineArchive.quantity, OrderLineArchive.unit_price,
+               OrderArchive.status, OrderArchive.created_at)
+        .join(OrderArchive, OrderArchive.order_id == OrderLineArchive.order_id)
+    ).subquery()
+    revenue = func.sum(lines.c.quantity * func.coalesce(lines.c.unit_price, Product.price, 0))
+    day = cast(func.date(lines.c.created_at), String)
+    orders = lines.outerjoin(Product.__table__, Product.product_id == lines.c.product_id)
+
+    session.execute(delete(DailySalesRollup))
+    session.execute(delete(ProductSalesRollup))
+    daily = session.execute(insert(DailySalesRollup).from_select(
+        ["day", "status", "orders", "units", "revenue"],
+        select(day, lines.c.status, func.count(lines.c.order_id.distinct()), func.sum(lines.c.quantity), revenue)
+        .select_from(orders).group_by(day, lines.c.status)
+    ))
+    products = session.execute(insert(ProductSalesRollup).from_select(
+        ["product_id", "status", "orders", "units", "revenue"],
+        select(lines.c.product_id, lines.c.status, func.count(), func.sum(lines.c.quantity), revenue)
+        .select_from(orders).group_by(lines.c.product_id, lines.c.status)
+    ))
+    return {"daily_sales_rollup": daily.rowcount, "product_sales_rollup": products.rowcount}
+
+def _totals(row) -> dict:
+    return {"orders": row.orders, "units": row.units, "revenue": round(row.revenue, 2)}
+
+def product_sales(session, statuses=SALES_STATUSES, sort: str = "revenue", limit: int = 100) -> list:
+    """
+    Orders, units and revenue per product, best sellers first.
+
+    :param statuses: Order statuses to count.
+    :param sort: revenue or units.
+    :param limit: Number of products returned.
+    """
+    orders = func.sum(ProductSalesRollup.orders).label("orders")
+    units = func.sum(ProductSalesRollup.units).label("units")
+    revenue = func.sum(ProductSalesRollup.revenue).label("revenue")
+    rows = session.execute(
+        select(ProductSalesRollup.product_id, Product.sku, Product.product_name, orders, units, revenue)
+        .outerjoin(Product, Product.product_id == ProductSalesRollup.product_id)
+        .where(ProductSalesRollup.status.in_(statuses))
+        .group_by(ProductSalesRollup.product_id, Product.sku, Product.product_name)
+        .having(orders > 0)
+        .order_by((units if sort == "units" else revenue).desc(), ProductSalesRollup.product_id)
+        .limit(limit)
+    )
+    return [{"product_id": row.product_id, "sku": row.sku, "product_name": row.product_name, **_totals(row)} for row in rows]
+
+def daily_sales(session, statuses=SALES_STATUSES, day_from: date = None, day_to: date = None) -> list:
+    """
+    Orders, units and revenue per day, oldest first.
+
+    :param statuses: Order statuses to count.
+    :param day_from: Inclusive first day.
+    :param day_to: Inclusive last day.
+    """
+    orders = func.sum(DailySalesRollup.orders).label("orders")
+    statement = (
+        select(DailySalesRollup.day, orders, func.sum(DailySalesRollup.units).label("units"), func.sum(DailySalesRollup.revenue).label("revenue"))
+        .where(DailySalesRollup.status.in_(statuses))
+        .group_by(DailySalesRollup.day)
+        .having(orders > 0)
+        .order_by(DailySalesRollup.day)
+    )
+    if day_from is not None:
+        statement = statement.where(DailySalesRollup.day >= day_from.isoformat())
+    if day_to is not None:
+        statement = statement.where(DailySalesRollup.day <= day_to.isoformat())
+    return [{"day": row.day, **_totals(row)} for row in session.execute(statement)]
+
+def status_totals(session) -> list:
+    """
+    Orders, units and value of the orders currently in each status.
+    """
+    orders = func.sum(DailySalesRollup.orders).label("orders")
+    rows = session.execute(
+        select(DailySalesRollup.status, orders, func.sum(DailySalesRollup.units).label("units"), func.sum(DailySalesRollup.revenue).label("revenue"))
+        .group_by(DailySalesRollup.status)
+        .having(orders > 0)
+        .order_by(DailySalesRollup.status)
+    )
+    return [{"status": row.status, **_totals(row)} for row in rows]
+
+def low_stock(session, threshold: int, limit: int = 100) -> list:
+    """
+    Products with at most threshold units in stock, emptiest first, with the units sold so far.
+
+    :param threshold: Highest stock_quantity reported.
+    :param limit: Number of products returned.
+    """
+    sold = (
+        select(ProductSalesRollup.product_id, func.sum(ProductSalesRollup.units).label("units_sold"))
+        .where(ProductSalesRollup.status.in_(SALES_STATUSES))
+        .group_by(ProductSalesRollup.product_id)
+        .subquery()
+    )
+    rows = session.execute(
+        select(Product.product_id, Product.sku, Product.product_name, Product.stock_quantity, func.coalesce(sold.c.units_sold, 0).label("units_sold"))
+        .outerjoin(sold, sold.c.product_id == Product.product_id)
+        .where(Product.stock_quantity <= threshold)
+        .order_by(Product.stock_quantity, Product.product_id)
+        .limit(limit)
+    )
+    return [
+        {"product_id": row.product_id, "sku": row.sku, "product_name": row.product_name,
+         "stock_quantity": row.stock_quantity, "units_sold": row.units_sold}
+        for row in rows
+    ]
@@ -0,0 +1,51 @@
+from sqlalchemy import event
+
+'''
+SQLite tuning applied to every new connection.
+
+WAL lets readers keep reading while a writer commits, synchronous=NORMAL is
+durable across application crashes in WAL mode while skipping an fsync per
+commit, and busy_timeout makes a blocked writer wait instead of failing at
+once with "database is locked".
+'''
+
+def profile_pragmas(settings) -> list:
+    """
+    Returns the PRAGMA statements configured by the settings.
+    """
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA cache_size={int(settings.sqlite_cache_size)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+    ]
+
+def apply_profile(engine, settings, immediate_transactions: bool = False):
+    """
+    Registers the connection profile on an engine.
+
+    :param engine: Sync engine, or the sync_engine of an async engine.
+    :param settings: Settings holding the sqlite_* values.
+    :param immediate_transactions: Start every transaction with BEGIN IMMEDIATE. The write lock is
+        then taken up front, so a writer waits on busy_timeout instead of failing when it upgrades
+        from a read, and SAVEPOINTs work (pysqlite's own transaction handling breaks them).
+    """
+    pragmas = profile_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if immediate_transactions:
+            # hand transaction control to SQLAlchemy, BEGIN is emitted below
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    if immediate_transactions:
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
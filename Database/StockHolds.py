@@ -0,0 +1,82 @@
+import time
+from sqlalchemy import delete, func, insert, select
+from Database.OrderDb import StockHold
+from Utils.Settings import get_settings
+
+'''
+Time-limited stock holds of PENDING orders.
+
+A PENDING order reserves its stock like any other order, and gets a
+stock_hold row with the time the hold runs out. Moving the order out of
+PENDING (PAID commits the hold, CANCELLED gives the stock back) or deleting
+it drops the row in the same transaction. Rows that are still there when
+they expire belong to orders that were never paid: the sweeper
+(HoldSweeper.py) cancels those orders through
+OrderTransitions.release_expired_holds, which gives their stock back.
+
+stock_hold only ever holds the PENDING orders placed with a hold, and the
+sweeper reads it by range on ix_stock_hold_expires_at, oldest first, so a
+sweep never touches the Order table beyond the orders it cancels.
+'''
+
+
+# order ids per DELETE ... IN (...), well below SQLite's bound parameter limit
+ID_CHUNK_SIZE = 5000
+
+def enabled() -> bool:
+    return get_settings().stock_hold_ttl > 0
+
+def add_holds(session, order_ids):
+    """
+    Starts a hold of stock_hold_ttl seconds for newly placed PENDING orders. Does nothing when holds
+    are disabled. Does not commit.
+
+    :param session: Session whose transaction the holds join.
+    :param order_ids: IDs of the new orders.
+    """
+    order_ids = list(order_ids)
+    if not order_ids or not enabled():
+        return
+    expires_at = time.time() + get_settings().stock_hold_ttl
+    session.execute(insert(StockHold), [{"order_id": order_id, "expires_at": expires_at} for order_id in order_ids])
+
+def release_holds(session, order_ids):
+    """
+    Drops the holds of orders that left PENDING or are deleted. Does not commit.
+
+    :param session: Session whose transaction the change joins.
+    :param order_ids: IDs of the orders; orders without a hold are ignored.
+    """
+    order_ids = list(order_ids)
+    for start in range(0, len(order_ids), ID_CHUNK_SIZE):
+        session.execute(
+            delete(StockHold).where(StockHold.order_id.in_(order_ids[start:start + ID_CHUNK_SIZE]))
+            .execution_options(synchronize_session=False)
+        )
+
+def expired_holds(session, now: float, limit: int) -> list:
+    """
+    :param now: Epoch seconds; holds expiring at or before it are returned.
+    :param limit: Most holds returned.
+    :return: (order_id, expires_at) of the expired holds, the oldest first.
+    """
+    return session.execute(
+        select(StockHold.order_id, StockHold.expires_at)
+        .where(StockHold.expires_at <= now)
+        .order_by(StockHold.expires_at)
+        .limit(limit)
+    ).all()
+
+def hold_counts(session, now: float = None) -> dict:
+    """
+    :return: Active holds, how many of them have expired and wait for the sweeper, and seconds until the next expiry.
+    """
+    now = time.time() if now is None else now
+    active, expired, next_expiry = session.execute(
+        select(func.count(), func.count().filter(StockHold.expires_at <= now), func.min(StockHold.expires_at))
+    ).one()
+    return {
+        "active": active,
+        "expired": expired,
+        "next_expiry_in": max(0.0, next_expiry - now) if next_expiry is not None else None
+    }
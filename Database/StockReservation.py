@@ -0,0 +1,177 @@
+import random
+import time
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import OperationalError
+from Database.OrderDb import Product
+from Database.ProductCache import mark_product_changed
+from Utils.Settings import get_settings
+
+'''
+Stock is reserved with a single conditional UPDATE so the check and the
+decrement happen atomically inside the database. Concurrent requests can
+never both pass the check, whichever thread or worker process they run in.
+'''
+
+class InsufficientStock(Exception):
+    """
+    Raised by a unit of work to abort its transaction when stock cannot be reserved.
+    """
+
+    def __init__(self, quantities: dict):
+        """
+        :param quantities: Mapping of product_id to the quantity that was requested.
+        """
+        super().__init__("Insufficient stock")
+        self.quantities = quantities
+
+def reserve_stock_statement(product_id: int, quantity: int):
+    """
+    UPDATE that takes quantity from a product only if that much is in stock.
+    Shared by the sync and async order paths.
+    """
+    return (
+        update(Product)
+        .where(Product.product_id == product_id, Product.stock_quantity >= quantity)
+        .values(stock_quantity=Product.stock_quantity - quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+def release_stock_statement(product_id: int, quantity: int):
+    """
+    UPDATE that gives quantity back to a product.
+    """
+    return (
+        update(Product)
+        .where(Product.product_id == product_id)
+        .values(stock_quantity=Product.stock_quantity + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+def reserve_stock(session, product_id: int, quantity: int) -> bool:
+    """
+    Decrements the stock of a product if enough is available.
+
+    :param session: Session whose transaction the reservation joins.
+    :param product_id: ID of the product to reserve.
+    :param quantity: Quantity to take from stock.
+    :return: True if the stock was reserved, False if the product is missing or short.
+    """
+    result = session.execute(reserve_stock_statement(product_id, quantity))
+    if result.rowcount != 1:
+        return False
+    mark_product_changed(session, product_id)
+    return True
+
+def reserve_stock_returning(session, product_id: int, quantity: int):
+    """
+    Like reserve_stock, but returns the product's price and remaining stock from the same UPDATE.
+
+    :return: (price, stock_quantity) if the stock was reserved, None if the product is missing or short.
+    """
+    row = session.execute(reserve_stock_statement(product_id, quantity).returning(Product.price, Product.stock_quantity)).first()
+    if row is None:
+        return None
+    mark_product_changed(session, product_id)
+    return row
+
+def reserve_stock_bulk(session, quantities: dict) -> bool:
+    """
+    Reserves stock for several products with one executemany of the conditional UPDATE.
+    Either every product has enough stock or the caller must roll back.
+
+    :param session: Session whose transaction the reservation joins.
+    :param quantities: Mapping of product_id to the total quantity to reserve.
+    :return: True if every product was reserved.
+    """
+    if not quantities:
+        return True
+    table = Product.__table__
+    result = session.execute(
+        update(table)
+        .where(table.c.product_id == bindparam("reserve_product_id"), table.c.stock_quantity >= bindparam("reserve_quantity"))
+        .values(stock_quantity=table.c.stock_quantity - bindparam("reserve_quantity")),
+        [{"reserve_product_id": product_id, "reserve_quantity": quantity} for product_id, quantity in quantities.items()]
+    )
+    if result.rowcount != len(quantities):
+        return False
+    for product_id in quantities:
+        mark_product_changed(session, product_id)
+    return True
+
+def release_stock(session, product_id: int, quantity: int) -> bool:
+    """
+    Returns previously reserved stock to a product.
+
+    :param session: Session whose transaction the release joins.
+    :param product_id: ID of the product to restock.
+    :param quantity: Quantity to give back.
+    :return: True if the product exists and was updated.
+    """
+    result = session.execute(release_stock_statement(product_id, quantity))
+    if result.rowcount != 1:
+        return False
+    mark_product_changed(session, product_id)
+    return True
+
+def release_stock_bulk(session, quantities: dict) -> int:
+    """
+    Returns stock to several products with one executemany of the increment.
+
+    :param session: Session whose transaction the release joins.
+    :param quantities: Mapping of product_id to the total quantity to give back.
+    :return: Number of products updated; products deleted since are skipped.
+    """
+    if not quantities:
+        return 0
+    table = Product.__table__
+    result = session.execute(
+        update(table)
+        .where(table.c.product_id == bindparam("release_product_id"))
+        .values(stock_quantity=table.c.stock_quantity + bindparam("release_quantity")),
+        [{"release_product_id": product_id, "release_quantity": quantity} for product_id, quantity in quantities.items()]
+    )
+    for product_id in quantities:
+        mark_product_changed(session, product_id)
+    return result.rowcount
+
+def is_database_busy(error: OperationalError) -> bool:
+    """
+    Tells whether an OperationalError is SQLite reporting SQLITE_BUSY / SQLITE_LOCKED.
+    """
+    message = str(getattr(error, "orig", error)).lower()
+    return "database is locked" in message or "database is busy" in message or "database table is locked" in message
+
+def busy_retry_delay(attempt: int, backoff: float) -> float:
+    """
+    Seconds to wait before retry number attempt, exponential with jitter so retrying
+    writers don't collide again in lockstep.
+    """
+    return backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+
+def run_with_retry(session, work, attempts: int = None, backoff: float = None):
+    """
+    Runs work(session) and commits, retrying the whole transaction when the database is busy.
+    Any other error rolls the transaction back and is re-raised.
+
+    :param session: Session to run the transaction on.
+    :param work: Callable taking the session and returning the result of the transaction.
+    :param attempts: Maximum number of attempts, defaults to the busy_retry_attempts setting.
+    :param backoff: Base delay in seconds between attempts, doubled on every retry.
+    :return: Whatever work returned.
+    """
+    settings = get_settings()
+    attempts = attempts or settings.busy_retry_attempts
+    backoff = settings.busy_retry_backoff if backoff is None else backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work(session)
+            session.commit()
+            return result
+        except OperationalError as e:
+            session.rollback()
+            if attempt == attempts or not is_database_busy(e):
+                raise
+            time.sleep(busy_retry_delay(attempt, backoff))
+        except Exception:
+            session.rollback()
+            raise
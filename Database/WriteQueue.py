@@ -0,0 +1,193 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from Database.DbEngine import build_engine, is_sqlite
+from Database.StockReservation import busy_retry_delay, is_database_busy, run_with_retry
+from Utils.Settings import get_settings
+
+'''
+Single-writer queue for SQLite.
+
+SQLite allows one writer at a time. With many request threads each opening
+their own write transaction, writers queue up on the database lock and the
+unlucky ones fail with "database is locked". Instead, write transactions are
+handed to one thread that owns one connection. It takes up to
+write_queue_max_batch queued transactions, runs each in its own SAVEPOINT so
+a failing one is rolled back alone, and commits them together (group commit):
+one fsync and one lock acquisition for the whole batch.
+
+A unit of work is a callable taking a session and returning plain values
+(ids, dicts), never ORM objects, since those belong to the writer's session.
+'''
+
+class _Job:
+    __slots__ = ("work", "future", "context")
+
+    def __init__(self, work):
+        self.work = work
+        self.future = Future()
+        # run the work in the submitter's context, so e.g. its queries count towards its request
+        self.context = contextvars.copy_context()
+
+class WriteQueue:
+    """
+    Funnels write transactions through one connection and commits them in groups.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 64, max_wait: float = 0.002, attempts: int = 5, backoff: float = 0.01):
+        """
+        :param session_factory: Factory of sessions on the writer's engine.
+        :param max_batch: Most transactions committed together.
+        :param max_wait: Seconds to wait for more work once the first item of a batch arrives.
+        :param attempts: Attempts for a batch when another process holds the database lock.
+        :param backoff: Base delay in seconds between those attempts.
+        """
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.attempts = attempts
+        self.backoff = backoff
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.transactions = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, work) -> Future:
+        """
+        Queues a unit of work.
+
+        :param work: Callable taking the writer's session and returning plain values.
+        :return: Future resolved with the result once the batch has committed.
+        """
+        self._ensure_started()
+        job = _Job(work)
+        self._queue.put(job)
+        return job.future
+
+    def run(self, work):
+        """
+        Queues a unit of work and waits for it to commit.
+
+        :return: What work returned; exceptions raised by work are re-raised here.
+        """
+        return self.submit(work).result()
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _commit_batch(self, batch: list):
+        for attempt in range(1, self.attempts + 1):
+            session = self.session_factory()
+            try:
+                results = []
+                for job in batch:
+                    savepoint = session.begin_nested()
+                    try:
+                        result = job.context.run(job.work, session)
+                        savepoint.commit()
+                        results.append((job, result, None))
+                    except OperationalError as e:
+                        if is_database_busy(e):
+                            raise
+                        savepoint.rollback()
+                        results.append((job, None, e))
+                    except Exception as e:
+                        savepoint.rollback()
+                        results.append((job, None, e))
+                session.commit()
+            except OperationalError as e:
+                session.rollback()
+                session.close()
+                if attempt == self.attempts or not is_database_busy(e):
+                    raise
+                time.sleep(busy_retry_delay(attempt, self.backoff))
+                continue
+            session.close()
+            self.batches += 1
+            self.transactions += len(batch)
+            for job, result, error in results:
+                if error is None:
+                    job.future.set_result(result)
+                else:
+                    job.future.set_exception(error)
+            return
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "transactions": self.transactions,
+            "queued": self._queue.qsize(),
+            "avg_batch_size": self.transactions / self.batches if self.batches else 0.0
+        }
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_write_queue():
+    """
+    Returns the process-wide write queue, or None when it is disabled or the database is not SQLite.
+    """
+    global _writer
+    settings = get_settings()
+    if not settings.write_queue_enabled or not is_sqlite(settings):
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer_engine = build_engine(settings, pool_size=1, max_overflow=0, immediate_transactions=True)
+                _writer = WriteQueue(
+                    sessionmaker(bind=writer_engine),
+                    max_batch=settings.write_queue_max_batch,
+                    max_wait=settings.write_queue_max_wait_ms / 1000,
+                    attempts=settings.busy_retry_attempts,
+                    backoff=settings.busy_retry_backoff
+                )
+    return _writer
+
+def run_write(session, work):
+    """
+    Runs a write transaction: through the write queue when it is enabled, otherwise on the
+    caller's session with busy retries.
+
+    :param session: The caller's request-scoped session, used when the queue is disabled.
+    :param work: Callable taking a session and returning plain values.
+    :return: What work returned.
+    """
+    writer = get_write_queue()
+    if writer is None:
+        return run_with_retry(session, work)
+    return writer.run(work)
+
+def write_queue_stats() -> dict:
+    writer = get_write_queue()
+    return writer.stats() if writer is not None else {"enabled": False}
@@ -0,0 +1,209 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+
+'''
+Command line entry point for maintenance tasks.
+
+    python Manage.py migrate
+    python Manage.py import-products catalog.csv --batch-size 5000
+    python Manage.py purge-idempotency-keys
+    python Manage.py rebuild-rollups
+    python Manage.py release-expired-holds
+    python Manage.py archive-orders --older-than-days 90 --vacuum
+    python Manage.py storage-report
+    python Manage.py export orders --format csv --gzip --status DELIVERED --output orders.csv.gz
+    python Manage.py webhook-stand-in --port 8099 --output received.ndjson
+'''
+
+def import_products(args):
+    from Database import OrderDb, ProductImport
+    OrderDb.init_database()
+    input_format = args.format or ProductImport.format_from_filename(args.path)
+    with open(args.path, encoding="utf-8", newline="") as lines:
+        report = ProductImport.import_products(lines, input_format, args.batch_size, args.max_errors)
+    print(json.dumps(report.to_dict(), indent=2))
+    return 0 if report.failed == 0 else 1
+
+def migrate(args):
+    from Database.DbEngine import get_engine
+    from Database import Migrations
+    engine = get_engine()
+    if args.status:
+        pending = Migrations.pending_migrations(engine)
+        applied = sorted(Migrations.applied_versions(engine))
+        print(json.dumps({"applied": applied, "pending": [version for version, _ in pending]}))
+        return 0
+    applied = Migrations.migrate(engine, args.target)
+    print(json.dumps({"applied": applied}))
+    return 0
+
+def purge_idempotency_keys(args):
+    from Database import Idempotency, OrderDb
+    OrderDb.init_database()
+    session = OrderDb.get_database_session()
+    try:
+        deleted = Idempotency.purge_expired(session)
+        session.commit()
+    finally:
+        session.close()
+    print(json.dumps({"deleted": deleted}))
+    return 0
+
+def rebuild_rollups(args):
+    from Database import OrderDb, Reporting
+    OrderDb.init_database()
+    session = OrderDb.get_database_session()
+    try:
+        # one transaction: reports never see the tables half rebuilt
+        rows = Reporting.rebuild(session)
+        session.commit()
+    finally:
+        session.close()
+    print(json.dumps(rows))
+    return 0
+
+def release_expired_holds(args):
+    from Database import HoldSweeper, OrderDb
+    OrderDb.init_database()
+    sweeper = HoldSweeper.HoldSweeper(batch_size=args.batch_size)
+    sweeper.sweep()
+    stats = sweeper.stats()
+    print(json.dumps({"released": stats["released"], "released_units": stats["released_units"]}))
+    return 0
+
+def _storage_report():
+    from Database import OrderArchive, OrderDb
+    session = OrderDb.get_database_session()
+    try:
+        return OrderArchive.storage_report(session)
+    finally:
+        session.close()
+
+def archive_orders(args):
+    from Database import OrderArchive, OrderDb
+    OrderDb.init_database()
+    before = _storage_report()
+    result = OrderArchive.archive_orders(args.older_than_days, args.batch_size, args.max_batches)
+    if args.vacuum:
+        OrderArchive.vacuum()
+    print(json.dumps({**result, "vacuumed": args.vacuum, "before": before, "after": _storage_report()}, indent=2))
+    return 0
+
+def storage_report(args):
+    from Database import OrderDb
+    OrderDb.init_database()
+    print(json.dumps(_storage_report(), indent=2))
+    return 0
+
+def export(args):
+    from Database import DataExport, OrderDb
+    OrderDb.init_database()
+    if args.kind == "orders":
+        chunks = DataExport.export_orders(args.format, args.gzip, args.status, args.created_from, args.created_to, args.include_archived)
+    else:
+        chunks = DataExport.export_products(args.format, args.gzip, args.created_from, args.created_to)
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+def webhook_stand_in(args):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Receiver(BaseHTTPRequestHandler):
+        # accepts what OMS_OUTBOX_SINKS=webhook:http://127.0.0.1:<port>/ sends, like a downstream system would
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                events = json.loads(body)["events"]
+            except (ValueError, KeyError, TypeError):
+                self.send_response(400)
+                self.end_headers()
+                return
+            if args.output:
+                with open(args.output, "a", encoding="utf-8") as output:
+                    output.writelines(json.dumps(event) + "\n" for event in events)
+            print(json.dumps({"received": len(events), "first_id": events[0]["id"] if events else None}), flush=True)
+            self.send_response(args.status)
+            self.end_headers()
+
+        def log_message(self, format, *values):
+            pass
+
+    server = ThreadingHTTPServer((args.host, args.port), Receiver)
+    print(f"Receiving outbox webhooks on http://{args.host}:{args.port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def build_parser():
+    from Utils.OrderStatus import STATUS_VALUES
+    parser = argparse.ArgumentParser(description="Order Management System maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import-products", help="Bulk upsert products by SKU from a CSV or NDJSON file")
+    importer.add_argument("path", help="File to import")
+    importer.add_argument("--format", choices=["csv", "ndjson"], help="Input format, guessed from the extension by default")
+    importer.add_argument("--batch-size", type=int, default=1000, help="Rows committed per transaction")
+    importer.add_argument("--max-errors", type=int, default=1000, help="Row errors to include in the report")
+    importer.set_defaults(handler=import_products)
+
+    migrator = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrator.add_argument("--target", type=int, help="Highest migration version to apply")
+    migrator.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    migrator.set_defaults(handler=migrate)
+
+    purger = commands.add_parser("purge-idempotency-keys", help="Delete stored Idempotency-Key responses older than OMS_IDEMPOTENCY_TTL")
+    purger.set_defaults(handler=purge_idempotency_keys)
+
+    rebuilder = commands.add_parser("rebuild-rollups", help="Recompute the sales rollup tables from the orders")
+    rebuilder.set_defaults(handler=rebuild_rollups)
+
+    releaser = commands.add_parser("release-expired-holds", help="Cancel PENDING orders whose stock hold expired and give their stock back")
+    releaser.add_argument("--batch-size", type=int, default=500, help="Holds released per transaction")
+    releaser.set_defaults(handler=release_expired_holds)
+
+    archiver = commands.add_parser("archive-orders", help="Move old DELIVERED and CANCELLED orders to the archive tables")
+    archiver.add_argument("--older-than-days", type=int, help="Minimum order age, defaults to OMS_ARCHIVE_AFTER_DAYS")
+    archiver.add_argument("--batch-size", type=int, help="Orders moved per transaction, defaults to OMS_ARCHIVE_BATCH_SIZE")
+    archiver.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    archiver.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite file afterwards to return the freed pages")
+    archiver.set_defaults(handler=archive_orders)
+
+    sizer = commands.add_parser("storage-report", help="Rows and bytes of the live and archived order tables")
+    sizer.set_defaults(handler=storage_report)
+
+    exporter = commands.add_parser("export", help="Stream all orders (one row per line) or products to a CSV or NDJSON file")
+    exporter.add_argument("kind", choices=["orders", "products"], help="What to export")
+    exporter.add_argument("--format", choices=["csv", "ndjson"], default="csv", help="Output format")
+    exporter.add_argument("--gzip", action="store_true", help="gzip the output")
+    exporter.add_argument("--status", choices=sorted(STATUS_VALUES), help="Only orders with this status")
+    exporter.add_argument("--created-from", type=datetime.fromisoformat, help="Only rows created on or after this date")
+    exporter.add_argument("--created-to", type=datetime.fromisoformat, help="Only rows created before this date")
+    exporter.add_argument("--include-archived", action="store_true", help="Export archived orders too")
+    exporter.add_argument("--output", help="File to write, standard output by default")
+    exporter.set_defaults(handler=export)
+
+    receiver = commands.add_parser("webhook-stand-in", help="Run a local receiver for the outbox webhook sink")
+    receiver.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    receiver.add_argument("--port", type=int, default=8099, help="Port to listen on")
+    receiver.add_argument("--output", help="Append received events to this NDJSON file")
+    receiver.add_argument("--status", type=int, default=204, help="Status code to answer with, e.g. 500 to exercise retries")
+    receiver.set_defaults(handler=webhook_stand_in)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List
+from datetime import date
+from Modules.Order.model.OrderLineBO import OrderLineBO
+
+'''
+Body of POST /orders/full: one order with several products. Each product
+appears on one line; order more of it by raising the line's quantity.
+'''
+
+class MultiLineOrderBO(BaseModel):
+    status: str = Field(..., description="Initial status of the order: PENDING, or PAID if it was paid at checkout")
+    created_at: date = Field(..., description="Date when the order was placed")
+    lines: List[OrderLineBO] = Field(..., min_length=1, max_length=500, description="Products and quantities, in order")
+
+    @field_validator("lines")
+    @classmethod
+    def products_must_be_unique(cls, lines):
+        seen = set()
+        for line in lines:
+            if line.product_id in seen:
+                raise ValueError(f"Product {line.product_id} appears on more than one line")
+            seen.add(line.product_id)
+        return lines
@@ -4,5 +4,5 @@ from datetime import date
 class OrderBo(BaseModel):
     product_id: int = Field(..., gt=0, description="Unique identifier for the product")
     quantity: int = Field(..., gt=0, description="Quantity of the product ordered")
-    status: str = Field(..., description="Current status of the order (e.g., PENDING, SHIPPED, DELIVERED, CANCELLED, PAID)")
+    status: str = Field(..., description="Initial status of the order: PENDING, or PAID if it was paid at checkout")
     created_at: date = Field(..., description="Date when the order was placed")
\ No newline at end of file
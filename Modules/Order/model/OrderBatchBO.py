@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from typing import List
+from Modules.Order.model.OrderBO import OrderBo
+
+class OrderBatchBO(BaseModel):
+    orders: List[OrderBo] = Field(..., min_length=1, max_length=1000, description="Order lines to create in one transaction")
+    all_or_nothing: bool = Field(True, description="Reject the whole batch if any line fails, otherwise create the lines that can be fulfilled")
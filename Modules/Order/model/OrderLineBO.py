@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+
+class OrderLineBO(BaseModel):
+    product_id: int = Field(..., gt=0, description="Unique identifier for the product")
+    quantity: int = Field(..., gt=0, description="Quantity of the product ordered")
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class OrderStatusBatchBO(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=10000, description="IDs of the orders to move")
+    status: str = Field(..., description="New status for every listed order (e.g., PAID, SHIPPED, DELIVERED, CANCELLED)")
@@ -0,0 +1,36 @@
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from datetime import date
+
+'''
+Body of PUT /products/{product_id}: every field is optional and only the
+fields sent are applied. The same rules as ProductBO hold for each of them.
+'''
+
+class ProductUpdateBO(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    sku: Optional[str] = Field(None, description="Stock Keeping Unit for the product")
+    product_name: Optional[str] = Field(None, description="Name of the product")
+    price: Optional[float] = Field(None, gt=0, description="Price of the product")
+    stock_quantity: Optional[int] = Field(None, ge=0, description="Quantity of the product available in stock")
+    created_at: Optional[date] = Field(None, description="Date when the product was added")
+
+    @field_validator("sku", "product_name")
+    @classmethod
+    def must_not_be_empty(cls, value):
+        if value is not None and not value.strip():
+            raise ValueError("must not be empty")
+        return value
+
+    @model_validator(mode="after")
+    def must_change_something(self):
+        if not self.changes():
+            raise ValueError("At least one field must be given")
+        return self
+
+    def changes(self) -> dict:
+        """
+        The fields sent in the request, by column name. A field sent as null is ignored.
+        """
+        return self.model_dump(exclude_unset=True, exclude_none=True)
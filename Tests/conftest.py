@@ -0,0 +1,65 @@
+import os
+import tempfile
+import uuid
+import pytest
+
+'''
+Shared fixtures. The service configures its engine from the environment on
+first use, so OMS_DATABASE_URL points at a temporary SQLite file before any
+service module is imported; every test creates the products and orders it
+works with, so tests do not depend on each other's data.
+'''
+
+os.environ["OMS_DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="oms-tests-"), "tests.db")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: starts server processes; deselect with -m 'not slow'")
+
+@pytest.fixture(scope="module", params=["sync", "async"])
+def client(request):
+    """
+    The application with the sync or the async handlers, lifespan included.
+    """
+    from fastapi.testclient import TestClient
+    import App
+
+    with TestClient(App.create_app(request.param)) as client:
+        yield client
+
+@pytest.fixture
+def create_product(client):
+    """
+    Creates a product with a unique SKU and returns its product_id.
+    """
+    def create(stock_quantity: int = 100, price: float = 10.0) -> int:
+        response = client.post("/products", json={
+            "sku": f"TEST-{uuid.uuid4().hex}", "product_name": "Test product", "price": price,
+            "stock_quantity": stock_quantity, "created_at": "2025-01-01"
+        })
+        assert response.status_code == 201, response.text
+        return response.json()["data"]["product"]["product_id"]
+    return create
+
+@pytest.fixture
+def stock_of(client):
+    """
+    Reads a product's current stock.
+    """
+    def read(product_id: int) -> int:
+        return client.get(f"/products/{product_id}").json()["data"]["product"]["stock_quantity"]
+    return read
+
+@pytest.fixture
+def override_settings(monkeypatch):
+    """
+    Sets OMS_* variables for one test and rereads the settings, as a restart with them would.
+    """
+    from Utils.Settings import get_settings
+
+    def override(**values):
+        for name, value in values.items():
+            monkeypatch.setenv(f"OMS_{name.upper()}", str(value))
+        get_settings.cache_clear()
+    yield override
+    monkeypatch.undo()
+    get_settings.cache_clear()
@@ -0,0 +1,111 @@
+import csv
+import gzip
+import io
+import json
+import uuid
+from Database import DataExport, OrderArchive
+
+# orders dated in this window are this module's; the year keeps them old enough to archive
+DAY = "2001-02-03"
+WINDOW = {"created_from": "2001-02-03T00:00:00", "created_to": "2001-02-04T00:00:00"}
+OLDER_THAN_DAYS = 3650
+
+def _place(client, product_id: int, quantity: int, status: str = "PENDING") -> int:
+    response = client.post("/orders", json={"product_id": product_id, "quantity": quantity, "status": status, "created_at": DAY})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["order"]["order_id"]
+
+def _place_full(client, lines: list) -> int:
+    response = client.post("/orders/full", json={
+        "status": "PAID", "created_at": DAY, "lines": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in lines]
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["order"]["order_id"]
+
+def _export(client, path: str, **params) -> bytes:
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return response.content
+
+def _csv_rows(content: bytes) -> list:
+    return list(csv.DictReader(io.StringIO(content.decode("utf-8"))))
+
+def _ndjson_rows(content: bytes) -> list:
+    return [json.loads(line) for line in content.decode("utf-8").splitlines()]
+
+def test_orders_export_one_row_per_line(client, create_product):
+    first = create_product(price=2.0)
+    second = create_product(price=5.0)
+    single = _place(client, first, 3)
+    multi = _place_full(client, [(first, 1), (second, 4)])
+
+    rows = [row for row in _csv_rows(_export(client, "/orders/export", format="csv", **WINDOW)) if int(row["order_id"]) in (single, multi)]
+    lines = _ndjson_rows(_export(client, "/orders/export", format="ndjson", **WINDOW))
+
+    assert list(rows[0]) == list(DataExport.ORDER_EXPORT_FIELDS)
+    assert [(int(row["order_id"]), int(row["line_no"]), int(row["product_id"]), int(row["quantity"]), float(row["unit_price"])) for row in rows] == [
+        (single, 1, first, 3, 2.0), (multi, 1, first, 1, 2.0), (multi, 2, second, 4, 5.0)
+    ]
+    assert {row["created_at"] for row in rows} == {DAY}
+    assert [line for line in lines if line["order_id"] in (single, multi)] == [
+        {"order_id": single, "status": "PENDING", "created_at": DAY, "line_no": 1, "product_id": first, "quantity": 3, "unit_price": 2.0},
+        {"order_id": multi, "status": "PAID", "created_at": DAY, "line_no": 1, "product_id": first, "quantity": 1, "unit_price": 2.0},
+        {"order_id": multi, "status": "PAID", "created_at": DAY, "line_no": 2, "product_id": second, "quantity": 4, "unit_price": 5.0}
+    ]
+
+def test_gzip_export_round_trips(client, create_product):
+    product_id = create_product()
+    _place(client, product_id, 2)
+
+    for output_format in DataExport.FORMATS:
+        plain = _export(client, "/orders/export", format=output_format, **WINDOW)
+        response = client.get("/orders/export", params={"format": output_format, "gzip": True, **WINDOW})
+        assert response.headers["content-type"] == "application/gzip"
+        assert f'orders-export.{output_format}.gz' in response.headers["content-disposition"]
+        assert gzip.decompress(response.content) == plain
+
+def test_archived_orders_are_exported_when_asked(client, create_product):
+    product_id = create_product()
+    archived = _place(client, product_id, 1)
+    assert client.put(f"/orders/{archived}", params={"status_update": "CANCELLED"}).status_code == 200
+    live = _place(client, product_id, 2)
+    OrderArchive.archive_orders(older_than_days=OLDER_THAN_DAYS)
+
+    without = [row["order_id"] for row in _ndjson_rows(_export(client, "/orders/export", format="ndjson", **WINDOW))]
+    with_archived = [row["order_id"] for row in _ndjson_rows(_export(client, "/orders/export", format="ndjson", include_archived=True, **WINDOW))]
+
+    assert live in without and archived not in without
+    assert live in with_archived and with_archived.count(archived) == 1
+    # archived orders come first
+    assert with_archived.index(archived) < with_archived.index(live)
+
+def test_export_reads_one_snapshot(client, create_product, monkeypatch):
+    product_id = create_product()
+    already_archived = [_place(client, product_id, 1, "PAID") for _ in range(2)]
+    for order_id in already_archived:
+        assert client.put(f"/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code == 200
+    OrderArchive.archive_orders(older_than_days=OLDER_THAN_DAYS)
+    moving = _place(client, product_id, 1)
+    assert client.put(f"/orders/{moving}", params={"status_update": "CANCELLED"}).status_code == 200
+    monkeypatch.setattr(DataExport, "EXPORT_CHUNK_ROWS", 1)
+
+    chunks = DataExport.export_orders("ndjson", include_archived=True, created_from=DAY, created_to="2001-02-04")
+    first = next(chunks)
+    # archived while the export is still reading the archive
+    assert OrderArchive.archive_orders(older_than_days=OLDER_THAN_DAYS)["archived"] >= 1
+    order_ids = [row["order_id"] for row in _ndjson_rows(first + b"".join(chunks))]
+
+    assert order_ids.count(moving) == 1
+    assert set(already_archived) <= set(order_ids)
+
+def test_products_export(client):
+    sku = f"EXPORT-{uuid.uuid4().hex}"
+    response = client.post("/products", json={"sku": sku, "product_name": "Exported, \"quoted\"", "price": 3.5, "stock_quantity": 6, "created_at": "2025-01-01"})
+    product_id = response.json()["data"]["product"]["product_id"]
+
+    rows = [row for row in _csv_rows(_export(client, "/products/export", format="csv")) if row["sku"] == sku]
+    lines = [line for line in _ndjson_rows(gzip.decompress(_export(client, "/products/export", format="ndjson", gzip=True))) if line["sku"] == sku]
+
+    assert rows == [{"product_id": str(product_id), "sku": sku, "product_name": "Exported, \"quoted\"", "price": "3.5", "stock_quantity": "6", "created_at": rows[0]["created_at"]}]
+    assert lines == [{"product_id": product_id, "sku": sku, "product_name": "Exported, \"quoted\"", "price": 3.5, "stock_quantity": 6, "created_at": lines[0]["created_at"]}]
+    assert rows[0]["created_at"] == lines[0]["created_at"]
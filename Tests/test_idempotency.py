@@ -0,0 +1,75 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from Database import Idempotency
+from Database.OrderDb import get_database_session
+from Utils.Settings import get_settings
+
+def _order(product_id: int, quantity: int = 2) -> dict:
+    return {"product_id": product_id, "quantity": quantity, "status": "PENDING", "created_at": "2025-01-01"}
+
+def _key() -> dict:
+    return {"Idempotency-Key": f"test-{uuid.uuid4().hex}"}
+
+def _orders_of(client, product_id: int) -> list:
+    return client.get("/orders", params={"product_id": product_id}).json()["data"]["orders"]
+
+def test_retry_replays_the_stored_response(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    headers = _key()
+
+    first = client.post("/orders", json=_order(product_id), headers=headers)
+    retry = client.post("/orders", json=_order(product_id), headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert Idempotency.REPLAYED_HEADER not in first.headers
+    assert retry.headers[Idempotency.REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+    assert len(_orders_of(client, product_id)) == 1
+    assert stock_of(product_id) == 8
+
+def test_key_reused_with_a_different_body_is_rejected(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    headers = _key()
+    assert client.post("/orders", json=_order(product_id), headers=headers).status_code == 201
+
+    response = client.post("/orders", json=_order(product_id, quantity=3), headers=headers)
+
+    assert response.status_code == 422
+    assert len(_orders_of(client, product_id)) == 1
+    assert stock_of(product_id) == 8
+
+def test_expired_key_runs_the_request_again(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    headers = _key()
+    first = client.post("/orders", json=_order(product_id), headers=headers)
+    # age the stored response past the TTL and forget the in-process copy
+    session = get_database_session()
+    try:
+        session.execute(text("UPDATE idempotency_key SET created_at = created_at - :age WHERE key = :key"),
+                        {"age": 2 * get_settings().idempotency_ttl, "key": headers["Idempotency-Key"]})
+        session.commit()
+    finally:
+        session.close()
+    Idempotency.index.clear()
+
+    second = client.post("/orders", json=_order(product_id, quantity=3), headers=headers)
+
+    assert second.status_code == 201
+    assert Idempotency.REPLAYED_HEADER not in second.headers
+    assert second.json()["data"]["order"]["order_id"] != first.json()["data"]["order"]["order_id"]
+    assert stock_of(product_id) == 5
+    # the new response is the one replayed from now on
+    assert client.post("/orders", json=_order(product_id, quantity=3), headers=headers).json() == second.json()
+
+def test_concurrent_requests_with_one_key_create_one_order(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=100)
+    headers = _key()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: client.post("/orders", json=_order(product_id), headers=headers), range(8)))
+
+    assert [response.status_code for response in responses] == [201] * 8
+    assert len({response.json()["data"]["order"]["order_id"] for response in responses}) == 1
+    assert len(_orders_of(client, product_id)) == 1
+    assert stock_of(product_id) == 98
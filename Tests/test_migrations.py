@@ -0,0 +1,57 @@
+import os
+import tempfile
+import threading
+from sqlalchemy import create_engine, inspect, text
+from Database import Migrations
+
+def _engine(path: str):
+    return create_engine("sqlite:///" + path, connect_args={"timeout": 30})
+
+def test_concurrent_migrations_apply_each_version_once():
+    path = os.path.join(tempfile.mkdtemp(prefix="oms-migrate-"), "concurrent.db")
+    engines = [_engine(path) for _ in range(4)]
+    start = threading.Barrier(len(engines))
+    applied, errors = [], []
+
+    def run(engine):
+        start.wait()
+        try:
+            applied.append(Migrations.migrate(engine))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    versions = [version for version, _, _ in Migrations.MIGRATIONS]
+    assert errors == []
+    assert sorted(version for run_versions in applied for version in run_versions) == versions
+    with engines[0].connect() as connection:
+        assert sorted(connection.execute(text("SELECT version FROM schema_migrations")).scalars()) == versions
+        assert "Order_rebuild" not in inspect(connection).get_table_names()
+    assert Migrations.pending_migrations(engines[0]) == []
+    for engine in engines:
+        engine.dispose()
+
+def test_migration_rechecks_versions_under_the_lock(monkeypatch):
+    engine = _engine(os.path.join(tempfile.mkdtemp(prefix="oms-migrate-"), "stale.db"))
+    Migrations.migrate(engine)
+    # as if another process applied everything after this one read schema_migrations
+    monkeypatch.setattr(Migrations, "applied_versions", lambda engine: set())
+
+    assert Migrations.migrate(engine) == []
+    engine.dispose()
+
+def test_rebuild_survives_a_leftover_rebuild_table():
+    engine = _engine(os.path.join(tempfile.mkdtemp(prefix="oms-migrate-"), "leftover.db"))
+    Migrations.migrate(engine, target=11)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE "Order_rebuild" (order_id INTEGER)'))
+
+    assert Migrations.migrate(engine) == [12]
+    with engine.connect() as connection:
+        assert "AUTOINCREMENT" in connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'Order'")).scalar()
+        assert "Order_rebuild" not in inspect(connection).get_table_names()
+    engine.dispose()
@@ -0,0 +1,18 @@
+import pytest
+from Benchmarks import MultiWorker
+
+pytest.importorskip("gunicorn")
+pytest.importorskip("uvicorn_worker")
+pytest.importorskip("httpx")
+
+@pytest.mark.slow
+def test_workers_share_stock_cache_and_events():
+    result = MultiWorker.run("gunicorn", workers=2, orders=200, stock=50, concurrency=16, cache_bus=True)
+
+    assert result["errors"] == 0, result["log"]
+    assert result["accepted"] == 50
+    assert not result["oversold"]
+    assert result["consistent"]
+    assert result["stale_stock_reads"] == result["stale_count_reads"] == 0
+    assert result["events_delivered"] == result["accepted"]
+    assert result["duplicate_events"] == 0
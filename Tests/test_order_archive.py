@@ -0,0 +1,73 @@
+import os
+import tempfile
+from sqlalchemy import create_engine, text
+from Database import Migrations, OrderArchive
+
+# orders dated here are the only ones old enough for the archive in these tests
+OLD = "2000-01-01"
+OLDER_THAN_DAYS = 3650
+
+def _place(client, product_id: int, created_at: str = OLD) -> int:
+    response = client.post("/orders", json={"product_id": product_id, "quantity": 1, "status": "PENDING", "created_at": created_at})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["order"]["order_id"]
+
+def _cancel(client, order_id: int):
+    assert client.put(f"/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code == 200
+
+def test_new_orders_never_reuse_archived_ids(client, create_product):
+    product_id = create_product()
+    old_ids = [_place(client, product_id), _place(client, product_id)]
+    for order_id in old_ids:
+        _cancel(client, order_id)
+    assert OrderArchive.archive_orders(older_than_days=OLDER_THAN_DAYS)["archived"] >= 2
+    # with the archived orders gone, deleting the newest one leaves the highest ids unused in Order
+    newest = _place(client, product_id, "2025-01-01")
+    assert client.delete(f"/orders/{newest}").status_code == 200
+
+    order_id = _place(client, product_id)
+
+    assert order_id > max(old_ids + [newest])
+    assert client.get(f"/orders/{old_ids[-1]}").json()["data"]["order"]["status"] == "CANCELLED"
+    assert client.get(f"/orders/{order_id}").json()["data"]["order"]["status"] == "PENDING"
+    _cancel(client, order_id)
+    assert OrderArchive.archive_orders(older_than_days=OLDER_THAN_DAYS)["archived"] == 1
+    assert client.get(f"/orders/{order_id}").json()["data"]["order"]["status"] == "CANCELLED"
+
+def test_archived_multi_line_order_fills_the_single_line_fields(client, create_product):
+    first = create_product()
+    second = create_product()
+    response = client.post("/orders/full", json={"status": "PENDING", "created_at": OLD, "lines": [
+        {"product_id": first, "quantity": 3}, {"product_id": second, "quantity": 1}
+    ]})
+    order_id = response.json()["data"]["order"]["order_id"]
+    _cancel(client, order_id)
+    OrderArchive.archive_orders(older_than_days=OLDER_THAN_DAYS)
+
+    order = client.get(f"/orders/{order_id}").json()["data"]["order"]
+
+    assert (order["product_id"], order["quantity"], order["status"]) == (first, 3, "CANCELLED")
+
+def test_autoincrement_migration_starts_after_archived_ids():
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="oms-migrate-"), "migrate.db"))
+    Migrations.migrate(engine, target=11)
+    with engine.begin() as connection:
+        connection.execute(text("""INSERT INTO "Product" (product_id, sku, product_name, price, stock_quantity, created_at) VALUES (1, 'A', 'A', 1.0, 10, '2025-01-01')"""))
+        connection.execute(text("""INSERT INTO "Order" (order_id, product_id, quantity, status, created_at) VALUES (1, 1, 1, 'PENDING', '2025-01-01'), (2, 1, 1, 'PAID', '2025-01-01')"""))
+        connection.execute(text("""INSERT INTO order_archive (order_id, product_id, quantity, status, created_at, archived_at) VALUES (7, 1, 1, 'DELIVERED', '2025-01-01', 0)"""))
+
+    assert Migrations.migrate(engine) == [12]
+
+    with engine.begin() as connection:
+        assert "AUTOINCREMENT" in connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'Order'")).scalar()
+        indexes = set(connection.execute(text("""SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Order'""")).scalars())
+        assert {"ix_order_product_id", "ix_order_status_created_at", "ix_order_created_at"} <= indexes
+        assert connection.execute(text('SELECT order_id, status FROM "Order" ORDER BY order_id')).all() == [(1, "PENDING"), (2, "PAID")]
+        connection.execute(text("""INSERT INTO "Order" (product_id, quantity, status, created_at) VALUES (1, 1, 'PENDING', '2025-01-01')"""))
+        assert connection.execute(text('SELECT MAX(order_id) FROM "Order"')).scalar() == 8
+    # applying it again changes nothing
+    with engine.begin() as connection:
+        Migrations._order_ids_autoincrement(connection)
+        connection.execute(text("""INSERT INTO "Order" (product_id, quantity, status, created_at) VALUES (1, 1, 'PENDING', '2025-01-01')"""))
+        assert connection.execute(text('SELECT MAX(order_id) FROM "Order"')).scalar() == 9
+    engine.dispose()
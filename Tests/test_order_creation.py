@@ -0,0 +1,76 @@
+import pytest
+from Utils.OrderStatus import INVALID_INITIAL_STATUS_MESSAGE
+
+def _order(product_id: int, status: str, quantity: int = 2) -> dict:
+    return {"product_id": product_id, "quantity": quantity, "status": status, "created_at": "2025-01-01"}
+
+@pytest.mark.parametrize("status", ["PENDING", "PAID"])
+def test_order_is_created_in_an_initial_status(client, create_product, stock_of, status):
+    product_id = create_product(stock_quantity=10)
+
+    response = client.post("/orders", json=_order(product_id, status))
+
+    assert response.status_code == 201
+    assert response.json()["data"]["order"]["status"] == status
+    assert stock_of(product_id) == 8
+
+@pytest.mark.parametrize("status", ["BOGUS", "SHIPPED", "DELIVERED", "CANCELLED", "pending"])
+def test_order_in_another_status_is_rejected_without_taking_stock(client, create_product, stock_of, status):
+    product_id = create_product(stock_quantity=10)
+
+    response = client.post("/orders", json=_order(product_id, status))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == INVALID_INITIAL_STATUS_MESSAGE
+    assert stock_of(product_id) == 10
+
+@pytest.mark.parametrize("all_or_nothing", [True, False])
+def test_batch_with_an_invalid_status_is_rejected_as_a_whole(client, create_product, stock_of, all_or_nothing):
+    product_id = create_product(stock_quantity=10)
+
+    response = client.post("/orders/batch", json={
+        "orders": [_order(product_id, "PENDING"), _order(product_id, "DELIVERED")],
+        "all_or_nothing": all_or_nothing
+    })
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == INVALID_INITIAL_STATUS_MESSAGE
+    assert stock_of(product_id) == 10
+    assert client.get("/orders", params={"product_id": product_id}).json()["data"]["orders"] == []
+
+def test_multi_line_order_in_another_status_is_rejected(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+
+    response = client.post("/orders/full", json={
+        "status": "CANCELLED", "created_at": "2025-01-01", "lines": [{"product_id": product_id, "quantity": 3}]
+    })
+
+    assert response.status_code == 400
+    assert stock_of(product_id) == 10
+
+def test_rejected_order_with_idempotency_key_can_be_retried_with_a_valid_status(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    headers = {"Idempotency-Key": f"initial-status-{product_id}"}
+
+    assert client.post("/orders", json=_order(product_id, "CANCELLED"), headers=headers).status_code == 400
+    # the failed attempt stored no response, so the key is still free for a corrected request
+    assert client.post("/orders", json=_order(product_id, "PENDING"), headers=headers).status_code == 201
+    assert stock_of(product_id) == 8
+
+def test_multi_line_order_fills_the_single_line_fields(client, create_product):
+    first = create_product()
+    second = create_product()
+    response = client.post("/orders/full", json={"status": "PENDING", "created_at": "2025-01-01", "lines": [
+        {"product_id": first, "quantity": 2}, {"product_id": second, "quantity": 5}
+    ]})
+    order_id = response.json()["data"]["order"]["order_id"]
+
+    fetched = client.get(f"/orders/{order_id}").json()["data"]["order"]
+    by_product = {
+        product_id: [order for order in client.get("/orders", params={"product_id": product_id}).json()["data"]["orders"] if order["order_id"] == order_id]
+        for product_id in (first, second)
+    }
+
+    assert (fetched["product_id"], fetched["quantity"]) == (first, 2)
+    assert [(order["product_id"], order["quantity"]) for order in by_product[first]] == [(first, 2)]
+    assert [(order["product_id"], order["quantity"]) for order in by_product[second]] == [(second, 5)]
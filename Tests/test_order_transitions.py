@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+# the lifecycle as documented in Utils/OrderStatus.py, spelled out independently of TRANSITIONS
+ALLOWED = {
+    ("PENDING", "PAID"), ("PENDING", "CANCELLED"),
+    ("PAID", "SHIPPED"), ("PAID", "CANCELLED"),
+    ("SHIPPED", "DELIVERED")
+}
+STATUSES = ["PENDING", "PAID", "SHIPPED", "DELIVERED", "CANCELLED"]
+# how an order is brought into each status from PENDING
+PATHS = {
+    "PENDING": [],
+    "PAID": ["PAID"],
+    "SHIPPED": ["PAID", "SHIPPED"],
+    "DELIVERED": ["PAID", "SHIPPED", "DELIVERED"],
+    "CANCELLED": ["CANCELLED"]
+}
+
+@pytest.fixture
+def place_order(client):
+    """
+    Places a PENDING order and walks it to the given status; returns its order_id.
+    """
+    def place(product_id: int, status: str = "PENDING", quantity: int = 3) -> int:
+        response = client.post("/orders", json={
+            "product_id": product_id, "quantity": quantity, "status": "PENDING", "created_at": "2025-01-01"
+        })
+        assert response.status_code == 201, response.text
+        order_id = response.json()["data"]["order"]["order_id"]
+        for step in PATHS[status]:
+            assert client.put(f"/orders/{order_id}", params={"status_update": step}).status_code == 200
+        return order_id
+    return place
+
+def _status(client, order_id: int) -> str:
+    return client.get(f"/orders/{order_id}").json()["data"]["order"]["status"]
+
+@pytest.mark.parametrize("source", STATUSES)
+@pytest.mark.parametrize("target", STATUSES)
+def test_transition_table(client, create_product, place_order, source, target):
+    order_id = place_order(create_product(), source)
+
+    response = client.put(f"/orders/{order_id}", params={"status_update": target})
+
+    if source == target or (source, target) in ALLOWED:
+        assert response.status_code == 200
+        assert _status(client, order_id) == target
+    else:
+        assert response.status_code == 400
+        assert _status(client, order_id) == source
+
+def test_unknown_status_and_missing_order(client, create_product, place_order):
+    order_id = place_order(create_product())
+
+    assert client.put(f"/orders/{order_id}", params={"status_update": "LOST"}).status_code == 400
+    assert client.put("/orders/999999999", params={"status_update": "PAID"}).status_code == 404
+    assert _status(client, order_id) == "PENDING"
+
+@pytest.mark.parametrize("source", ["PENDING", "PAID"])
+def test_cancelling_gives_stock_back_once(client, create_product, stock_of, place_order, source):
+    product_id = create_product(stock_quantity=10)
+    order_id = place_order(product_id, source, quantity=3)
+    assert stock_of(product_id) == 7
+
+    assert client.put(f"/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code == 200
+    assert stock_of(product_id) == 10
+    # already cancelled: reported unchanged, nothing given back again
+    assert client.put(f"/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code == 200
+    assert stock_of(product_id) == 10
+
+def test_delivered_order_keeps_its_stock(client, create_product, stock_of, place_order):
+    product_id = create_product(stock_quantity=10)
+    order_id = place_order(product_id, "DELIVERED", quantity=3)
+
+    assert client.put(f"/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code == 400
+    assert client.delete(f"/orders/{order_id}").status_code == 400
+    assert stock_of(product_id) == 7
+
+def test_deleting_an_order_gives_stock_back(client, create_product, stock_of, place_order):
+    product_id = create_product(stock_quantity=10)
+    order_id = place_order(product_id, "PAID", quantity=3)
+
+    assert client.delete(f"/orders/{order_id}").status_code == 200
+    assert stock_of(product_id) == 10
+    assert client.get(f"/orders/{order_id}").status_code == 404
+
+def test_concurrent_cancellations_give_stock_back_once(client, create_product, stock_of, place_order):
+    product_id = create_product(stock_quantity=10)
+    order_id = place_order(product_id, quantity=4)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(lambda _: client.put(f"/orders/{order_id}", params={"status_update": "CANCELLED"}).status_code, range(8)))
+
+    assert codes == [200] * 8
+    assert stock_of(product_id) == 10
+
+def test_bulk_status_change_with_mixed_orders(client, create_product, stock_of, place_order):
+    product_id = create_product(stock_quantity=100)
+    pending = place_order(product_id, "PENDING", quantity=1)
+    paid = place_order(product_id, "PAID", quantity=2)
+    shipped = place_order(product_id, "SHIPPED", quantity=4)
+    cancelled = place_order(product_id, "CANCELLED", quantity=8)
+    missing = 999999999
+    assert stock_of(product_id) == 100 - 1 - 2 - 4
+
+    response = client.put("/orders/status", json={
+        "order_ids": [pending, paid, shipped, cancelled, missing, pending], "status": "CANCELLED"
+    })
+
+    assert response.status_code == 200
+    report = response.json()["data"]
+    assert sorted(report["updated"]) == sorted([pending, paid])
+    assert report["unchanged"] == [cancelled]
+    assert report["rejected"] == [{"order_id": shipped, "status": "SHIPPED"}]
+    assert report["missing"] == [missing]
+    assert report["restocked"] == [{"product_id": product_id, "quantity": 3}]
+    assert stock_of(product_id) == 100 - 4
+    assert [_status(client, order_id) for order_id in (pending, paid, shipped)] == ["CANCELLED", "CANCELLED", "SHIPPED"]
+
+def test_bulk_status_change_rejects_unknown_status(client, create_product, place_order):
+    order_id = place_order(create_product())
+
+    assert client.put("/orders/status", json={"order_ids": [order_id], "status": "LOST"}).status_code == 400
+    assert _status(client, order_id) == "PENDING"
@@ -0,0 +1,55 @@
+import uuid
+
+def _events(client, product_id: int) -> list:
+    response = client.get("/events", params={"type": ["product.stock_changed", "product.low_stock"], "limit": 10000})
+    assert response.status_code == 200
+    return [(event["type"], event["data"]) for event in response.json()["data"]["events"] if event["aggregate_id"] == product_id]
+
+def _sku(client, product_id: int) -> str:
+    return client.get(f"/products/{product_id}").json()["data"]["product"]["sku"]
+
+def _import(client, rows: list):
+    body = "sku,product_name,price,stock_quantity,created_at\n" + "".join(f"{sku},Test product,10.0,{stock},2025-01-01\n" for sku, stock in rows)
+    response = client.post("/products/import", params={"format": "csv"}, content=body)
+    assert response.status_code == 200
+    return response.json()["data"]["import"]
+
+def test_product_update_raises_stock_changed(client, create_product):
+    product_id = create_product(stock_quantity=50)
+
+    assert client.put(f"/products/{product_id}", json={"stock_quantity": 5}).status_code == 200
+    # nothing written, nothing raised
+    assert client.put(f"/products/{product_id}", json={"stock_quantity": 5}).status_code == 200
+    assert client.put(f"/products/{product_id}", json={"price": 12.5}).status_code == 200
+
+    assert _events(client, product_id) == [
+        ("product.stock_changed", {"product_id": product_id, "stock_quantity": 5, "previous": 50, "source": "update"}),
+        ("product.low_stock", {"product_id": product_id, "stock_quantity": 5, "threshold": 10})
+    ]
+
+def test_product_import_raises_stock_changed_for_existing_products(client, create_product):
+    product_id = create_product(stock_quantity=50)
+    unchanged_id = create_product(stock_quantity=30)
+    new_sku = f"TEST-{uuid.uuid4().hex}"
+
+    report = _import(client, [(_sku(client, product_id), 80), (_sku(client, unchanged_id), 30), (new_sku, 20), (_sku(client, product_id), 8)])
+
+    assert report["upserted"] == 4
+    assert _events(client, product_id) == [
+        ("product.stock_changed", {"product_id": product_id, "stock_quantity": 80, "previous": 50, "source": "import"}),
+        ("product.stock_changed", {"product_id": product_id, "stock_quantity": 8, "previous": 80, "source": "import"}),
+        ("product.low_stock", {"product_id": product_id, "stock_quantity": 8, "threshold": 10})
+    ]
+    assert _events(client, unchanged_id) == []
+
+def test_order_created_carries_a_float_unit_price(client, create_product):
+    product_id = create_product(price=12)
+    single = client.post("/orders", json={"product_id": product_id, "quantity": 1, "status": "PENDING", "created_at": "2025-01-01"})
+    batch = client.post("/orders/batch", json={"orders": [{"product_id": product_id, "quantity": 1, "status": "PENDING", "created_at": "2025-01-01"}]})
+    assert single.status_code == 201 and batch.status_code == 201, batch.text
+
+    response = client.get("/events", params={"type": "order.created", "limit": 10000})
+    prices = [event["data"]["unit_price"] for event in response.json()["data"]["events"] if event["data"]["product_id"] == product_id]
+
+    assert prices == [12.0, 12.0]
+    assert all(isinstance(price, float) for price in prices)
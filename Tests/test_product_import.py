@@ -0,0 +1,107 @@
+import io
+import sqlite3
+import threading
+import uuid
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from Database import ProductImport, WriteQueue
+from Database.OrderDb import Product, get_database_session
+from Utils.Settings import get_settings
+
+def _skus(count: int) -> list:
+    prefix = uuid.uuid4().hex[:12]
+    return [f"IMPORT-{prefix}-{index}" for index in range(count)]
+
+def _products(skus: list) -> dict:
+    session = get_database_session()
+    try:
+        rows = session.execute(select(Product.sku, Product.product_name, Product.price, Product.stock_quantity).where(Product.sku.in_(skus))).all()
+    finally:
+        session.close()
+    by_sku = {}
+    for sku, name, price, stock in rows:
+        by_sku.setdefault(sku, []).append((name, price, stock))
+    return by_sku
+
+def test_csv_import_upserts_by_sku_and_reports_bad_rows(client):
+    existing, new, repeated = _skus(3)
+    assert client.post("/products", json={
+        "sku": existing, "product_name": "Old name", "price": 1.0, "stock_quantity": 1, "created_at": "2025-01-01"
+    }).status_code == 201
+    body = (
+        "sku,product_name,price,stock_quantity,created_at\n"
+        f"{existing},New name,2.5,7,2025-01-01\n"   # row 2: updates the existing product
+        f"{new},Fresh,3.0,4,2025-01-01\n"           # row 3
+        f"{new},Bad price,0,4,2025-01-01\n"         # row 4: price must be positive
+        f"{repeated},First,1.0,1,2025-01-01\n"      # row 5
+        f"{repeated},Second,1.5,2,not-a-date\n"     # row 6: invalid date
+        f"{repeated},Third,2.0,3,2025-01-01\n"      # row 7: the later row wins
+    )
+
+    response = client.post("/products/import", params={"format": "csv", "batch_size": 2}, content=body)
+
+    assert response.status_code == 200
+    report = response.json()["data"]["import"]
+    assert (report["rows"], report["upserted"], report["failed"]) == (6, 4, 2)
+    assert report["batches"] == 2
+    assert [error["row"] for error in report["errors"]] == [4, 6]
+    assert _products([existing, new, repeated]) == {
+        existing: [("New name", 2.5, 7)],
+        new: [("Fresh", 3.0, 4)],
+        repeated: [("Third", 2.0, 3)]
+    }
+
+def test_ndjson_import_reports_bad_lines_by_number(client):
+    first, second = _skus(2)
+    lines = io.StringIO(
+        f'{{"sku": "{first}", "product_name": "One", "price": 1.0, "stock_quantity": 1, "created_at": "2025-01-01"}}\n'
+        "{not json\n"
+        "[1, 2]\n"
+        "\n"
+        f'{{"sku": "{second}", "product_name": "Two", "price": 2.0, "created_at": "2025-01-01"}}\n'
+        f'{{"sku": "{first}", "product_name": "One again", "price": 1.5, "stock_quantity": 5, "created_at": "2025-01-01"}}\n'
+    )
+
+    report = ProductImport.import_products(lines, "ndjson", batch_size=1000).to_dict()
+
+    assert (report["rows"], report["upserted"], report["failed"], report["batches"]) == (5, 2, 3, 1)
+    assert [error["row"] for error in report["errors"]] == [2, 3, 5]
+    assert _products([first, second]) == {first: [("One again", 1.5, 5)]}
+
+def test_import_waits_for_a_writer_in_another_connection(client):
+    sku, = _skus(1)
+    # another process holds the write lock for less than the busy timeout
+    other = sqlite3.connect(get_settings().database_url.removeprefix("sqlite:///"), check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.3, other.commit)
+    release.start()
+    try:
+        report = ProductImport.import_products(io.StringIO(
+            "sku,product_name,price,stock_quantity,created_at\n" f"{sku},Waited,1.0,1,2025-01-01\n"
+        ), "csv").to_dict()
+    finally:
+        release.join()
+        other.close()
+
+    assert (report["upserted"], report["failed"]) == (1, 0)
+
+def test_batch_the_database_stays_busy_for_is_reported_not_raised(client, monkeypatch):
+    skus = _skus(3)
+    write = WriteQueue.run_write
+    calls = []
+
+    def busy_second_batch(session, work):
+        calls.append(work)
+        if len(calls) == 2:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        return write(session, work)
+    monkeypatch.setattr(WriteQueue, "run_write", busy_second_batch)
+
+    report = ProductImport.import_products(io.StringIO(
+        "sku,product_name,price,stock_quantity,created_at\n" + "".join(f"{sku},Busy,1.0,1,2025-01-01\n" for sku in skus)
+    ), "csv", batch_size=1).to_dict()
+
+    assert (report["upserted"], report["failed"], report["batches"]) == (2, 1, 3)
+    assert report["errors"][0]["row"] == 3
+    assert "database is locked" in report["errors"][0]["error"]
+    assert sorted(_products(skus)) == [skus[0], skus[2]]
@@ -0,0 +1,86 @@
+import uuid
+
+def _token() -> str:
+    # a word no other test's products contain, so results are limited to this test's products
+    return "zz" + uuid.uuid4().hex[:10]
+
+def _create(client, sku: str, name: str) -> int:
+    response = client.post("/products", json={"sku": sku, "product_name": name, "price": 5.0, "stock_quantity": 3, "created_at": "2025-01-01"})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["product"]["product_id"]
+
+def _search(client, query: str, limit: int = 100, cursor: str = None) -> dict:
+    response = client.get("/products/search", params={"q": query, "limit": limit, **({"cursor": cursor} if cursor else {})})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def _ids(client, query: str) -> list:
+    return [product["product_id"] for product in _search(client, query)["products"]]
+
+def test_search_follows_inserts_renames_and_deletes(client):
+    token = _token()
+    red = _create(client, f"{token}-1", f"{token} Red Shoes")
+    blue = _create(client, f"{token}-2", f"{token} Blue Shoes")
+
+    assert _ids(client, f"{token} red sh") == [red]
+    assert sorted(_ids(client, f"{token} shoes")) == sorted([red, blue])
+
+    assert client.put(f"/products/{red}", json={"product_name": f"{token} Green Shoes"}).status_code == 200
+    assert _ids(client, f"{token} red") == []
+    assert _ids(client, f"{token} green") == [red]
+    # a stock change leaves the index alone and the result shows the new stock
+    assert client.put(f"/products/{red}", json={"stock_quantity": 9}).status_code == 200
+    assert _search(client, f"{token} green")["products"][0]["stock_quantity"] == 9
+
+    assert client.put(f"/products/{blue}", json={"sku": f"{token}-renamed"}).status_code == 200
+    assert _ids(client, f"{token} renamed") == [blue]
+
+    assert client.delete(f"/products/{blue}").status_code == 200
+    assert _ids(client, f"{token} shoes") == [red]
+    assert _ids(client, f"{token} renamed") == []
+
+def test_cursor_pages_through_every_match_once(client):
+    token = _token()
+    # matches in the sku rank above matches in the name; equal names tie on score
+    in_sku = [_create(client, f"{token}-{index}", "Lamp") for index in range(3)]
+    in_name = [_create(client, f"OTHER-{token[2:]}-{index}", f"{token} Lamp") for index in range(4)]
+    expected = _ids(client, token)
+    assert sorted(expected) == sorted(in_sku + in_name)
+    assert set(expected[:3]) == set(in_sku)
+
+    pages, cursor = [], None
+    while True:
+        page = _search(client, token, limit=2, cursor=cursor)
+        pages.append([product["product_id"] for product in page["products"]])
+        cursor = page["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [product_id for page in pages for product_id in page] == expected
+
+def test_cursor_pages_correctly_after_the_index_changed(client):
+    token = _token()
+    kept = [_create(client, f"{token}-{index}", f"{token} Desk") for index in range(3)]
+    renamed = _create(client, f"OTHER-{token[2:]}-r", "Old name")
+    deleted = _create(client, f"OTHER-{token[2:]}-d", f"{token} Desk")
+    assert client.put(f"/products/{renamed}", json={"product_name": f"{token} Desk"}).status_code == 200
+    assert client.delete(f"/products/{deleted}").status_code == 200
+    added = _create(client, f"OTHER-{token[2:]}-a", f"{token} Desk")
+
+    first = _search(client, token, limit=3)
+    rest = _search(client, token, limit=3, cursor=first["pagination"]["next_cursor"])
+
+    seen = [product["product_id"] for product in first["products"] + rest["products"]]
+    assert sorted(seen) == sorted(kept + [renamed, added])
+    assert rest["pagination"]["next_cursor"] is None
+
+def test_cursor_of_another_query_is_rejected(client):
+    token = _token()
+    for index in range(2):
+        _create(client, f"{token}-{index}", "Chair")
+    cursor = _search(client, token, limit=1)["pagination"]["next_cursor"]
+
+    response = client.get("/products/search", params={"q": f"{token} chair", "cursor": cursor})
+
+    assert response.status_code == 400
@@ -0,0 +1,28 @@
+import csv
+import io
+import uuid
+
+def test_product_created_at_is_served_as_a_date(client):
+    sku = f"DATED-{uuid.uuid4().hex}"
+    created = client.post("/products", json={"sku": sku, "product_name": "Dated", "price": 1.0, "stock_quantity": 1, "created_at": "2025-01-01"})
+    product_id = created.json()["data"]["product"]["product_id"]
+
+    updated = client.put(f"/products/{product_id}", json={"stock_quantity": 2})
+    redated = client.put(f"/products/{product_id}", json={"created_at": "2025-02-01"})
+    same = client.put(f"/products/{product_id}", json={"created_at": "2025-02-01"})
+    fetched = client.get(f"/products/{product_id}")
+    total = client.get("/products", params={"limit": 1}).json()["data"]["pagination"]["total_count"]
+    # the newest product is the last page of the listing
+    listed = client.get("/products", params={"limit": 10, "offset": max(0, total - 10)}).json()["data"]["products"]
+    found = client.get("/products/search", params={"q": sku}).json()["data"]["products"]
+    exported = [row for row in csv.DictReader(io.StringIO(client.get("/products/export").text)) if row["sku"] == sku]
+
+    assert created.json()["data"]["product"]["created_at"] == "2025-01-01"
+    assert updated.json()["data"]["product"]["created_at"] == "2025-01-01"
+    assert redated.json()["data"]["product"]["created_at"] == "2025-02-01"
+    assert redated.json()["data"]["updated_fields"] == ["created_at"]
+    assert same.json()["data"]["updated_fields"] == []
+    assert fetched.json()["data"]["product"]["created_at"] == "2025-02-01"
+    assert [product["created_at"] for product in listed if product["product_id"] == product_id] == ["2025-02-01"]
+    assert [product["created_at"] for product in found] == ["2025-02-01"]
+    assert [row["created_at"] for row in exported] == ["2025-02-01"]
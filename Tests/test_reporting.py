@@ -0,0 +1,61 @@
+from sqlalchemy import select
+from Database import Reporting
+from Database.OrderDb import DailySalesRollup, ProductSalesRollup, get_database_session
+
+def _rollups(session) -> dict:
+    # incremental upkeep leaves rows at zero where a rebuild writes none
+    return {
+        "daily": sorted(
+            (row.day, row.status, row.orders, row.units, round(row.revenue, 6))
+            for row in session.execute(select(DailySalesRollup)).scalars() if row.orders or row.units
+        ),
+        "products": sorted(
+            (row.product_id, row.status, row.orders, row.units, round(row.revenue, 6))
+            for row in session.execute(select(ProductSalesRollup)).scalars() if row.orders or row.units
+        )
+    }
+
+def _place(client, product_id: int, quantity: int, created_at: str = "2025-03-01") -> int:
+    response = client.post("/orders", json={"product_id": product_id, "quantity": quantity, "status": "PENDING", "created_at": created_at})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["order"]["order_id"]
+
+def _place_full(client, lines: list, created_at: str = "2025-03-02") -> int:
+    response = client.post("/orders/full", json={
+        "status": "PAID", "created_at": created_at,
+        "lines": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in lines]
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["order"]["order_id"]
+
+def test_rebuild_matches_incremental_upkeep(client, create_product):
+    cheap = create_product(price=2.5)
+    dear = create_product(price=40.0)
+    kept = _place(client, cheap, 4)
+    paid = _place(client, dear, 1, "2025-03-02")
+    cancelled = _place(client, cheap, 3)
+    deleted = _place(client, dear, 2)
+    multi = _place_full(client, [(cheap, 1), (dear, 2)])
+    multi_cancelled = _place_full(client, [(cheap, 2), (dear, 1)], "2025-03-03")
+    # a price change after the fact must not move revenue already booked
+    assert client.put(f"/products/{cheap}", json={"price": 3.0}).status_code == 200
+    assert client.put(f"/orders/{paid}", params={"status_update": "PAID"}).status_code == 200
+    assert client.put(f"/orders/{multi}", params={"status_update": "SHIPPED"}).status_code == 200
+    assert client.put("/orders/status", json={"order_ids": [cancelled, multi_cancelled], "status": "CANCELLED"}).status_code == 200
+    assert client.delete(f"/orders/{deleted}").status_code == 200
+    assert kept
+
+    session = get_database_session()
+    try:
+        incremental = _rollups(session)
+        Reporting.rebuild(session)
+        rebuilt = _rollups(session)
+    finally:
+        session.rollback()
+        session.close()
+
+    assert rebuilt == incremental
+    assert (cheap, "PENDING", 1, 4, 10.0) in incremental["products"]
+    assert (cheap, "CANCELLED", 2, 5, 12.5) in incremental["products"]
+    assert (dear, "SHIPPED", 1, 2, 80.0) in incremental["products"]
+    assert all(row[0] != dear or row[1] != "PENDING" for row in incremental["products"])
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import select, update
+from Database.HoldSweeper import HoldSweeper
+from Database.OrderDb import StockHold, get_database_session
+from Utils.Settings import get_settings
+
+def _place(client, product_id: int, quantity: int = 3) -> int:
+    response = client.post("/orders", json={"product_id": product_id, "quantity": quantity, "status": "PENDING", "created_at": "2025-01-01"})
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["order"]["order_id"]
+
+def _hold(order_id: int):
+    session = get_database_session()
+    try:
+        return session.execute(select(StockHold.expires_at).where(StockHold.order_id == order_id)).scalar()
+    finally:
+        session.close()
+
+def _expire(order_id: int):
+    session = get_database_session()
+    try:
+        session.execute(update(StockHold).where(StockHold.order_id == order_id).values(expires_at=time.time() - 1))
+        session.commit()
+    finally:
+        session.close()
+
+def _status(client, order_id: int) -> str:
+    return client.get(f"/orders/{order_id}").json()["data"]["order"]["status"]
+
+def test_pending_order_holds_its_stock_for_the_ttl(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    before = time.time()
+
+    order_id = _place(client, product_id)
+
+    assert stock_of(product_id) == 7
+    assert before + get_settings().stock_hold_ttl <= _hold(order_id) <= time.time() + get_settings().stock_hold_ttl
+
+def test_no_hold_when_holds_are_turned_off(client, create_product, override_settings):
+    override_settings(stock_hold_ttl=0)
+
+    order_id = _place(client, create_product())
+
+    assert _hold(order_id) is None
+
+@pytest.mark.parametrize("status", ["PAID", "CANCELLED"])
+def test_leaving_pending_drops_the_hold(client, create_product, status):
+    order_id = _place(client, create_product())
+
+    assert client.put(f"/orders/{order_id}", params={"status_update": status}).status_code == 200
+
+    assert _hold(order_id) is None
+
+def test_deleting_a_pending_order_drops_the_hold(client, create_product):
+    order_id = _place(client, create_product())
+
+    assert client.delete(f"/orders/{order_id}").status_code == 200
+
+    assert _hold(order_id) is None
+
+def test_expired_hold_is_swept_to_cancelled_once(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    expired = _place(client, product_id)
+    live = _place(client, product_id)
+    _expire(expired)
+
+    sweeper = HoldSweeper(batch_size=1)
+    sweeper.sweep()
+    sweeper.sweep()
+
+    assert _status(client, expired) == "CANCELLED"
+    assert _hold(expired) is None
+    assert _status(client, live) == "PENDING"
+    assert _hold(live) is not None
+    assert stock_of(product_id) == 7
+
+def test_concurrent_sweepers_give_stock_back_once(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=20)
+    order_ids = [_place(client, product_id, quantity=2) for _ in range(5)]
+    for order_id in order_ids:
+        _expire(order_id)
+
+    sweepers = [HoldSweeper(batch_size=2) for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda sweeper: sweeper.sweep(), sweepers))
+
+    assert [_status(client, order_id) for order_id in order_ids] == ["CANCELLED"] * 5
+    assert stock_of(product_id) == 20
+    # the background sweeper may have taken some; none was released twice
+    assert sum(sweeper.stats()["released"] for sweeper in sweepers) <= 5
+
+def test_paid_order_is_not_swept(client, create_product, stock_of):
+    product_id = create_product(stock_quantity=10)
+    order_id = _place(client, product_id)
+    _expire(order_id)
+    # paid before the sweeper came round: the payment wins and the hold goes with it
+    assert client.put(f"/orders/{order_id}", params={"status_update": "PAID"}).status_code == 200
+
+    HoldSweeper().sweep()
+
+    assert _status(client, order_id) == "PAID"
+    assert stock_of(product_id) == 7
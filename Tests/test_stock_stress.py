@@ -0,0 +1,8 @@
+from Benchmarks import StockStress
+
+def test_concurrent_orders_never_oversell():
+    result = StockStress.run(threads=16, orders=200, stock=50)
+
+    assert result["accepted"] == 50
+    assert not result["oversold"]
+    assert result["consistent"]
@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+'''
+Pluggable key/value caches.
+
+CacheBackend is the interface the application codes against. LruTtlCache is
+the in-process default; RedisCache adapts any Redis-compatible client (redis-py,
+fakeredis, or a local stand-in exposing get/set/delete/mget/flushdb) so the
+cache can be shared between processes.
+'''
+
+class CacheBackend:
+    """
+    Interface of a cache backend. Values must be JSON-serialisable dicts, lists or scalars.
+    """
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Returns a mapping of key to value for the keys that are cached.
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value, ttl: float = None):
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+class NullCache(CacheBackend):
+    """
+    Cache that stores nothing, used when caching is disabled.
+    """
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value, ttl: float = None):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+    def clear(self):
+        pass
+
+class LruTtlCache(CacheBackend):
+    """
+    Thread-safe in-process cache bounded by entry count (least recently used entries are
+    evicted first) with a per-entry time to live.
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 60.0):
+        """
+        :param max_entries: Maximum number of entries kept.
+        :param default_ttl: Seconds an entry lives unless set() is given a ttl.
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+class RedisCache(CacheBackend):
+    """
+    Adapter over a Redis-compatible client. Values are stored as JSON under a key prefix;
+    eviction is left to the server (e.g. maxmemory-policy allkeys-lru).
+    """
+
+    def __init__(self, client, prefix: str = "oms:", default_ttl: float = 60.0):
+        """
+        :param client: Object with get, set(ex=), delete, mget and scan_iter methods.
+        :param prefix: Prefix added to every key.
+        :param default_ttl: Seconds an entry lives unless set() is given a ttl.
+        """
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        self._count(raw is not None, raw is None)
+        return None if raw is None else json.loads(raw)
+
+    def get_many(self, keys: list) -> dict:
+        if not keys:
+            return {}
+        raws = self.client.mget([self.prefix + key for key in keys])
+        found = {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key: str, value, ttl: float = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value, default=_json_default), ex=max(1, int(ttl)))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+def build_cache(backend: str, max_entries: int, default_ttl: float, redis_url: str = None, prefix: str = "oms:") -> CacheBackend:
+    """
+    Creates the cache backend named by the settings.
+
+    :param backend: 'memory', 'redis' or 'none'.
+    :param max_entries: Entry bound of the in-process cache.
+    :param default_ttl: Default time to live in seconds.
+    :param redis_url: Connection URL when backend is 'redis'.
+    :param prefix: Key prefix when backend is 'redis'.
+    :return: A CacheBackend.
+    """
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return LruTtlCache(max_entries=max_entries, default_ttl=default_ttl)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis cache backend needs the 'redis' package installed") from e
+        return RedisCache(redis.Redis.from_url(redis_url), prefix=prefix, default_ttl=default_ttl)
+    raise ValueError(f"Unknown cache backend {backend!r}")
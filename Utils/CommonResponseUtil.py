@@ -1,13 +1,16 @@
-from Apps.Response.CommonResponse import CommonResponse
+from Utils.JsonResponse import FastJSONResponse
 
 @staticmethod
-def create_common_response(status: str, message: str, data: dict = None) -> CommonResponse:
+def create_common_response(status: str, message: str, data: dict = None, status_code: int = 200) -> FastJSONResponse:
     """
-    Creates a CommonResponse object with the provided status, message, and optional data.
+    Creates the common response envelope with the provided status, message, and optional data.
+    The envelope is serialized with orjson right away, so FastAPI returns it as is; the shape is
+    described by Apps.Response.CommonResponse.
 
     :param status: The status of the response (e.g., 'success', 'error').
     :param message: A message providing additional information about the response.
     :param data: Optional dictionary containing additional data related to the response.
-    :return: An instance of CommonResponse.
+    :param status_code: HTTP status code of the response.
+    :return: A FastJSONResponse.
     """
-    return CommonResponse(status=status, message=message, data=data)
\ No newline at end of file
+    return FastJSONResponse({"status": status, "message": message, "data": data if data is not None else {}}, status_code=status_code)
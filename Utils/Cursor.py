@@ -0,0 +1,35 @@
+import base64
+import json
+
+'''
+Opaque pagination cursors. A cursor is the URL-safe base64 of a small JSON
+object holding the sort key of the last row returned; clients pass it back
+unchanged to fetch the next page.
+'''
+
+def encode_cursor(values: dict) -> str:
+    """
+    Encodes the keyset values of the last row of a page into an opaque cursor.
+
+    :param values: JSON-serialisable sort key values, e.g. {"after": 42}.
+    :return: Cursor string safe to use in a query string.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    :param cursor: Cursor string received from a client.
+    :return: The keyset values.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
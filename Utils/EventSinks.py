@@ -0,0 +1,128 @@
+import asyncio
+import os
+from Utils.JsonResponse import dumps
+
+'''
+Destinations the outbox dispatcher delivers events to.
+
+A sink receives events in batches, oldest first, and either takes the whole
+batch or raises; the dispatcher then retries the same batch later. Durable
+sinks get their progress stored in outbox_cursor and resume where they left
+off after a restart. The in-process EventBroker is not durable: it only feeds
+the subscribers connected to this process (/events/stream), which catch up
+from the table themselves using Last-Event-ID.
+'''
+
+class EventSink:
+    """
+    Base class of the sinks.
+    """
+    durable = True
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def deliver(self, events: list):
+        """
+        :param events: Event dicts (id, type, aggregate_id, created_at, data), oldest first.
+        :raises Exception: If the batch was not delivered and must be retried.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class FileSink(EventSink):
+    """
+    Appends events to a local file, one JSON object per line (NDJSON).
+    """
+
+    def __init__(self, path: str):
+        super().__init__(f"file:{path}")
+        self.path = path
+
+    def _append(self, data: bytes):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "ab") as file:
+            file.write(data)
+
+    async def deliver(self, events: list):
+        await asyncio.to_thread(self._append, b"".join(dumps(event) + b"\n" for event in events))
+
+class WebhookSink(EventSink):
+    """
+    POSTs each batch as {"events": [...]} to a URL; any non-2xx answer fails the batch.
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        super().__init__(f"webhook:{url}")
+        self.url = url
+        self.timeout = timeout
+        self._client = None
+
+    async def deliver(self, events: list):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(self.url, content=dumps({"events": events}), headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class EventBroker(EventSink):
+    """
+    In-process fan-out to live subscribers, e.g. server-sent-events connections.
+    A subscriber that falls more than max_queued batches behind is dropped, and has to reconnect and catch up.
+    """
+    durable = False
+
+    def __init__(self, max_queued: int = 1000):
+        super().__init__("broker")
+        self.max_queued = max_queued
+        self._subscribers = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        :return: Queue receiving every delivered batch (a list of events), or None once the subscriber was dropped.
+        """
+        subscriber = asyncio.Queue(maxsize=max(1, self.max_queued))
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue):
+        self._subscribers.discard(subscriber)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def deliver(self, events: list):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(events)
+            except asyncio.QueueFull:
+                self._subscribers.discard(subscriber)
+                # make room for the end-of-stream marker
+                subscriber.get_nowait()
+                subscriber.put_nowait(None)
+
+def build_sinks(spec: str, webhook_timeout: float = 5.0) -> list:
+    """
+    Builds the durable sinks from a comma-separated spec such as
+    "file:/var/log/oms/events.ndjson,webhook:http://warehouse.local/events".
+    """
+    sinks = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, target = item.partition(":")
+        if kind == "file" and target:
+            sinks.append(FileSink(target))
+        elif kind == "webhook" and target:
+            sinks.append(WebhookSink(target, timeout=webhook_timeout))
+        else:
+            raise ValueError(f"Unknown outbox sink {item!r}, expected file:<path> or webhook:<url>")
+    return sinks
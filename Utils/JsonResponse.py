@@ -0,0 +1,45 @@
+from decimal import Decimal
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+'''
+orjson-based serialization for responses.
+
+Handlers return FastJSONResponse directly, so FastAPI does not walk the
+result with jsonable_encoder. orjson handles dicts, lists, tuples, str,
+numbers and date/datetime natively; pydantic models are dumped on the way.
+'''
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """
+    Serializes content to JSON bytes.
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def rows_to_dicts(fields, rows) -> list:
+    """
+    Turns column tuples into dicts without going through ORM objects or Row mappings.
+
+    :param fields: Names of the selected columns, in order.
+    :param rows: Iterable of tuples (or Rows) with one value per field.
+    :return: List of dicts keyed by field.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,189 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+'''
+In-process request metrics.
+
+MetricsMiddleware times every request and labels it with the route template
+(/orders/{order_id}, not /orders/42), so label cardinality stays bounded.
+Database queries executed while a request is being served are counted into
+that request's RequestStats (see Database/QueryMetrics.py), which gives the
+queries per request distribution and shows N+1 patterns as routes whose
+query count grows with the page size.
+
+Everything is exposed in Prometheus text format by render_prometheus() and,
+per response, in a Server-Timing header. When metrics are disabled nothing
+is installed: no middleware, no SQLAlchemy event listeners.
+'''
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+HOLD_LAG_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed buckets and one series per label set.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        """
+        :param labels: Label values, in the order of label_names.
+        :param value: The observed value.
+        """
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (not cumulative), then sum and count
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class RequestStats:
+    """
+    What one request spent on the database.
+    """
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+request_duration = Histogram(
+    "oms_http_request_duration_seconds", "Time spent serving a request, including streaming the body.",
+    ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "oms_db_queries_per_request", "Database queries executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+request_query_seconds = Histogram(
+    "oms_db_query_seconds_per_request", "Time spent in database queries per request.", ("method", "route"), LATENCY_BUCKETS
+)
+query_duration = Histogram(
+    "oms_db_query_duration_seconds", "Duration of single database queries, inside or outside requests.", (), LATENCY_BUCKETS
+)
+hold_release_lag = Histogram(
+    "oms_stock_hold_release_lag_seconds", "Time from a stock hold's expiry until the sweeper gave the stock back.", (), HOLD_LAG_BUCKETS
+)
+
+def record_query(seconds: float):
+    """
+    Records one executed query against the global histogram and the current request, if any.
+    """
+    query_duration.observe((), seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += seconds
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path is not None else "unmatched"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and database usage, and adding a Server-Timing header.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        """
+        :param app: The ASGI application to wrap.
+        :param server_timing: Add a Server-Timing header to every response.
+        """
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        # a mounted application that is instrumented as well must not count the request twice
+        if scope["type"] != "http" or scope.get("oms.metrics"):
+            await self.app(scope, receive, send)
+            return
+        scope["oms.metrics"] = True
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    header = (f'app;dur={elapsed_ms:.2f}, db;dur={stats.query_seconds * 1000:.2f};'
+                              f'desc="{stats.queries} queries"')
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            route = _route_template(scope)
+            request_duration.observe((method, route, str(status_code)), elapsed)
+            request_queries.observe((method, route), stats.queries)
+            request_query_seconds.observe((method, route), stats.query_seconds)
+
+def instrument(app, enabled: bool, server_timing: bool = True):
+    """
+    Adds MetricsMiddleware to a Starlette/FastAPI application when metrics are enabled.
+    """
+    if enabled:
+        app.add_middleware(MetricsMiddleware, server_timing=server_timing)
+    return app
+
+def render_prometheus(samples: list = ()) -> str:
+    """
+    Renders every histogram plus extra samples in the Prometheus text exposition format.
+
+    :param samples: (name, type, help, value) tuples for gauges and counters collected elsewhere.
+    """
+    lines = []
+    for histogram in (request_duration, request_queries, request_query_seconds, query_duration, hold_release_lag):
+        lines.extend(histogram.render())
+    for name, metric_type, documentation, value in samples:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -5,4 +5,68 @@ class OrderStatus(Enum):
     SHIPPED = "SHIPPED"
     DELIVERED = "DELIVERED"
     CANCELLED = "CANCELLED"
-    PAID = "PAID"
\ No newline at end of file
+    PAID = "PAID"
+
+'''
+Order lifecycle. Orders only move forward along TRANSITIONS:
+
+    PENDING -> PAID -> SHIPPED -> DELIVERED
+       |        |
+       +--------+--> CANCELLED
+
+Orders are created PENDING, or PAID when they are paid at checkout; every
+other status is only reached through TRANSITIONS. DELIVERED and CANCELLED
+are terminal. Stock is taken when the order is created and stays with it
+while it is PENDING or PAID; cancelling or
+deleting an order in one of those states gives the stock back. A PENDING
+order holds its stock for a limited time only: moving it to PAID commits
+the hold, and an order still PENDING when the hold expires is cancelled
+(see Database/StockHolds.py). Statuses are
+stored as their string values, so the lookups below work on strings.
+'''
+
+STATUS_VALUES = frozenset(status.value for status in OrderStatus)
+
+TRANSITIONS = {
+    OrderStatus.PENDING.value: frozenset({OrderStatus.PAID.value, OrderStatus.CANCELLED.value}),
+    OrderStatus.PAID.value: frozenset({OrderStatus.SHIPPED.value, OrderStatus.CANCELLED.value}),
+    OrderStatus.SHIPPED.value: frozenset({OrderStatus.DELIVERED.value}),
+    OrderStatus.DELIVERED.value: frozenset(),
+    OrderStatus.CANCELLED.value: frozenset()
+}
+
+INITIAL_STATUSES = frozenset({OrderStatus.PENDING.value, OrderStatus.PAID.value})
+
+TERMINAL_STATUSES = frozenset(status for status, targets in TRANSITIONS.items() if not targets)
+
+STOCK_HOLDING_STATUSES = frozenset({OrderStatus.PENDING.value, OrderStatus.PAID.value})
+
+# statuses an order can be in right before it moves to the key
+SOURCES = {target: frozenset(source for source, targets in TRANSITIONS.items() if target in targets) for target in STATUS_VALUES}
+
+INVALID_STATUS_MESSAGE = f"Invalid status. Must be one of {[status.value for status in OrderStatus]}"
+INVALID_INITIAL_STATUS_MESSAGE = f"Invalid status for a new order. Must be one of {sorted(INITIAL_STATUSES)}"
+
+def is_valid_status(value: str) -> bool:
+    return value in STATUS_VALUES
+
+def is_initial_status(value: str) -> bool:
+    """
+    Tells whether an order may be created in this status.
+    """
+    return value in INITIAL_STATUSES
+
+def can_transition(current: str, target: str) -> bool:
+    """
+    Tells whether an order in status current may be moved to target.
+    """
+    return target in TRANSITIONS.get(current, ())
+
+def is_terminal(value: str) -> bool:
+    return value in TERMINAL_STATUSES
+
+def holds_stock(value: str) -> bool:
+    """
+    Tells whether an order in this status still holds the stock it reserved.
+    """
+    return value in STOCK_HOLDING_STATUSES
@@ -0,0 +1,84 @@
+import os
+from functools import lru_cache
+from typing import Optional
+from pydantic import BaseModel, Field
+
+'''
+All settings can be overridden through environment variables prefixed with OMS_,
+e.g. OMS_DATABASE_URL=sqlite:////var/lib/oms/ecommerce.db or OMS_POOL_SIZE=20
+'''
+
+ENV_PREFIX = "OMS_"
+
+class Settings(BaseModel):
+    database_url: str = Field("sqlite:///ecommerce.db", description="SQLAlchemy URL of the application database")
+    async_database_url: Optional[str] = Field(None, description="SQLAlchemy async URL, derived from database_url when unset (sqlite -> aiosqlite, postgresql -> asyncpg)")
+    workers: int = Field(1, ge=1, description="Worker processes started by gunicorn.conf.py")
+    bind: str = Field("127.0.0.1:8000", description="Address gunicorn.conf.py binds to, host:port or unix:<path>")
+    migrate_on_startup: bool = Field(True, description="Apply pending schema migrations when the application starts; turn off when migrations run as a separate deploy step")
+    service_mode: str = Field("sync", pattern="^(sync|async)$", description="Which request path App:app serves: sync handlers or async handlers on the async engine")
+    pool_size: int = Field(5, ge=1, description="Number of connections kept open in the pool")
+    max_overflow: int = Field(10, ge=0, description="Connections allowed beyond pool_size under burst load")
+    pool_timeout: float = Field(30.0, gt=0, description="Seconds to wait for a free connection before failing")
+    pool_recycle: int = Field(1800, description="Seconds after which a pooled connection is replaced (-1 disables)")
+    pool_pre_ping: bool = Field(True, description="Test connections for liveness on checkout")
+    sqlite_journal_mode: str = Field("WAL", pattern="(?i)^(WAL|DELETE|TRUNCATE|PERSIST|MEMORY|OFF)$", description="SQLite journal_mode")
+    sqlite_synchronous: str = Field("NORMAL", pattern="(?i)^(OFF|NORMAL|FULL|EXTRA)$", description="SQLite synchronous level")
+    sqlite_busy_timeout_ms: int = Field(5000, ge=0, description="Milliseconds SQLite waits on a locked database before reporting busy")
+    sqlite_cache_size: int = Field(-65536, description="SQLite page cache; negative values are KiB (default 64 MiB)")
+    sqlite_mmap_size: int = Field(268435456, ge=0, description="Bytes of the database file SQLite may memory-map")
+    write_queue_enabled: bool = Field(True, description="SQLite only: run write transactions on one dedicated connection with group commit")
+    write_queue_max_batch: int = Field(64, ge=1, description="Most write transactions committed together by the write queue")
+    write_queue_max_wait_ms: float = Field(2.0, ge=0, description="Milliseconds the write queue waits to fill a batch before committing")
+    busy_retry_attempts: int = Field(5, ge=1, description="Attempts for a write transaction when SQLite reports the database is busy")
+    busy_retry_backoff: float = Field(0.01, ge=0, description="Base delay in seconds between busy retries, doubled each attempt")
+    product_count_ttl: float = Field(5.0, ge=0, description="Seconds the cached product count is served before it is recounted")
+    product_cache_backend: str = Field("memory", pattern="^(memory|redis|none)$", description="Product cache backend: memory, redis or none")
+    product_cache_size: int = Field(10000, ge=1, description="Maximum entries held by the in-process product cache")
+    product_cache_ttl: float = Field(60.0, gt=0, description="Seconds a cached product or page lives")
+    cache_bus_enabled: bool = Field(False, description="Broadcast product cache invalidations to the other worker processes through the cache_invalidation table; gunicorn.conf.py turns it on when workers > 1")
+    cache_bus_poll_interval: float = Field(0.05, gt=0, description="Seconds between a worker's reads of the cache invalidation bus, the longest a change can be served stale by another worker")
+    cache_bus_retention: float = Field(60.0, gt=0, description="Seconds invalidation messages are kept; a worker that falls further behind drops its whole cache")
+    cache_redis_url: str = Field("redis://localhost:6379/0", description="Redis-compatible server used by the redis cache backend")
+    metrics_enabled: bool = Field(True, description="Record per-route latency and per-request query metrics, served at /metrics")
+    metrics_server_timing: bool = Field(True, description="Add a Server-Timing header with app and database time to every response")
+    idempotency_ttl: float = Field(86400.0, gt=0, description="Seconds a stored Idempotency-Key response is replayed")
+    idempotency_cache_size: int = Field(10000, ge=1, description="Idempotency keys kept in the in-process index in front of the dedupe table")
+    outbox_enabled: bool = Field(True, description="Write order and stock events to the outbox table in the same transaction as the change")
+    outbox_dispatch_enabled: bool = Field(True, description="Run the outbox dispatcher, which feeds the sinks and /events/stream, in this process")
+    outbox_sinks: str = Field("", description="Comma-separated sinks the dispatcher delivers to, besides /events/stream: file:<path>, webhook:<url>")
+    outbox_batch_size: int = Field(500, ge=1, description="Most events delivered to a sink at once")
+    outbox_poll_interval: float = Field(1.0, gt=0, description="Seconds between outbox polls when no commit has signalled new events")
+    outbox_retention: float = Field(604800.0, gt=0, description="Seconds delivered events are kept, so subscribers can resume with Last-Event-ID")
+    outbox_webhook_timeout: float = Field(5.0, gt=0, description="Seconds a webhook sink waits for the receiver before retrying")
+    outbox_lease_ttl: float = Field(15.0, gt=0, description="Seconds a worker holds the lease to deliver to the durable sinks; another worker takes over when it is not renewed in time")
+    stock_hold_ttl: float = Field(1800.0, ge=0, description="Seconds a PENDING order holds its stock; when it is not paid in time the sweeper cancels it and gives the stock back (0 holds stock until the order is cancelled)")
+    stock_hold_sweep_enabled: bool = Field(True, description="Run the sweeper that releases expired stock holds in this process")
+    stock_hold_sweep_interval: float = Field(5.0, gt=0, description="Seconds between sweeps for expired stock holds, the longest an expired hold is kept")
+    stock_hold_sweep_batch: int = Field(500, ge=1, description="Most expired holds released per transaction by the sweeper")
+    archive_after_days: int = Field(90, ge=0, description="Age in days after which DELIVERED and CANCELLED orders are moved to the archive tables by Manage.py archive-orders")
+    archive_batch_size: int = Field(1000, ge=1, le=5000, description="Orders moved to the archive per transaction")
+    low_stock_threshold: int = Field(10, ge=0, description="Stock quantity at or below which an order raises a product.low_stock event")
+
+    @classmethod
+    def from_env(cls, environ=None) -> "Settings":
+        """
+        Builds the settings from OMS_* environment variables, falling back to the defaults.
+
+        :param environ: Mapping to read from, defaults to os.environ.
+        :return: A validated Settings instance.
+        """
+        environ = os.environ if environ is None else environ
+        values = {}
+        for name in cls.model_fields:
+            key = ENV_PREFIX + name.upper()
+            if key in environ:
+                values[name] = environ[key]
+        return cls(**values)
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Returns the process-wide settings, read once from the environment.
+    """
+    return Settings.from_env()
@@ -0,0 +1,48 @@
+import os
+from Utils.Settings import Settings
+
+'''
+gunicorn configuration for serving App:app with several worker processes:
+
+    OMS_WORKERS=4 OMS_BIND=0.0.0.0:8000 gunicorn App:app
+
+gunicorn reads this file from the working directory. The master imports the
+application once (preload_app) and forks the workers, so a worker is ready
+in the time it takes to run the lifespan instead of importing FastAPI and
+SQLAlchemy again. Migrations run once in the master before the fork; the
+engine used for them is disposed, so no connection is shared with a worker.
+
+Set the worker count with OMS_WORKERS rather than gunicorn's -w: with more
+than one worker the cache bus is switched on here, before the application
+reads its settings.
+'''
+
+_settings = Settings.from_env()
+if _settings.workers > 1:
+    os.environ.setdefault("OMS_CACHE_BUS_ENABLED", "true")
+
+bind = _settings.bind
+workers = _settings.workers
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# seconds a worker may spend on one request before the master replaces it
+timeout = 60
+graceful_timeout = 30
+
+def on_starting(server):
+    # imported here so the settings above are in the environment before the application reads them
+    from Database import DbEngine, OrderDb
+    from Utils.Settings import get_settings
+    settings = get_settings()
+    if server.cfg.workers > 1 and not settings.cache_bus_enabled:
+        server.log.warning("Running %d workers without OMS_CACHE_BUS_ENABLED: workers may serve products changed by another worker for up to %ss",
+                           server.cfg.workers, settings.product_cache_ttl)
+    if settings.migrate_on_startup:
+        applied = OrderDb.init_database()
+        if applied:
+            server.log.info("Applied migrations %s", applied)
+        DbEngine.dispose_engine()
+
+def post_fork(server, worker):
+    from Database import DbEngine
+    DbEngine.dispose_engine(close=False)